@@ -16,11 +16,39 @@ class Settings(BaseSettings):
         f"sqlite:///./vmatch_{ENVIRONMENT}.db"
     )
     
+    # 数据库连接池配置（SQLite 内存库不使用连接池参数）
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))  # 常驻连接数
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))  # 高峰期允许额外创建的连接数
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))  # 等待空闲连接的超时（秒）
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))  # 连接最长复用时间（秒），-1 表示不回收
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # 取出连接前探活
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 语句超时（毫秒），0 表示不限制
+    
+    # SQLite 生产模式：WAL 日志、连接参数调优以及单线程写入队列（生产环境默认开启）
+    SQLITE_WAL: bool = os.getenv("SQLITE_WAL", str(ENVIRONMENT == "production")).lower() == "true"
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # WAL 下 NORMAL 只在检查点时刷盘
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))  # 每个连接的页缓存
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # 内存映射读取的大小
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))  # 等待写锁的超时
+    SQLITE_WRITE_QUEUE: bool = os.getenv("SQLITE_WRITE_QUEUE", str(SQLITE_WAL)).lower() == "true"  # 写操作串行执行
+    
+    # 日志配置
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # text 或 json
+    LOG_HOT_PATH_SAMPLE_RATE: float = float(os.getenv("LOG_HOT_PATH_SAMPLE_RATE", 0.01))  # 每请求日志的采样率
+    
     # 应用配置
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your_secret_key_here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # 运维接口（如存储占用排行）允许访问的用户ID，逗号分隔；为空时所有用户都不能访问
+    OPS_USER_IDS: str = os.getenv("OPS_USER_IDS", "")
+    
+    # token验证缓存：最多缓存的token数及有效期（秒），任一为0时关闭缓存
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+    TOKEN_CACHE_TTL: float = float(os.getenv("TOKEN_CACHE_TTL", 300))
+    
     # 测试模式配置 - 默认关闭
     test_mode: bool = os.getenv("TEST_MODE", "false").lower() == "true"
     
@@ -33,6 +61,62 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 100 * 1024 * 1024))  # 100MB (通用限制)
     MAX_IMAGE_SIZE: int = int(os.getenv("MAX_IMAGE_SIZE", 10 * 1024 * 1024))   # 10MB (图片限制)
     MAX_VIDEO_SIZE: int = int(os.getenv("MAX_VIDEO_SIZE", 500 * 1024 * 1024))  # 500MB (视频限制)
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # 上传分块写入大小
+    UPLOAD_FORM_OVERHEAD: int = int(os.getenv("UPLOAD_FORM_OVERHEAD", 1024 * 1024))  # multipart 表单字段及分隔符的余量
+    MEDIA_CHUNK_SIZE: int = int(os.getenv("MEDIA_CHUNK_SIZE", 256 * 1024))  # 媒体文件响应的分块读取大小
+    MEDIA_CACHE_MAX_AGE: int = int(os.getenv("MEDIA_CACHE_MAX_AGE", 3600))  # 非内容寻址文件的浏览器缓存时间（秒）
+    USER_STORAGE_QUOTA: int = int(os.getenv("USER_STORAGE_QUOTA", 2 * 1024 * 1024 * 1024))  # 每个用户的存储配额（0 表示不限制）
+    STORAGE_LEDGER_FILE: str = os.getenv("STORAGE_LEDGER_FILE", os.path.join(BASE_DIR, "storage_usage.json"))  # 存储占用账本快照
+    UPLOAD_BLOB_DIR: str = os.getenv("UPLOAD_BLOB_DIR", os.path.join(BASE_DIR, "upload_blobs"))  # 按内容去重的文件存储，需与 UPLOAD_DIR 在同一文件系统
+
+    # 上传文件存储后端：local（UPLOAD_DIR）或 s3（S3 兼容对象存储，多节点共享）
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    # S3 兼容存储；S3_ENDPOINT_URL 为空时使用 AWS，file:///目录 时使用本地目录模拟（开发和测试）
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "vmatch-uploads")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_KEY_PREFIX: str = os.getenv("S3_KEY_PREFIX", "uploads")
+    S3_MULTIPART_THRESHOLD: int = int(os.getenv("S3_MULTIPART_THRESHOLD", 16 * 1024 * 1024))  # 超过该大小使用分片上传
+    S3_MULTIPART_CHUNK_SIZE: int = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", 8 * 1024 * 1024))  # 分片大小（S3 要求除最后一片外不小于 5MB）
+
+    # 断点续传：会话目录（不在 UPLOAD_DIR 内，未完成的分片不会被静态访问）、默认/最大分片大小、会话过期时间（秒）
+    RESUMABLE_UPLOAD_DIR: str = os.getenv("RESUMABLE_UPLOAD_DIR", os.path.join(BASE_DIR, "upload_sessions"))
+    RESUMABLE_CHUNK_SIZE: int = int(os.getenv("RESUMABLE_CHUNK_SIZE", 5 * 1024 * 1024))
+    RESUMABLE_MAX_CHUNK_SIZE: int = int(os.getenv("RESUMABLE_MAX_CHUNK_SIZE", 32 * 1024 * 1024))
+    RESUMABLE_UPLOAD_TTL: int = int(os.getenv("RESUMABLE_UPLOAD_TTL", 24 * 3600))
+    RESUMABLE_UPLOAD_MAX_SESSIONS: int = int(os.getenv("RESUMABLE_UPLOAD_MAX_SESSIONS", 5))  # 每个用户同时进行的会话数上限，0 表示不限制
+
+    # 图片变体：生成的宽度（逗号分隔）、后台线程数、WebP 质量；卡片和资料详情引用的显示宽度
+    IMAGE_VARIANT_WIDTHS: str = os.getenv("IMAGE_VARIANT_WIDTHS", "160,320,640")
+    IMAGE_VARIANT_WORKERS: int = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+    IMAGE_VARIANT_QUALITY: int = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+    CARD_IMAGE_WIDTH: int = int(os.getenv("CARD_IMAGE_WIDTH", 320))
+    PROFILE_IMAGE_WIDTH: int = int(os.getenv("PROFILE_IMAGE_WIDTH", 640))
+
+    # 聊天实时推送：跨节点广播方式（local 进程内 / redis）、Redis 地址与频道、每个连接缓存的最大事件数
+    CHAT_BROKER: str = os.getenv("CHAT_BROKER", "local")
+    CHAT_REDIS_URL: str = os.getenv("CHAT_REDIS_URL", "redis://localhost:6379/0")
+    CHAT_BROKER_CHANNEL: str = os.getenv("CHAT_BROKER_CHANNEL", "vmatch:chat")
+    CHAT_WS_QUEUE_SIZE: int = int(os.getenv("CHAT_WS_QUEUE_SIZE", 100))
+    # 聊天消息与已读状态所在的数据库，为空时使用主库（DATABASE_URL）；测试和基准脚本指向临时数据库
+    CHAT_DATABASE_URL: str = os.getenv("CHAT_DATABASE_URL", "")
+    # 已读状态批量写入间隔（秒），为 0 时每次修改立即写入
+    CHAT_READ_FLUSH_INTERVAL: float = float(os.getenv("CHAT_READ_FLUSH_INTERVAL", 0.5))
+    # 内存中最多缓存已读状态的会话数，超出时淘汰最久未访问的会话，0 表示不限制
+    CHAT_READ_STATE_CACHE_SIZE: int = int(os.getenv("CHAT_READ_STATE_CACHE_SIZE", 10000))
+    
+    # 模拟数据文件：固定房源数据与用户数据快照
+    MOCK_FIXED_HOUSING_FILE: str = os.getenv("MOCK_FIXED_HOUSING_FILE", os.path.join(BASE_DIR, "fixed_housing_test_data.json"))
+    MOCK_USER_DATA_FILE: str = os.getenv("MOCK_USER_DATA_FILE", os.path.join(BASE_DIR, "test_user_data.json"))
+    
+    # 模拟数据用户变更日志：fsync 批量间隔（秒，0 表示每次写入都 fsync）及触发快照合并的记录数
+    USER_JOURNAL_FSYNC_INTERVAL: float = float(os.getenv("USER_JOURNAL_FSYNC_INTERVAL", 0.05))
+    USER_JOURNAL_COMPACT_RECORDS: int = int(os.getenv("USER_JOURNAL_COMPACT_RECORDS", 10000))
+    
+    # 候选人排序配置：候选数据变化后快照最短重建间隔（秒）
+    RANKING_SNAPSHOT_MAX_AGE: float = float(os.getenv("RANKING_SNAPSHOT_MAX_AGE", 5))
     
     class Config:
         env_file = ".env"
@@ -1,27 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
+"""
+数据库兼容模块
+引擎、会话和连接池统一由 app.utils.db_config 创建，此处仅做转导出，避免对同一数据库维护两个连接池
+"""
 
-# 数据库配置
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./vmatch_dev.db")
+from app.utils.db_config import DATABASE_URL, engine, SessionLocal, Base, get_db, pool_status
 
-# 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
-
-# 创建会话
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# 基础模型
-Base = declarative_base()
-
-# 依赖注入：获取数据库会话
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+__all__ = ["DATABASE_URL", "engine", "SessionLocal", "Base", "get_db", "pool_status"]
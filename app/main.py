@@ -1,19 +1,48 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.routers import user, match, profile, auth, membership, membership_orders, scenes, file, properties
+from app.routers import user, match, profile, auth, membership, membership_orders, scenes, file, properties, system, media, chat
 from app.routers.profile_by_id import router as profile_by_id_router
+from app.utils.startup import startup_state
 from app.utils.db_init import init_db
+from app.services.image_variants import image_variant_pipeline
+from app.services.chat_pubsub import chat_hub
+from app.services.chat_read_state import chat_read_tracker
+from app.utils.request_limits import RequestBodyLimitMiddleware
+from app.utils.upload_sniff import UploadSniffMiddleware
 from app.config import settings
 import os
 
+upload_path = os.path.abspath(settings.UPLOAD_DIR)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 上传目录和建表很快，同步完成，数据库路由处理请求时表结构已就绪；加载模拟数据在后台预热，不阻塞 worker 启动
+    os.makedirs(upload_path, exist_ok=True)
+    image_variant_pipeline.check_dependencies()
+    init_db()
+    startup_state.start()
+    yield
+    # 等待进行中的图片变体生成完成，避免留下临时文件
+    image_variant_pipeline.shutdown()
+    # 退订跨节点广播
+    if chat_hub.initialized:
+        await chat_hub.close()
+    # 写入尚未落库的已读状态
+    if chat_read_tracker.initialized:
+        chat_read_tracker.close()
+
 # 初始化应用
 app = FastAPI(
     title="VMatch API",
     description="VMatch Backend API for WeChat Mini Program",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# 上传接口先核对文件类型和文件头，不符时不再接收剩余请求体（位于 CORS 内层，错误响应同样带跨域头）
+app.add_middleware(UploadSniffMiddleware, paths=["/api/v1/files/upload"])
+
 # 添加CORS中间件支持前后端联调
 app.add_middleware(
     CORSMiddleware,
@@ -23,25 +52,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 初始化数据库
-init_db()
+# 上传接口的请求体上限：超出时在解析表单之前就中止
+app.add_middleware(
+    RequestBodyLimitMiddleware,
+    limits={"/api/v1/files/upload": max(settings.MAX_IMAGE_SIZE, settings.MAX_VIDEO_SIZE) + settings.UPLOAD_FORM_OVERHEAD},
+)
 
-# 确保上传目录存在并挂载静态文件
-upload_path = os.path.abspath(settings.UPLOAD_DIR)
-os.makedirs(upload_path, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=upload_path), name="uploads")
+# 上传文件访问：支持 Range、条件请求和长期缓存（目录在 lifespan 中创建）
+app.include_router(media.router)
 
 # 包含路由
 app.include_router(auth.router, prefix="/api/v1/auth")
 app.include_router(user.router, prefix="/api/v1")
 app.include_router(match.router, prefix="/api/v1")
 app.include_router(profile.router, prefix="/api/v1")
+app.include_router(chat.router, prefix="/api/v1/chat")
 app.include_router(membership.router, prefix="/api/v1")
 app.include_router(membership_orders.router, prefix="/api/v1")
 app.include_router(scenes.router, prefix="/api/v1")
 app.include_router(file.router, prefix="/api/v1/files")
 app.include_router(properties.router, prefix="/api/v1")
 app.include_router(profile_by_id_router, prefix="/api/v1")
+app.include_router(system.router, prefix="/api/v1")
 
 @app.get("/")
 def read_root():
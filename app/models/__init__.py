@@ -1,3 +1,4 @@
 from app.models.user import User
 from app.models.user_profile import UserProfile
 from app.models.match import Match, MatchDetail
+from app.models.chat_message import ChatMessage, ChatReadState
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, Index
+from app.utils.db_config import Base
+
+class ChatMessage(Base):
+    """聊天消息表 - 按 (match_id, timestamp, id) 索引，历史记录分页直接沿索引读取"""
+    __tablename__ = "chat_messages"
+
+    id = Column(String, primary_key=True)  # 消息ID，按发送时间递增（见 chat_store）
+    match_id = Column(String, nullable=False)  # 匹配ID
+    sender_id = Column(String, nullable=False)  # 发送者ID
+    msg_type = Column(String, nullable=False, default="text")  # 消息类型：text, image, voice
+    content = Column(Text, nullable=False)  # 消息内容
+    sender_name = Column(String, nullable=True)  # 发送时的发送者名称
+    sender_avatar = Column(String, nullable=True)  # 发送时的发送者头像
+    timestamp = Column(Integer, nullable=False)  # 发送时间（秒）
+    is_read = Column(Boolean, default=False)  # 是否已读
+
+    __table_args__ = (
+        Index("ix_chat_messages_match_time", "match_id", "timestamp", "id"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "content": self.content,
+            "type": self.msg_type,
+            "senderId": self.sender_id,
+            "senderAvatar": self.sender_avatar or "",
+            "senderName": self.sender_name or "",
+            "timestamp": self.timestamp,
+            "isRead": bool(self.is_read),
+        }
+
+
+class ChatReadState(Base):
+    """用户的会话摘要 - 已读水位（最后已读的消息ID）、未读计数与最后一条消息预览，
+    按 (user_id, last_message_at, match_id) 索引，会话列表一次查询读取，不再逐个会话查消息"""
+    __tablename__ = "chat_read_states"
+
+    match_id = Column(String, primary_key=True)  # 匹配ID
+    user_id = Column(String, primary_key=True)  # 用户ID
+    peer_id = Column(String, nullable=True)  # 会话对方的用户ID
+    last_read_id = Column(String, nullable=True)  # 最后已读的消息ID，之前（含）的消息均已读
+    last_read_at = Column(Integer, nullable=True)  # 最后标记已读的时间（秒）
+    unread = Column(Integer, nullable=False, default=0)  # 水位之后其他人发送的消息数
+    last_message_id = Column(String, nullable=True)  # 最后一条消息ID
+    last_message_type = Column(String, nullable=True)  # 最后一条消息类型
+    last_message_preview = Column(String, nullable=True)  # 最后一条消息预览（截断的文本）
+    last_sender_id = Column(String, nullable=True)  # 最后一条消息的发送者
+    last_message_at = Column(Integer, nullable=False, default=0)  # 最后一条消息时间（没有消息时为匹配时间）
+
+    __table_args__ = (
+        Index("ix_chat_read_states_user_recent", "user_id", "last_message_at", "match_id"),
+    )
@@ -142,6 +142,22 @@ class ProfileUpdateRequest(BaseModel):
 class FileUploadResponse(BaseModel):
     url: str = Field(..., description="文件URL")
 
+class ResumableUploadInitRequest(BaseModel):
+    filename: str = Field(..., description="原始文件名")
+    content_type: str = Field(..., description="文件MIME类型")
+    size: int = Field(..., gt=0, description="文件总大小（字节）")
+    chunk_size: Optional[int] = Field(None, gt=0, description="分片大小（字节），不传使用服务端默认值")
+    sha256: Optional[str] = Field(None, description="整个文件的SHA-256（十六进制），完成时校验")
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str = Field(..., description="上传会话ID")
+    size: int = Field(..., description="文件总大小")
+    chunk_size: int = Field(..., description="分片大小")
+    total_chunks: int = Field(..., description="分片总数")
+    received: List[int] = Field(..., description="已接收的分片序号")
+    missing: List[int] = Field(..., description="尚未接收的分片序号")
+    expires_at: float = Field(..., description="会话过期时间（Unix时间戳）")
+
 # 场景配置相关模型
 class SceneRole(BaseModel):
     key: str = Field(..., description="角色标识")
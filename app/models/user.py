@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.utils.db_config import Base
@@ -9,6 +9,7 @@ class User(Base):
     id = Column(String, primary_key=True, index=True)  # 改为String类型支持字符串ID
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
+    openid = Column(String, unique=True, index=True, nullable=True)  # 微信openid
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     
@@ -19,12 +20,14 @@ class User(Base):
     age = Column(Integer, nullable=True)  # 年龄
     occupation = Column(String, nullable=True)  # 职业
     location = Column(JSON, nullable=True)  # 位置信息
+    latitude = Column(Float, nullable=True)  # 纬度，由 location 归一化得到
+    longitude = Column(Float, nullable=True)  # 经度
     bio = Column(Text, nullable=True)  # 个人简介
     match_type = Column(String, nullable=True)  # 匹配类型
     user_role = Column(String, nullable=True)  # 用户角色
     interests = Column(JSON, nullable=True)  # 兴趣爱好
     preferences = Column(JSON, nullable=True)  # 偏好设置
-    phone = Column(String, nullable=True)  # 电话
+    phone = Column(String, unique=True, index=True, nullable=True)  # 电话
     education = Column(String, nullable=True)  # 教育背景
     join_date = Column(Integer, nullable=True)  # 加入时间戳
     
@@ -9,7 +9,9 @@ from app.services.auth import auth_service
 from app.utils.auth import get_current_user
 from app.dependencies import get_auth_service
 from pydantic import ValidationError
+from app.utils.logger import get_logger
 
+logger = get_logger(__name__)
 router = APIRouter()
 
 @router.post("/sessions", response_model=BaseResponse)
@@ -64,7 +66,7 @@ async def login(
         # Handle value errors
         return BaseResponse(code=422, message=str(e))
     except Exception as e:
-        print(f"Login error: {str(e)}")  # Debug print
+        logger.exception("login_failed")
         return BaseResponse(code=1001, message=str(e))
 
 @router.post("/sessions/phone", response_model=BaseResponse)
@@ -143,8 +145,11 @@ async def get_current_session(
     )
 
 @router.delete("/sessions/current", response_model=BaseResponse)
-async def logout():
-    # 登出操作
+async def logout(request: Request):
+    # 登出操作：失效当前token的验证缓存
+    auth_header = request.headers.get("authorization", "")
+    if auth_header.startswith("Bearer "):
+        auth_service.logout(token=auth_header.split(" ", 1)[1])
     return BaseResponse(
         code=0,
         message="Logged out successfully"
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, Query, Path, Request, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Path, Request, HTTPException, status, WebSocket, WebSocketDisconnect
 from app.models.schemas import (
     ChatHistoryResponse, SendMessageRequest, SendMessageResponse, 
     ReadMessageRequest, BaseResponse
 )
+from starlette.concurrency import run_in_threadpool
 from app.services.auth import auth_service
 from app.services.mock_data import mock_data_service
+from app.services.chat_store import InvalidCursorError
+from app.services.chat_pubsub import chat_hub, ChatSubscriber
+from app.utils.logger import get_logger
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
+import json
+import time
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -21,8 +30,9 @@ class SendMessageRequestModel(BaseModel):
 @router.get("/history", response_model=BaseResponse)
 async def get_chat_history_query(
     matchId: Optional[str] = Query(None, description="匹配ID"),
-    page: int = Query(1, ge=1, description="页码"),
     pageSize: int = Query(20, ge=1, le=100, description="每页数量"),
+    before: Optional[str] = Query(None, description="读取该消息之前（更早）的消息"),
+    after: Optional[str] = Query(None, description="读取该消息之后（更新）的消息"),
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
 ):
     """通过查询参数获取聊天记录"""
@@ -32,25 +42,34 @@ async def get_chat_history_query(
             detail="缺少必要参数"
         )
     
-    return await get_chat_history_internal(matchId, page, pageSize, current_user)
+    return await get_chat_history_internal(matchId, pageSize, before, after, current_user)
 
 @router.get("/history/{matchId}", response_model=BaseResponse)
 async def get_chat_history(
     matchId: str = Path(..., description="匹配ID"),
-    page: int = Query(1, ge=1, description="页码"),
     limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    before: Optional[str] = Query(None, description="读取该消息之前（更早）的消息"),
+    after: Optional[str] = Query(None, description="读取该消息之后（更新）的消息"),
     current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
 ):
     """通过路径参数获取聊天记录"""
-    return await get_chat_history_internal(matchId, page, limit, current_user)
+    return await get_chat_history_internal(matchId, limit, before, after, current_user)
 
 async def get_chat_history_internal(
     matchId: str,
-    page: int,
     limit: int,
+    before: Optional[str],
+    after: Optional[str],
     current_user: Dict[str, Any]
 ):
-    """获取聊天记录内部实现"""
+    """获取聊天记录内部实现：消息从新到旧，before 向前翻页，after 拉取新消息"""
+    if before and after:
+        return BaseResponse(
+            code=400,
+            message="before 和 after 不能同时使用",
+            data=None
+        )
+    
     # 检查匹配是否存在
     match = mock_data_service.matches.get(matchId)
     if not match:
@@ -61,20 +80,37 @@ async def get_chat_history_internal(
         )
     
     # 检查用户是否有权限查看该匹配的聊天记录
-    if match["userId1"] != current_user["id"] and match["userId2"] != current_user["id"]:
+    if not mock_data_service.is_match_participant(matchId, current_user["id"]):
         return BaseResponse(
             code=403,
             message="权限不足",
             data=None
         )
     
-    result = mock_data_service.get_chat_history(matchId, page, limit)
+    try:
+        result = await run_in_threadpool(
+            mock_data_service.get_chat_history, matchId, limit, before=before, after=after
+        )
+    except InvalidCursorError:
+        return BaseResponse(
+            code=400,
+            message="无效的游标",
+            data=None
+        )
     return BaseResponse(
         code=0,
         message="success",
         data=result
     )
 
+async def _publish(recipients, event: Dict[str, Any]):
+    """推送实时事件；数据已经保存，推送失败（如 broker 不可用）只记录日志，不影响接口结果，
+    客户端重连后用 /history 的 after 游标补齐"""
+    try:
+        await chat_hub.publish(recipients, event)
+    except Exception as e:
+        logger.warning("chat_publish_failed", event_type=event.get("type"), match_id=event.get("matchId"), error=str(e))
+
 @router.post("/send", response_model=BaseResponse)
 async def send_message(
     request: SendMessageRequestModel,
@@ -92,20 +128,27 @@ async def send_message(
             )
         
         # 检查用户是否有权限发送消息
-        if match["userId1"] != current_user["id"] and match["userId2"] != current_user["id"]:
+        if not mock_data_service.is_match_participant(request.matchId, current_user["id"]):
             return BaseResponse(
                 code=403,
                 message="权限不足",
                 data=None
             )
         
-        result = mock_data_service.send_message(
-            request.matchId, 
+        result = await run_in_threadpool(
+            mock_data_service.send_message,
+            request.matchId,
             current_user["id"], 
             request.content, 
             request.type
         )
         
+        # 推送给双方的所有在线连接（发送者的其他设备同步显示）
+        await _publish(
+            [match["userId1"], match["userId2"]],
+            {"type": "message", "matchId": request.matchId, "message": result}
+        )
+        
         return BaseResponse(
             code=0,
             message="success",
@@ -137,18 +180,126 @@ async def mark_messages_read(
         )
     
     # 检查用户是否有权限标记消息已读
-    if match["userId1"] != current_user["id"] and match["userId2"] != current_user["id"]:
+    if not mock_data_service.is_match_participant(request.matchId, current_user["id"]):
         return BaseResponse(
             code=403,
             message="权限不足",
             data=None
         )
     
-    # 标记消息已读
-    # 在测试模式下，直接返回成功
-    # 生产环境中需要更新数据库中的消息状态
+    # 只移动已读水位，不逐条更新消息；写入由后台按批次合并
+    result = await run_in_threadpool(mock_data_service.mark_messages_read, request.matchId, current_user["id"])
+    
+    # 已读回执推送给双方
+    await _publish(
+        [match["userId1"], match["userId2"]],
+        {
+            "type": "read",
+            "matchId": request.matchId,
+            "userId": current_user["id"],
+            "lastReadId": result["lastReadId"],
+            "timestamp": int(time.time())
+        }
+    )
+    return BaseResponse(
+        code=0,
+        message="success",
+        data={"success": True, **result}
+    )
+
+@router.get("/conversations", response_model=BaseResponse)
+async def get_conversations(
+    pageSize: int = Query(20, ge=1, le=100, description="每页数量"),
+    before: Optional[str] = Query(None, description="上一页最后一个会话的匹配ID"),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
+):
+    """获取会话列表：每个会话的对方信息、最后一条消息预览与未读数，最近有消息的在前"""
+    try:
+        result = await run_in_threadpool(
+            mock_data_service.get_conversations, current_user["id"], pageSize, before=before
+        )
+    except InvalidCursorError:
+        return BaseResponse(
+            code=400,
+            message="无效的游标",
+            data=None
+        )
     return BaseResponse(
         code=0,
         message="success",
-        data={"success": True}
-    )
\ No newline at end of file
+        data=result
+    )
+
+@router.get("/unread", response_model=BaseResponse)
+async def get_unread_counts(
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
+):
+    """获取各会话的未读消息数"""
+    result = await run_in_threadpool(mock_data_service.get_unread_counts, current_user["id"])
+    return BaseResponse(
+        code=0,
+        message="success",
+        data=result
+    )
+
+async def _forward_events(websocket: WebSocket, subscriber: ChatSubscriber):
+    while True:
+        event = await subscriber.get()
+        await websocket.send_json(event)
+
+async def _receive_messages(websocket: WebSocket, subscriber: ChatSubscriber):
+    """接收客户端消息直到断开；二进制帧和非 JSON 文本直接忽略"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        text = message.get("text")
+        if text is None:
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and data.get("type") == "ping":
+            subscriber.offer({"type": "pong"})
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    聊天实时推送
+    
+    认证使用 Authorization: Bearer <token> 请求头或 token 查询参数；认证失败以 4401 关闭。
+    推送事件：{"type": "message", "matchId", "message"}（新消息）、
+    {"type": "read", "matchId", "userId", "lastReadId", "timestamp"}（已读回执）。
+    客户端发送 {"type": "ping"} 时回复 {"type": "pong"}
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.startswith("Bearer "):
+        token = authorization.split(" ")[1]
+    user = auth_service.get_user_from_token(token) if token else None
+    if not user:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    await chat_hub.start()
+    subscriber = chat_hub.connect(user["id"])
+    # 推送与接收在两个任务中进行，任一结束（客户端断开或推送失败）即结束连接
+    forwarder = asyncio.create_task(_forward_events(websocket, subscriber))
+    receiver = asyncio.create_task(_receive_messages(websocket, subscriber))
+    try:
+        await asyncio.wait({forwarder, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        if forwarder.done() and not forwarder.cancelled() and forwarder.exception() is not None:
+            logger.warning("chat_ws_forward_failed", user_id=subscriber.user_id, error=str(forwarder.exception()))
+            # 推送中断后客户端收不到事件，关闭连接让客户端重连并用 after 游标补齐
+            try:
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except Exception:
+                pass
+        elif receiver.done() and not receiver.cancelled() and receiver.exception() is not None:
+            if not isinstance(receiver.exception(), WebSocketDisconnect):
+                logger.warning("chat_ws_receive_failed", user_id=subscriber.user_id, error=str(receiver.exception()))
+    finally:
+        forwarder.cancel()
+        receiver.cancel()
+        chat_hub.disconnect(subscriber)
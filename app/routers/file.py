@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form
-from app.models.schemas import FileUploadResponse, BaseResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Request, Header
+from app.models.schemas import FileUploadResponse, BaseResponse, ResumableUploadInitRequest, ResumableUploadStatus
 from app.services.auth import auth_service
 from app.services.mock_data import mock_data_service
+from app.services.file_storage import (
+    save_upload, resolve_upload_type, size_limit_message, UploadRejectedError, UploadTooLargeError
+)
+from app.services.storage_backend import storage_backend
+from app.services.image_variants import image_variant_pipeline, is_variant
+from app.services.storage_quota import storage_quota, QuotaExceededError
+from app.services.resumable_upload import resumable_upload_store, ResumableUploadError
 from typing import Dict, Any, Optional
 from app.config import settings
-import os
-import uuid
 
 router = APIRouter()
 
+def _upload_user_id(current_user: Optional[Dict[str, Any]]) -> str:
+    return str(current_user.get('id', 'anonymous')) if current_user else 'anonymous'
+
+def _resumable_error(e: ResumableUploadError) -> BaseResponse:
+    return BaseResponse(code=e.code, message=e.message, data=e.data)
+
+def _submit_variants(file_url: str):
+    # 变体在本机生成，只有本地存储的文件有本机路径
+    file_path = storage_backend.local_path(file_url[len("/uploads/"):])
+    if file_path is not None:
+        image_variant_pipeline.submit(file_path)
+
 @router.post("/upload", response_model=BaseResponse)
 async def upload_file(
     file: UploadFile = File(...),
@@ -30,113 +47,78 @@ async def upload_file(
     - 成功：返回文件访问URL
     - 失败：返回错误信息
     """
-    # 验证文件类型 - 支持图片和视频
-    allowed_image_types = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"]
-    allowed_video_types = ["video/mp4", "video/avi", "video/mov", "video/wmv", "video/flv", "video/webm", "video/mkv", "video/3gp"]
-    
-    if not file.content_type:
-        return BaseResponse(
-            code=400,
-            message="无法识别文件类型",
-            data=None
-        )
-    
-    is_image = file.content_type in allowed_image_types
-    is_video = file.content_type in allowed_video_types
-    
-    if not is_image and not is_video:
-        return BaseResponse(
-            code=400,
-            message="请上传图片或视频文件。支持的图片格式：JPEG, PNG, GIF, WebP；支持的视频格式：MP4, AVI, MOV, WMV, FLV, WebM, MKV, 3GP",
-            data=None
-        )
-    
-    # 验证文件大小
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    
-    # 根据文件类型设置不同的大小限制
-    if is_image:
-        max_file_size = getattr(settings, 'MAX_IMAGE_SIZE', 10 * 1024 * 1024)  # 图片默认10MB
-        file_type_name = "图片"
-    else:  # is_video
-        max_file_size = getattr(settings, 'MAX_VIDEO_SIZE', 500 * 1024 * 1024)  # 视频默认500MB
-        file_type_name = "视频"
-    
-    if file_size > max_file_size:
+    # 验证文件类型与扩展名 - 支持图片和视频
+    try:
+        file_ext, max_file_size, file_type_name = resolve_upload_type(file.content_type, file.filename)
+    except UploadRejectedError as e:
         return BaseResponse(
             code=400,
-            message=f"{file_type_name}文件大小超过限制，最大允许 {max_file_size // (1024 * 1024)}MB",
+            message=str(e),
             data=None
         )
     
-    # 重置文件指针，因为我们已经读取了文件内容
-    await file.seek(0)
-    
     # 保存文件到本地
     try:
         # 获取用户ID，如果未登录则使用默认目录
-        user_id = current_user.get('id', 'anonymous') if current_user else 'anonymous'
-        
-        # 创建用户专属的上传目录
-        user_upload_dir = os.path.join(settings.UPLOAD_DIR, str(user_id))
-        os.makedirs(user_upload_dir, exist_ok=True)
+        user_id = _upload_user_id(current_user)
         
-        # 生成唯一文件名
-        filename = file.filename or "unknown"
-        file_ext = os.path.splitext(filename)[1].lower()
-        
-        # 验证文件扩展名
-        allowed_image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-        allowed_video_exts = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.3gp']
+        # 写入磁盘之前检查存储配额并预留空间（只查账本，不遍历目录），并发上传不会一起超出配额
+        try:
+            reserved = storage_quota.reserve(user_id, file.size or 0)
+        except QuotaExceededError as e:
+            return BaseResponse(
+                code=400,
+                message=str(e),
+                data=None
+            )
         
-        if is_image and file_ext not in allowed_image_exts:
+        # 分块写入临时文件，先核对文件头再边写边检查大小限制；文件名由内容哈希决定，相同内容只存一份
+        try:
+            file_name, file_size, created = await save_upload(
+                file, user_id, file_ext, max_file_size, content_type=file.content_type
+            )
+        except UploadTooLargeError:
+            storage_quota.cancel_reservation(user_id, reserved)
             return BaseResponse(
                 code=400,
-                message=f"图片文件扩展名不支持，支持的扩展名：{', '.join(allowed_image_exts)}",
+                message=size_limit_message(file_type_name, max_file_size),
                 data=None
             )
-        elif is_video and file_ext not in allowed_video_exts:
+        except UploadRejectedError as e:
+            storage_quota.cancel_reservation(user_id, reserved)
             return BaseResponse(
                 code=400,
-                message=f"视频文件扩展名不支持，支持的扩展名：{', '.join(allowed_video_exts)}",
+                message=str(e),
                 data=None
             )
+        except BaseException:
+            storage_quota.cancel_reservation(user_id, reserved)
+            raise
         
-        # 如果没有扩展名，根据content_type添加默认扩展名
-        if not file_ext:
-            if is_image:
-                if 'jpeg' in file.content_type or 'jpg' in file.content_type:
-                    file_ext = '.jpg'
-                elif 'png' in file.content_type:
-                    file_ext = '.png'
-                elif 'gif' in file.content_type:
-                    file_ext = '.gif'
-                elif 'webp' in file.content_type:
-                    file_ext = '.webp'
-                else:
-                    file_ext = '.jpg'  # 默认
-            else:  # is_video
-                if 'mp4' in file.content_type:
-                    file_ext = '.mp4'
-                elif 'avi' in file.content_type:
-                    file_ext = '.avi'
-                elif 'mov' in file.content_type:
-                    file_ext = '.mov'
-                else:
-                    file_ext = '.mp4'  # 默认
-        
-        file_name = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(user_upload_dir, file_name)
-        
-        # 保存文件
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # 请求没有声明文件大小时预留不足，按实际大小补足预留再计入；超出配额时删除刚写入的文件
+        if created and file_size > reserved:
+            try:
+                reserved += storage_quota.reserve(user_id, file_size - reserved)
+            except QuotaExceededError as e:
+                storage_quota.cancel_reservation(user_id, reserved)
+                storage_backend.delete(f"{user_id}/{file_name}")
+                return BaseResponse(
+                    code=400,
+                    message=str(e),
+                    data=None
+                )
+
+        # 重复上传同一内容不新增文件，不重复计入配额
+        if created:
+            storage_quota.commit_reservation(user_id, reserved, file_size)
+        else:
+            storage_quota.cancel_reservation(user_id, reserved)
         
         # 返回文件URL（包含用户ID路径）
         file_url = f"/uploads/{user_id}/{file_name}"
+        
+        # 后台生成缩略图等变体，不阻塞响应
+        _submit_variants(file_url)
         return BaseResponse(
             code=0,
             message="success",
@@ -149,6 +131,89 @@ async def upload_file(
             data=None
         )
 
+@router.post("/uploads", response_model=BaseResponse)
+async def initiate_resumable_upload(
+    request: ResumableUploadInitRequest,
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user_optional)
+):
+    """
+    创建断点续传会话（适用于大视频）
+    
+    流程：
+    1. POST /uploads 创建会话，返回 upload_id、分片大小和分片总数
+    2. PUT /uploads/{upload_id}/chunks/{index} 上传分片，请求体为分片原始字节，可乱序、可重传；
+       可选请求头 X-Chunk-Sha256 校验分片内容
+    3. 断线后 GET /uploads/{upload_id} 查询缺失的分片并补传
+    4. POST /uploads/{upload_id}/complete 合并分片，返回与普通上传相同格式的文件URL
+    """
+    # 创建会话时按声明的大小预留存储配额，超出配额或未完成的会话过多时拒绝
+    try:
+        status = resumable_upload_store.initiate(
+            _upload_user_id(current_user),
+            request.filename,
+            request.content_type,
+            request.size,
+            chunk_size=request.chunk_size,
+            sha256=request.sha256
+        )
+    except ResumableUploadError as e:
+        return _resumable_error(e)
+    return BaseResponse(code=0, message="success", data=ResumableUploadStatus(**status))
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=BaseResponse)
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user_optional)
+):
+    """上传单个分片，请求体为分片原始字节"""
+    try:
+        received = await resumable_upload_store.write_chunk(
+            upload_id, _upload_user_id(current_user), index, request.stream(), sha256=x_chunk_sha256
+        )
+    except ResumableUploadError as e:
+        return _resumable_error(e)
+    return BaseResponse(code=0, message="success", data={"index": index, "size": received})
+
+@router.get("/uploads/{upload_id}", response_model=BaseResponse)
+async def get_resumable_upload(
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user_optional)
+):
+    """查询上传会话状态（已接收与缺失的分片）"""
+    try:
+        status = resumable_upload_store.status(upload_id, _upload_user_id(current_user))
+    except ResumableUploadError as e:
+        return _resumable_error(e)
+    return BaseResponse(code=0, message="success", data=ResumableUploadStatus(**status))
+
+@router.post("/uploads/{upload_id}/complete", response_model=BaseResponse)
+async def complete_resumable_upload(
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user_optional)
+):
+    """合并分片并返回文件URL（创建会话时预留的配额在合并成功后转为实际占用）"""
+    try:
+        file_url, _, _ = await resumable_upload_store.complete(upload_id, _upload_user_id(current_user))
+    except ResumableUploadError as e:
+        return _resumable_error(e)
+    _submit_variants(file_url)
+    return BaseResponse(code=0, message="success", data=FileUploadResponse(url=file_url))
+
+@router.delete("/uploads/{upload_id}", response_model=BaseResponse)
+async def abort_resumable_upload(
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user_optional)
+):
+    """取消上传并删除已接收的分片"""
+    try:
+        resumable_upload_store.abort(upload_id, _upload_user_id(current_user))
+    except ResumableUploadError as e:
+        return _resumable_error(e)
+    return BaseResponse(code=0, message="上传已取消", data=None)
+
 @router.delete("/delete", response_model=BaseResponse)
 async def delete_file(
     file_url: str = Form(...),
@@ -172,32 +237,43 @@ async def delete_file(
             if len(path_parts) >= 2:
                 # 新格式：/uploads/user_id/filename
                 url_user_id = path_parts[0]
-                file_name = "/".join(path_parts[1:])  # 支持多级路径
                 
                 # 验证用户权限：只能删除自己的文件
-                if current_user and str(current_user.get('user_id')) != url_user_id:
+                if current_user and _upload_user_id(current_user) != url_user_id:
                     return BaseResponse(
                         code=403,
                         message="无权限删除此文件",
                         data=None
                     )
                 
-                file_path = os.path.join(settings.UPLOAD_DIR, url_user_id, file_name)
-            else:
-                # 兼容旧格式：/uploads/filename（直接在根目录）
-                file_name = path_parts[0]
-                file_path = os.path.join(settings.UPLOAD_DIR, file_name)
+            # 缩略图变体随原图删除，不能单独删除（也从未计入配额）
+            if is_variant(path_parts[-1]):
+                return BaseResponse(
+                    code=400,
+                    message="缩略图随原图一起删除，请删除原图",
+                    data=None
+                )
+            
+            # 存储键即 /uploads/ 之后的路径；兼容旧格式：/uploads/filename（直接在根目录）
+            file_key = "/".join(path_parts)
             
             # 检查文件是否存在
-            if not os.path.exists(file_path):
+            stat_result = storage_backend.stat(file_key)
+            if stat_result is None:
                 return BaseResponse(
                     code=404,
                     message="文件不存在",
                     data=None
                 )
             
-            # 删除文件
-            os.remove(file_path)
+            # 删除文件；本地存储中内容的最后一个引用删除后才释放磁盘
+            file_size = stat_result.st_size
+            file_path = storage_backend.local_path(file_key)
+            storage_backend.delete(file_key)
+            if file_path is not None:
+                image_variant_pipeline.remove_variants(file_path)
+            if len(path_parts) >= 2:
+                storage_quota.release(url_user_id, file_size)
             return BaseResponse(
                 code=0,
                 message="文件删除成功",
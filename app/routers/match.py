@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from app.utils.db_config import get_db
 from app.services import db_service
+from app.services.auth import auth_service
+from app.services.data_adapter import data_service
 from app.services.mock_data import mock_data_service
+from app.utils.geo import location_of
 
 router = APIRouter(
     prefix="/matches",
@@ -79,10 +82,73 @@ def get_match_cards(
     matchType: str = Query(...),
     userRole: str = Query(...),
     page: int = Query(1),
-    pageSize: int = Query(10)
+    pageSize: int = Query(10),
+    cursor: Optional[str] = Query(None, description="游标，传入后按游标分页（空字符串表示第一页）"),
+    sortBy: Optional[str] = Query(None, description="排序方式，score 表示按当前用户偏好排序"),
+    maxDistance: Optional[float] = Query(None, gt=0, description="只返回该半径（公里）内的卡片"),
+    latitude: Optional[float] = Query(None, ge=-90, le=90, description="请求方纬度，不传时使用用户资料中的位置"),
+    longitude: Optional[float] = Query(None, ge=-180, le=180, description="请求方经度"),
+    current_user: Optional[Dict[str, Any]] = Depends(auth_service.get_current_user_optional)
 ):
+    # 请求方位置：优先使用请求参数，其次使用用户资料
+    if latitude is not None and longitude is not None:
+        origin = (latitude, longitude)
+    else:
+        origin = location_of(current_user)
+    if maxDistance is not None and origin is None:
+        raise HTTPException(status_code=400, detail="Location required for distance filter")
+
+    if sortBy == "score":
+        # 按偏好排序：从用户/角色资料中为当前用户挑选候选人
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        requester = current_user
+        if origin is not None:
+            requester = {**current_user, "latitude": origin[0], "longitude": origin[1]}
+        result = data_service.get_ranked_cards(
+            requester, match_type=matchType, user_role=userRole, page=page, page_size=pageSize,
+            radius_km=maxDistance
+        )
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "cards": result["list"],
+                "pagination": {
+                    "page": result["page"],
+                    "pageSize": result["pageSize"],
+                    "total": result["total"],
+                    "hasMore": result["page"] * result["pageSize"] < result["total"],
+                },
+            },
+        }
+
+    if cursor is not None:
+        # 游标模式：每页 O(pageSize)，不统计总数
+        try:
+            result = mock_data_service.get_cards_by_cursor(
+                match_type=matchType, user_role=userRole, cursor=cursor, page_size=pageSize,
+                origin=origin, radius_km=maxDistance
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "cards": result["list"],
+                "pagination": {
+                    "pageSize": result["pageSize"],
+                    "hasMore": result["hasMore"],
+                },
+                "cursor": cursor,
+                "nextCursor": result["nextCursor"],
+            },
+        }
+
     result = mock_data_service.get_cards(
-        match_type=matchType, user_role=userRole, page=page, page_size=pageSize
+        match_type=matchType, user_role=userRole, page=page, page_size=pageSize,
+        origin=origin, radius_km=maxDistance
     )
     return {
         "code": 0,
@@ -95,6 +161,7 @@ def get_match_cards(
                 "total": result["total"],
                 "hasMore": result["page"] * result["pageSize"] < result["total"],
             },
+            "nextCursor": result["nextCursor"],
         },
     }
 
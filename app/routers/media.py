@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.services.storage_backend import storage_backend
+
+router = APIRouter(tags=["media"])
+
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_upload(file_path: str, request: Request):
+    """
+    上传文件访问（替代 StaticFiles 挂载，地址不变）
+    
+    支持 Range 断点/拖动播放、ETag 与 If-None-Match 条件请求；
+    内容寻址的文件使用长期 immutable 缓存。文件保存在对象存储时由当前节点转发读取
+    """
+    try:
+        return await run_in_threadpool(
+            storage_backend.media_response, file_path, request.headers, request.method != "HEAD"
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not Found")
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app.models.order import MembershipOrder, OrderStatus
-from app.database import get_db
+from app.utils.db_config import get_async_db
+from app.services import async_db_service
 from datetime import datetime
 
 router = APIRouter(prefix="/memberships", tags=["membership_orders"])
@@ -13,7 +14,7 @@ async def get_membership_orders(
     status: Optional[str] = Query(None, description="订单状态: pending, paid, cancelled, refunded"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询用户的会员订单列表
@@ -24,26 +25,19 @@ async def get_membership_orders(
     - **page_size**: 每页数量，最大100
     """
     try:
-        # 构建查询
-        query = db.query(MembershipOrder).filter(MembershipOrder.user_id == user_id)
-        
         # 状态过滤
+        status_enum = None
         if status:
             try:
                 status_enum = OrderStatus(status)
-                query = query.filter(MembershipOrder.status == status_enum)
             except ValueError:
                 raise HTTPException(status_code=400, detail=f"无效的订单状态: {status}")
         
-        # 按创建时间倒序排列
-        query = query.order_by(MembershipOrder.created_at.desc())
-        
-        # 分页
+        # 按创建时间倒序分页查询，同时获取总数
         offset = (page - 1) * page_size
-        orders = query.offset(offset).limit(page_size).all()
-        
-        # 获取总数
-        total = query.count()
+        orders, total = await async_db_service.get_membership_orders(
+            db, user_id, status=status_enum, skip=offset, limit=page_size
+        )
         
         return {
             "code": 200,
@@ -66,7 +60,7 @@ async def get_membership_orders(
 async def get_membership_order(
     order_id: str,
     user_id: str = Query(..., description="用户ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     根据订单ID查询单个会员订单详情
@@ -75,10 +69,7 @@ async def get_membership_order(
     - **user_id**: 用户ID（用于权限验证）
     """
     try:
-        order = db.query(MembershipOrder).filter(
-            MembershipOrder.id == order_id,
-            MembershipOrder.user_id == user_id
-        ).first()
+        order = await async_db_service.get_membership_order(db, order_id, user_id)
         
         if not order:
             raise HTTPException(status_code=404, detail="订单不存在")
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.utils.db_config import get_db
 from app.services.user_profile_service import UserProfileService
+from app.services.image_variants import image_variant_pipeline
+from app.config import settings
 
 router = APIRouter(
     prefix="/profiles",
@@ -30,5 +32,5 @@ def get_profile_details(
     return {
         "code": 0,
         "message": "success",
-        "data": full_profile
+        "data": image_variant_pipeline.with_variants(full_profile, ("avatar_url",), settings.PROFILE_IMAGE_WIDTH)
     }
\ No newline at end of file
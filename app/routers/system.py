@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from typing import Dict, Any
+from app.models.schemas import BaseResponse
+from app.services.auth import auth_service
+from app.services.token_cache import token_cache
+from app.services.image_variants import image_variant_pipeline
+from app.services.storage_quota import storage_quota
+from app.services.chat_pubsub import chat_hub
+from app.services.chat_read_state import chat_read_tracker
+from app.config import settings
+from app.utils.db_config import pool_status
+from app.utils.startup import startup_state
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+def _ops_user_ids() -> set:
+    """允许访问运维接口的用户ID"""
+    return {user_id.strip() for user_id in settings.OPS_USER_IDS.split(",") if user_id.strip()}
+
+@router.get("/health", response_model=BaseResponse)
+async def health():
+    """存活检查：进程能处理请求即返回成功"""
+    return BaseResponse(code=0, message="success", data={"alive": True})
+
+@router.get("/ready", response_model=BaseResponse)
+async def readiness():
+    """就绪检查：后台预热（建表、加载模拟数据）完成前返回 503"""
+    status = startup_state.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"code": 503, "message": "starting", "data": status})
+    return BaseResponse(code=0, message="success", data=status)
+
+@router.get("/db-pool", response_model=BaseResponse)
+async def get_db_pool_status(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    """获取数据库连接池状态，用于压测时调整连接池大小"""
+    return BaseResponse(code=0, message="success", data=pool_status())
+
+@router.get("/token-cache", response_model=BaseResponse)
+async def get_token_cache_status(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    """获取token验证缓存的命中率与容量"""
+    return BaseResponse(code=0, message="success", data=token_cache.stats())
+
+@router.get("/image-variants", response_model=BaseResponse)
+async def get_image_variant_status(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    """获取图片变体生成队列的状态"""
+    return BaseResponse(code=0, message="success", data=image_variant_pipeline.stats())
+
+@router.get("/storage-usage", response_model=BaseResponse)
+async def get_storage_usage(
+    limit: int = Query(20, ge=1, le=1000),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user)
+):
+    """获取存储占用最多的用户（读取配额账本，不扫描上传目录）
+
+    返回其他用户的ID和占用，只允许 OPS_USER_IDS 中的用户访问
+    """
+    if current_user["id"] not in _ops_user_ids():
+        return BaseResponse(code=403, message="权限不足", data=None)
+    return BaseResponse(code=0, message="success", data={"quota": storage_quota.quota, "users": storage_quota.top(limit)})
+
+@router.get("/chat-connections", response_model=BaseResponse)
+async def get_chat_connections(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
+    """获取本节点的聊天 WebSocket 连接数与推送统计，以及已读状态的批量写入统计"""
+    data = chat_hub.stats()
+    if chat_read_tracker.initialized:
+        data["readReceipts"] = chat_read_tracker.stats()
+    return BaseResponse(code=0, message="success", data=data)
@@ -0,0 +1,159 @@
+"""
+异步数据库服务
+与 db_service 中的函数一一对应，使用 AsyncSession 执行查询，供 async def 路由调用，
+查询期间不会阻塞事件循环
+"""
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Tuple
+from app.models.user import User
+from app.models.match import Match, MatchDetail
+from app.models.user_profile import UserProfile
+from app.models.order import MembershipOrder, OrderStatus
+from app.services.db_service import _apply_user_data, _ranking_candidate, _sync_coordinates
+from app.utils.db_writer import async_serialized_write
+
+# 用户相关操作
+@async_serialized_write
+async def create_user(db: AsyncSession, user_data: Dict[str, Any]) -> User:
+    db_user = User(**user_data)
+    if "location" in user_data and "latitude" not in user_data:
+        _sync_coordinates(db_user)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_user(db: AsyncSession, user_id: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.id == user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.email == email))
+
+async def get_user_by_openid(db: AsyncSession, openid: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.openid == openid))
+
+async def get_user_by_phone(db: AsyncSession, phone: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.phone == phone))
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+    result = await db.scalars(select(User).offset(skip).limit(limit))
+    return list(result)
+
+@async_serialized_write
+async def update_user(db: AsyncSession, user_id: str, user_data: Dict[str, Any]) -> Optional[User]:
+    db_user = await get_user(db, user_id)
+    if db_user:
+        _apply_user_data(db_user, user_data)
+        await db.commit()
+        await db.refresh(db_user)
+    return db_user
+
+@async_serialized_write
+async def delete_user(db: AsyncSession, user_id: str) -> bool:
+    db_user = await get_user(db, user_id)
+    if db_user:
+        await db.delete(db_user)
+        await db.commit()
+        return True
+    return False
+
+async def get_ranking_candidates(db: AsyncSession) -> List[Dict[str, Any]]:
+    """获取排序候选人：每个激活的角色资料对应一条记录，合并用户基础信息"""
+    result = await db.execute(
+        select(UserProfile, User)
+        .join(User, User.id == UserProfile.user_id)
+        .where(UserProfile.is_active == 1)
+    )
+    return [_ranking_candidate(profile, user) for profile, user in result.all()]
+
+# 匹配相关操作
+@async_serialized_write
+async def create_match(db: AsyncSession, match_data: Dict[str, Any], details: List[Dict[str, Any]] = None) -> Match:
+    db_match = Match(**match_data)
+    db.add(db_match)
+    await db.commit()
+    await db.refresh(db_match)
+
+    # 添加匹配详情
+    if details:
+        for detail in details:
+            detail["match_id"] = db_match.id
+            db.add(MatchDetail(**detail))
+        await db.commit()
+
+    return db_match
+
+async def get_match(db: AsyncSession, match_id: str) -> Optional[Match]:
+    return await db.scalar(select(Match).where(Match.id == match_id))
+
+async def get_matches(db: AsyncSession, user_id: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[Match]:
+    query = select(Match)
+    if user_id:
+        query = query.where(Match.user_id == user_id)
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return list(result)
+
+@async_serialized_write
+async def update_match(db: AsyncSession, match_id: str, match_data: Dict[str, Any]) -> Optional[Match]:
+    db_match = await get_match(db, match_id)
+    if db_match:
+        for key, value in match_data.items():
+            setattr(db_match, key, value)
+        await db.commit()
+        await db.refresh(db_match)
+    return db_match
+
+@async_serialized_write
+async def delete_match(db: AsyncSession, match_id: str) -> bool:
+    db_match = await get_match(db, match_id)
+    if db_match:
+        # 删除相关的匹配详情
+        await db.execute(delete(MatchDetail).where(MatchDetail.match_id == match_id))
+        await db.delete(db_match)
+        await db.commit()
+        return True
+    return False
+
+# 匹配详情相关操作
+@async_serialized_write
+async def add_match_detail(db: AsyncSession, match_id: str, detail_data: Dict[str, Any]) -> MatchDetail:
+    detail_data["match_id"] = match_id
+    db_detail = MatchDetail(**detail_data)
+    db.add(db_detail)
+    await db.commit()
+    await db.refresh(db_detail)
+    return db_detail
+
+async def get_match_details(db: AsyncSession, match_id: str) -> List[MatchDetail]:
+    result = await db.scalars(select(MatchDetail).where(MatchDetail.match_id == match_id))
+    return list(result)
+
+# 会员订单相关操作
+async def get_membership_orders(
+    db: AsyncSession,
+    user_id: str,
+    status: Optional[OrderStatus] = None,
+    skip: int = 0,
+    limit: int = 10
+) -> Tuple[List[MembershipOrder], int]:
+    """按创建时间倒序分页查询用户订单，返回 (订单列表, 总数)"""
+    conditions = [MembershipOrder.user_id == user_id]
+    if status is not None:
+        conditions.append(MembershipOrder.status == status)
+
+    orders = await db.scalars(
+        select(MembershipOrder)
+        .where(*conditions)
+        .order_by(MembershipOrder.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    total = await db.scalar(select(func.count()).select_from(MembershipOrder).where(*conditions))
+    return list(orders), total or 0
+
+async def get_membership_order(db: AsyncSession, order_id: str, user_id: str) -> Optional[MembershipOrder]:
+    return await db.scalar(
+        select(MembershipOrder).where(MembershipOrder.id == order_id, MembershipOrder.user_id == user_id)
+    )
@@ -0,0 +1,150 @@
+"""
+内容寻址的上传文件存储
+上传内容在写入时计算 SHA-256，相同内容只在 UPLOAD_BLOB_DIR/{前两位}/{sha256} 保存一份（blob），
+用户可访问的 /uploads/{user_id}/{sha256}{ext} 是指向 blob 的硬链接，静态文件服务不需要任何改动。
+引用计数就是 blob 的硬链接数：每个用户 URL 占一个链接，删除 URL 时只删除对应链接，
+最后一个引用删除后才删除 blob。文件系统不支持硬链接时退化为复制，行为与去重前一致。
+"""
+
+import errno
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Optional, Tuple
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+STAGING_DIR = "staging"
+_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP}
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BlobStore:
+    """按 SHA-256 去重的文件存储，引用由硬链接计数"""
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        return self._root or settings.UPLOAD_BLOB_DIR
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def staging_path(self) -> str:
+        """新上传内容的临时文件路径；与 blob 同目录树，确认内容后可以直接链接为 blob"""
+        staging_dir = os.path.join(self.root, STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        return os.path.join(staging_dir, f"{uuid.uuid4().hex}.part")
+
+    def commit(self, temp_path: str, digest: str, target_dir: str, file_ext: str) -> Tuple[str, bool]:
+        """把已写完并 fsync 的临时文件登记为 target_dir 下的 {digest}{file_ext}，临时文件总会被删除
+
+        返回 (文件名, 是否新增了引用)。内容已存在时只增加一个硬链接，不占用额外磁盘；
+        同一用户重复上传相同内容得到同一个文件名，不新增引用。
+        """
+        file_name = f"{digest}{file_ext}"
+        target = os.path.join(target_dir, file_name)
+        blob = self.blob_path(digest)
+        os.makedirs(target_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            if os.path.exists(target):
+                logger.info("upload_deduplicated", digest=digest, scope="user")
+                return file_name, False
+            try:
+                created = self._link(temp_path, blob, target, digest)
+            except OSError as e:
+                if e.errno not in _LINK_UNSUPPORTED:
+                    raise
+                # 不支持硬链接（跨文件系统等）：直接复制到目标位置
+                logger.warning("blob_link_unsupported", error=str(e))
+                partial = os.path.join(target_dir, f".{uuid.uuid4().hex}.part")
+                shutil.copyfile(temp_path, partial)
+                os.replace(partial, target)
+                created = True
+            return file_name, created
+        finally:
+            _remove(temp_path)
+
+    def _link(self, temp_path: str, blob: str, target: str, digest: str) -> bool:
+        """把 target 链接到 blob，返回是否新建了 target"""
+        # blob 可能正好被最后一个引用的删除清掉，重试时由当前上传重新创建
+        for _ in range(3):
+            try:
+                os.link(blob, target)
+                logger.info("upload_deduplicated", digest=digest, scope="blob")
+                return True
+            except FileExistsError:
+                return False
+            except FileNotFoundError:
+                pass
+            try:
+                os.link(temp_path, blob)
+            except FileExistsError:
+                continue
+            try:
+                os.link(blob, target)
+            except FileExistsError:
+                return False
+            return True
+        raise RuntimeError(f"无法登记内容 {digest}")
+
+    def release(self, file_path: str) -> bool:
+        """删除一个用户 URL 对应的文件；它是 blob 的最后一个引用时同时删除 blob，返回 blob 是否被删除
+
+        非内容寻址的文件（去重之前上传的）直接删除。
+        """
+        digest = os.path.splitext(os.path.basename(file_path))[0]
+        blob = self.blob_path(digest) if _DIGEST_RE.fullmatch(digest) else None
+        try:
+            linked = blob is not None and os.path.samefile(file_path, blob)
+        except FileNotFoundError:
+            linked = False
+        os.remove(file_path)
+        if not linked:
+            return False
+        try:
+            if os.stat(blob).st_nlink == 1:
+                os.remove(blob)
+                return True
+        except FileNotFoundError:
+            pass
+        return False
+
+    def collect_garbage(self, staging_max_age: float = 3600, now: Optional[float] = None) -> int:
+        """清理没有任何用户引用的 blob 和进程中断遗留的临时文件，返回删除的文件数"""
+        now = now if now is not None else time.time()
+        removed = 0
+        for dir_path, _, file_names in os.walk(self.root):
+            staging = os.path.basename(dir_path) == STAGING_DIR
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if staging:
+                    # 已链接为 blob 的临时文件删掉也不影响 blob
+                    stale = st.st_mtime + staging_max_age < now
+                else:
+                    stale = st.st_nlink == 1
+                if stale:
+                    _remove(path)
+                    removed += 1
+        return removed
+
+
+blob_store = BlobStore()
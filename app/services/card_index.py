@@ -0,0 +1,124 @@
+from typing import Any, Optional
+import base64
+import binascii
+import bisect
+import json
+
+# 不区分角色的倒排键（房源场景下seeker可以看到所有房源卡片）
+ANY_ROLE = "*"
+
+
+class _Posting:
+    """单个倒排列表：按加入顺序保存卡片ID及其序号"""
+
+    __slots__ = ("ids", "seqs")
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.seqs: list[int] = []
+
+    def append(self, card_id: str, seq: int):
+        self.ids.append(card_id)
+        self.seqs.append(seq)
+
+    def remove(self, card_id: str):
+        idx = self.ids.index(card_id)
+        del self.ids[idx]
+        del self.seqs[idx]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class CardIndex:
+    """匹配卡片索引
+
+    按 (matchType, userRole) 以及 (matchType, 任意角色) 维护有序倒排列表，
+    由 create_card 增量维护。分页读取只切片目标页，耗时与卡片总量无关。
+    """
+
+    def __init__(self):
+        self._postings: dict[tuple[Optional[str], Optional[str]], _Posting] = {}
+        self._card_keys: dict[str, tuple[Optional[str], Optional[str]]] = {}
+        self._card_seqs: dict[str, int] = {}
+        self._next_seq = 0
+
+    def add(self, card: dict[str, Any]):
+        """加入或更新卡片；已存在且类型/角色未变化时保持原有顺序"""
+        card_id = card["id"]
+        key = (card.get("matchType"), card.get("userRole"))
+
+        old_key = self._card_keys.get(card_id)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self.remove(card_id)
+
+        seq = self._next_seq
+        self._next_seq += 1
+        self._card_keys[card_id] = key
+        self._card_seqs[card_id] = seq
+        self._posting(key).append(card_id, seq)
+        self._posting((key[0], ANY_ROLE)).append(card_id, seq)
+
+    def remove(self, card_id: str):
+        """从索引中移除卡片"""
+        key = self._card_keys.pop(card_id, None)
+        if key is None:
+            return
+        del self._card_seqs[card_id]
+        self._postings[key].remove(card_id)
+        self._postings[(key[0], ANY_ROLE)].remove(card_id)
+
+    def count(self, match_type: str, user_role: Optional[str]) -> int:
+        """符合条件的卡片数量，O(1)"""
+        posting = self._postings.get((match_type, user_role))
+        return len(posting) if posting else 0
+
+    def page(self, match_type: str, user_role: Optional[str], start: int, size: int) -> list[str]:
+        """按加入顺序返回一页卡片ID，O(size)"""
+        posting = self._postings.get((match_type, user_role))
+        if not posting or start < 0 or size <= 0:
+            return []
+        return posting.ids[start:start + size]
+
+    def page_after(
+        self, match_type: str, user_role: Optional[str], after_seq: Optional[int], size: int
+    ) -> tuple[list[str], bool]:
+        """返回排序键大于 after_seq 的一页卡片ID及是否还有更多，O(log n + size)"""
+        posting = self._postings.get((match_type, user_role))
+        if not posting or size <= 0:
+            return [], False
+        start = 0 if after_seq is None else bisect.bisect_right(posting.seqs, after_seq)
+        end = start + size
+        return posting.ids[start:end], end < len(posting)
+
+    def seq_of(self, card_id: str) -> Optional[int]:
+        """卡片的稳定排序键"""
+        return self._card_seqs.get(card_id)
+
+    def _posting(self, key: tuple[Optional[str], Optional[str]]) -> _Posting:
+        posting = self._postings.get(key)
+        if posting is None:
+            posting = self._postings[key] = _Posting()
+        return posting
+
+
+def encode_cursor(seq: int) -> str:
+    """将排序键编码为不透明的游标"""
+    raw = json.dumps({"s": seq}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """解析游标，空游标表示从头开始；格式错误时抛出 ValueError"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        seq = json.loads(raw)["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("无效的游标")
+    if not isinstance(seq, int) or seq < 0:
+        raise ValueError("无效的游标")
+    return seq
@@ -0,0 +1,233 @@
+"""
+聊天实时推送
+每个 WebSocket 连接在 ChatHub 中登记一个队列，发送消息、标记已读时发布事件，
+由 ChatHub 放入相关用户所有连接的队列，再由各连接推送给客户端，客户端不再需要轮询 /history。
+
+多节点部署时同一用户的连接可能在不同节点上，事件统一经由 broker 广播：
+- local：进程内广播（单节点部署；测试中多个 ChatHub 共用一个 LocalBroker 模拟多个节点）
+- redis：Redis PUBLISH/SUBSCRIBE（需要 pip install redis），所有节点订阅同一频道
+
+连接的队列有上限（CHAT_WS_QUEUE_SIZE），客户端读取过慢时丢弃新事件而不是无限占用内存，
+客户端重连后用 /history 的 after 游标补齐。Redis 连接断开后按指数退避重连并重新订阅，
+断开期间的事件不会补发，同样由客户端用 after 游标补齐。
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from app.config import settings
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    # 只在 CHAT_BROKER=redis 时需要
+    aioredis = None
+
+Deliver = Callable[[Dict[str, Any]], None]
+
+# Redis 订阅断开后的重连间隔（秒），每次失败翻倍直到上限
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+class ChatBroker(ABC):
+    """跨节点事件广播接口：publish 的事件会交给所有节点（包括自己）的 deliver"""
+
+    @abstractmethod
+    async def start(self, deliver: Deliver):
+        """开始接收事件"""
+
+    @abstractmethod
+    async def publish(self, event: Dict[str, Any]):
+        """广播事件"""
+
+    async def close(self):
+        pass
+
+
+class LocalBroker(ChatBroker):
+    """进程内广播"""
+
+    def __init__(self):
+        self._subscribers: List[Deliver] = []
+
+    async def start(self, deliver: Deliver):
+        self._subscribers.append(deliver)
+
+    async def publish(self, event: Dict[str, Any]):
+        for deliver in list(self._subscribers):
+            deliver(event)
+
+    async def close(self):
+        self._subscribers.clear()
+
+
+class RedisBroker(ChatBroker):
+    """Redis 频道广播"""
+
+    def __init__(self, url: Optional[str] = None, channel: Optional[str] = None):
+        if aioredis is None:
+            raise RuntimeError("CHAT_BROKER=redis 需要安装 redis（pip install redis）")
+        self.url = url or settings.CHAT_REDIS_URL
+        self.channel = channel or settings.CHAT_BROKER_CHANNEL
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        self._redis = aioredis.from_url(self.url)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver: Deliver):
+        """接收频道消息；连接断开时按指数退避重连并重新订阅，直到被 close 取消"""
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = self._redis.pubsub()
+                    await pubsub.subscribe(self.channel)
+                    logger.info("chat_broker_resubscribed", channel=self.channel)
+                    delay = RECONNECT_MIN_DELAY
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        deliver(json.loads(message["data"]))
+                    except Exception:
+                        logger.exception("chat_event_delivery_failed")
+                logger.warning("chat_broker_listen_ended", channel=self.channel, retry_in=delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("chat_broker_disconnected", channel=self.channel, error=str(e), retry_in=delay)
+            if pubsub is not None:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+                pubsub = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def publish(self, event: Dict[str, Any]):
+        await self._redis.publish(self.channel, json.dumps(event, ensure_ascii=False))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._redis is not None:
+            await self._redis.close()
+
+
+class ChatSubscriber:
+    """一个 WebSocket 连接的事件队列"""
+
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _put(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def offer(self, event: Dict[str, Any]):
+        """放入事件；可以在其他事件循环或线程中调用"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class ChatHub:
+    """本节点的 WebSocket 连接登记与事件分发"""
+
+    def __init__(self, broker: Optional[ChatBroker] = None, queue_size: Optional[int] = None):
+        self.broker = broker or create_broker()
+        self.queue_size = queue_size or settings.CHAT_WS_QUEUE_SIZE
+        self._subscribers: Dict[str, Set[ChatSubscriber]] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._started = False
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self):
+        """订阅 broker；首次建立连接或发布事件时调用，重复调用只订阅一次"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if not self._started:
+                await self.broker.start(self._deliver)
+                self._started = True
+
+    def connect(self, user_id: str) -> ChatSubscriber:
+        subscriber = ChatSubscriber(str(user_id), self.queue_size)
+        self._subscribers.setdefault(subscriber.user_id, set()).add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: ChatSubscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            self._subscribers.pop(subscriber.user_id, None)
+        if subscriber.dropped:
+            logger.warning("chat_events_dropped", user_id=subscriber.user_id, dropped=subscriber.dropped)
+
+    def _deliver(self, event: Dict[str, Any]):
+        recipients = event.get("recipients") or ()
+        payload = {key: value for key, value in event.items() if key != "recipients"}
+        for user_id in recipients:
+            for subscriber in list(self._subscribers.get(str(user_id), ())):
+                subscriber.offer(payload)
+                self.delivered += 1
+
+    async def publish(self, recipients: Iterable[str], event: Dict[str, Any]):
+        """把事件推送给 recipients 在所有节点上的连接"""
+        await self.start()
+        self.published += 1
+        await self.broker.publish({**event, "recipients": [str(user_id) for user_id in recipients]})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "broker": type(self.broker).__name__,
+            "users": len(self._subscribers),
+            "connections": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+    async def close(self):
+        if self._started:
+            await self.broker.close()
+            self._started = False
+
+
+def create_broker() -> ChatBroker:
+    if settings.CHAT_BROKER == "redis":
+        return RedisBroker()
+    if settings.CHAT_BROKER != "local":
+        raise ValueError(f"未知的 CHAT_BROKER: {settings.CHAT_BROKER}")
+    return LocalBroker()
+
+
+chat_hub: ChatHub = LazyService(ChatHub)
@@ -0,0 +1,387 @@
+"""
+聊天已读状态
+每个用户在每个会话中记录一个已读水位（最后已读的消息ID，消息ID随发送时间递增）和水位之后的未读计数：
+- 标记已读：水位移到会话最新消息，未读计数清零，不逐条更新消息
+- 发送消息：会话中其他参与者的未读计数加一
+- 读取未读数：直接返回计数，O(1)，与会话消息总数无关；消息是否已读由对方水位比较得出
+
+同一行还保存会话对方和最后一条消息的预览，作为用户的会话摘要：发送消息时更新双方的摘要，
+会话列表沿 (user_id, last_message_at, match_id) 索引一次查询读取，不需要逐个会话读取历史记录。
+
+状态缓存在内存中（按会话首次访问时从 chat_read_states 表加载，最多缓存 CHAT_READ_STATE_CACHE_SIZE
+个会话，超出时淘汰最久未访问且没有待写入修改的会话）。只有标记已读、发送消息和建立会话会修改状态，
+读取未读数和已读标记不写数据库。修改只标记为待写入，由后台线程每 CHAT_READ_FLUSH_INTERVAL 秒
+批量写入一次：同一用户在同一会话中多次标记已读或连续收到多条消息，一个刷写周期内合并为一行，
+整批只执行一条 INSERT ... ON CONFLICT。进程崩溃最多丢失一个周期的已读位置，不影响消息本身。
+
+计数在进程内存中维护，按单进程部署设计（或同一会话的请求总是落到同一进程）。
+多个 worker 进程时，写入按已读水位合并：库中的水位只前进不后退，一个进程不会把另一个进程
+推进的水位覆盖回去；但各进程的未读计数仍各自维护，在下次标记已读前可能不一致。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.models.chat_message import ChatMessage, ChatReadState
+from app.services.chat_store import InvalidCursorError
+from app.services.db_service import (
+    count_chat_messages_from_others, get_chat_conversations, get_chat_messages, get_chat_read_state,
+    get_chat_read_states, save_chat_read_states
+)
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 会话列表中最后一条消息的预览长度，非文本消息显示类型
+PREVIEW_LENGTH = 50
+TYPE_PREVIEWS = {"image": "[图片]", "voice": "[语音]"}
+
+
+def message_preview(msg_type: str, content: str) -> str:
+    if msg_type in TYPE_PREVIEWS:
+        return TYPE_PREVIEWS[msg_type]
+    return (content or "")[:PREVIEW_LENGTH]
+
+
+class ReadState:
+    """用户在一个会话中的已读位置与会话摘要"""
+
+    __slots__ = (
+        "peer_id", "last_read_id", "last_read_at", "unread", "last_message_id", "last_message_type",
+        "last_message_preview", "last_sender_id", "last_message_at", "counted_through"
+    )
+    COLUMNS = __slots__[:-1]
+
+    def __init__(self, counted_through: Optional[str] = None, **values: Any):
+        for column in self.COLUMNS:
+            setattr(self, column, values.get(column))
+        self.unread = self.unread or 0
+        self.last_message_at = self.last_message_at or 0
+        # 按已保存的消息建立状态时统计到的最后一条消息，之前的消息不再重复计入未读
+        self.counted_through = counted_through
+
+    @classmethod
+    def from_row(cls, row: ChatReadState) -> "ReadState":
+        return cls(**{column: getattr(row, column) for column in cls.COLUMNS})
+
+    def set_last_message(self, message: Dict[str, Any]):
+        self.last_message_id = message["id"]
+        self.last_message_type = message["type"]
+        self.last_message_preview = message_preview(message["type"], message["content"])
+        self.last_sender_id = message["senderId"]
+        self.last_message_at = message["timestamp"]
+
+    def to_row(self, match_id: str, user_id: str) -> Dict[str, Any]:
+        row = {column: getattr(self, column) for column in self.COLUMNS}
+        row.update(match_id=match_id, user_id=user_id)
+        return row
+
+
+def conversation_summary(row: ChatReadState) -> Dict[str, Any]:
+    last_message = None
+    if row.last_message_id:
+        last_message = {
+            "id": row.last_message_id,
+            "type": row.last_message_type,
+            "preview": row.last_message_preview or "",
+            "senderId": row.last_sender_id,
+            "timestamp": row.last_message_at,
+        }
+    return {
+        "matchId": row.match_id,
+        "peerId": row.peer_id,
+        "lastMessage": last_message,
+        "unreadCount": row.unread,
+        "lastReadId": row.last_read_id,
+        "updatedAt": row.last_message_at,
+    }
+
+
+class ChatReadTracker:
+    """已读水位与未读计数，修改按刷写周期合并后批量写入数据库"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        flush_interval: Optional[float] = None,
+        cache_size: Optional[int] = None
+    ):
+        if engine is None:
+            from app.utils.db_config import get_chat_engine
+            engine = get_chat_engine()
+        self.engine = engine
+        self.flush_interval = settings.CHAT_READ_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.cache_size = settings.CHAT_READ_STATE_CACHE_SIZE if cache_size is None else cache_size
+        self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # 测试客户端和脚本不经过 lifespan 建表，首次使用时补建
+        ChatMessage.__table__.create(bind=engine, checkfirst=True)
+        ChatReadState.__table__.create(bind=engine, checkfirst=True)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # 会话ID -> 建立已读状态时使用的锁，同一会话同时只有一个线程按消息统计初始未读数
+        self._match_locks: Dict[str, threading.Lock] = {}
+        # 会话ID -> 用户ID -> 已读状态，按访问顺序排列；已加载的会话包含该会话全部已保存的状态
+        self._states: "OrderedDict[str, Dict[str, ReadState]]" = OrderedDict()
+        # 会话中最新的消息ID（本进程发送的消息）
+        self._latest: Dict[str, str] = {}
+        self._dirty: Dict[Tuple[str, str], ReadState] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.marks = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.evictions = 0
+
+    def _with_db(self, func, *args, **kwargs):
+        db = self._session_factory()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    def _match_states(self, match_id: str) -> Dict[str, ReadState]:
+        with self._lock:
+            states = self._states.get(match_id)
+            if states is not None:
+                self._states.move_to_end(match_id)
+                return states
+        rows = self._with_db(get_chat_read_states, match_id)
+        loaded = {row.user_id: ReadState.from_row(row) for row in rows}
+        with self._lock:
+            states = self._states.setdefault(match_id, loaded)
+            self._evict()
+            return states
+
+    def _evict(self):
+        """缓存的会话超过 cache_size 时淘汰最久未访问的会话（调用方持有 self._lock）
+
+        有待写入修改或正在建立状态的会话不淘汰；淘汰后再访问时从数据库重新加载。
+        """
+        excess = len(self._states) - self.cache_size
+        if excess <= 0 or self.cache_size <= 0:
+            return
+        dirty_matches = {match_id for match_id, _ in self._dirty}
+        evictable = (
+            match_id for match_id in self._states
+            if match_id not in dirty_matches
+            and not (match_id in self._match_locks and self._match_locks[match_id].locked())
+        )
+        for match_id in list(islice(evictable, excess)):
+            del self._states[match_id]
+            self._match_locks.pop(match_id, None)
+            self._latest.pop(match_id, None)
+            self.evictions += 1
+
+    def _state(self, match_id: str, user_id: str, peer_id: Optional[str] = None) -> Tuple[ReadState, bool]:
+        """返回用户的已读状态；没有记录时按会话中已有的消息建立（他人发送的消息均未读）
+
+        只读取、不标记待写入，第二个值为 True 表示状态是新建立的或会话对方有变化，由修改状态的调用方写入。
+        """
+        states = self._match_states(match_id)
+        state = states.get(user_id)
+        if state is not None:
+            if peer_id and state.peer_id != peer_id:
+                with self._lock:
+                    state.peer_id = peer_id
+                return state, True
+            return state, False
+        with self._lock:
+            match_lock = self._match_locks.setdefault(match_id, threading.Lock())
+        with match_lock:
+            state = states.get(user_id)
+            if state is not None:
+                return state, False
+            # 先取最新消息再只统计到它为止，计数与 counted_through 对应同一批消息；
+            # 之后保存的消息由 record_message 计入
+            latest = self._with_db(get_chat_messages, match_id, 1)
+            counted_through = latest[0].id if latest else ""
+            unread = self._with_db(count_chat_messages_from_others, match_id, user_id, up_to=counted_through)
+            with self._lock:
+                state = states[user_id] = ReadState(peer_id=peer_id, unread=unread, counted_through=counted_through)
+                if latest:
+                    state.set_last_message(latest[0].to_dict())
+        return state, True
+
+    def _mark_dirty(self, match_id: str, user_id: str, state: ReadState):
+        # 调用方持有 self._lock
+        self._dirty[(match_id, user_id)] = state
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="chat-read-flush", daemon=True)
+            self._flusher.start()
+
+    def start_conversation(self, match_id: str, participants: Iterable[str], created_at: int):
+        """匹配成功后为双方建立会话摘要，还没有消息时按匹配时间排序"""
+        users = [user_id for user_id in participants if user_id]
+        for user_id in users:
+            peer_id = next((other for other in users if other != user_id), None)
+            state, changed = self._state(match_id, user_id, peer_id)
+            with self._lock:
+                if not state.last_message_at:
+                    state.last_message_at = created_at
+                    changed = True
+                if changed:
+                    self._mark_dirty(match_id, user_id, state)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def record_message(self, match_id: str, message: Dict[str, Any], participants: Iterable[str]):
+        """消息已保存后调用：更新双方会话摘要中的最后一条消息，其他参与者的未读计数加一"""
+        sender_id = message["senderId"]
+        users = [user_id for user_id in participants if user_id]
+        for user_id in users:
+            peer_id = next((other for other in users if other != user_id), None)
+            state, _ = self._state(match_id, user_id, peer_id)
+            with self._lock:
+                if message["id"] > (state.last_message_id or ""):
+                    state.set_last_message(message)
+                # 建立状态时已统计过的消息（包括这条消息已保存后才建立的状态）不重复计入
+                if user_id != sender_id and (state.counted_through is None or message["id"] > state.counted_through):
+                    state.unread += 1
+                self._mark_dirty(match_id, user_id, state)
+        with self._lock:
+            if message["id"] > self._latest.get(match_id, ""):
+                self._latest[match_id] = message["id"]
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def mark_read(self, match_id: str, user_id: str, peer_id: Optional[str] = None) -> Dict[str, Any]:
+        """把用户的已读水位移到会话最新消息，返回新的已读位置"""
+        state, _ = self._state(match_id, user_id, peer_id)
+        latest = self._with_db(get_chat_messages, match_id, 1)
+        latest_id = latest[0].id if latest else None
+        with self._lock:
+            # 查询之后本进程又发送的消息已经计入未读，水位取两者中较新的一个，保持两者一致
+            candidates = [i for i in (latest_id, self._latest.get(match_id), state.last_read_id) if i]
+            state.last_read_id = max(candidates) if candidates else None
+            state.last_read_at = int(time.time())
+            state.unread = 0
+            self._mark_dirty(match_id, user_id, state)
+            self.marks += 1
+            result = {"matchId": match_id, "lastReadId": state.last_read_id, "unread": 0}
+        if self.flush_interval <= 0:
+            self.flush()
+        return result
+
+    def unread_count(self, match_id: str, user_id: str) -> int:
+        return self._state(match_id, user_id)[0].unread
+
+    def last_read_id(self, match_id: str, user_id: str) -> Optional[str]:
+        return self._state(match_id, user_id)[0].last_read_id
+
+    def apply_read_flags(self, match_id: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按其他参与者的已读水位设置消息的 isRead（原地修改并返回）"""
+        states = self._match_states(match_id)
+        with self._lock:
+            watermarks = {user_id: state.last_read_id for user_id, state in states.items() if state.last_read_id}
+        for message in messages:
+            message["isRead"] = any(
+                watermark >= message["id"]
+                for user_id, watermark in watermarks.items()
+                if user_id != message["senderId"]
+            )
+        return messages
+
+    def _conversations(
+        self, db, user_id: str, limit: int, before: Optional[str], include: Optional[Callable[[str], bool]]
+    ) -> Dict[str, Any]:
+        before_row = None
+        if before:
+            before_row = get_chat_read_state(db, before, user_id)
+            if before_row is None:
+                raise InvalidCursorError(before)
+        conversations: List[Dict[str, Any]] = []
+        has_more = False
+        while True:
+            # 多读一条判断是否还有更早的会话
+            rows = get_chat_conversations(db, user_id, limit + 1, before=before_row)
+            for row in rows:
+                if include is not None and not include(row.match_id):
+                    continue
+                if len(conversations) == limit:
+                    has_more = True
+                    break
+                conversations.append(conversation_summary(row))
+            # 被跳过的会话不占页面位置，页面未满且索引中还有会话时继续向后读
+            if has_more or len(rows) <= limit:
+                break
+            before_row = rows[-1]
+        return {
+            "list": conversations,
+            "pageSize": limit,
+            "hasMore": has_more,
+            "before": conversations[-1]["matchId"] if conversations else before,
+        }
+
+    def conversations(
+        self,
+        user_id: str,
+        limit: int = 20,
+        before: Optional[str] = None,
+        include: Optional[Callable[[str], bool]] = None
+    ) -> Dict[str, Any]:
+        """用户的一页会话摘要（最近有消息的在前）；before 为上一页最后一个会话的匹配ID，
+        include 按匹配ID过滤会话（返回 False 的会话跳过，页面仍然填满）"""
+        # 先写入本节点尚未落库的修改，列表直接读索引
+        self.flush()
+        return self._with_db(self._conversations, user_id, limit, before, include)
+
+    def flush(self) -> int:
+        """把待写入的状态写入数据库，返回写入的行数"""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            rows = [state.to_row(match_id, user_id) for (match_id, user_id), state in dirty.items()]
+        try:
+            self._with_db(save_chat_read_states, rows)
+        except Exception:
+            # 放回待写入队列，下个周期重试；期间的新修改以内存中的最新值为准
+            with self._lock:
+                for key, state in dirty.items():
+                    self._dirty.setdefault(key, state)
+            raise
+        with self._lock:
+            self.flushes += 1
+            self.rows_written += len(dirty)
+        return len(dirty)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("chat_read_flush_failed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "marks": self.marks,
+                "pending": len(self._dirty),
+                "flushes": self.flushes,
+                "rowsWritten": self.rows_written,
+                "cachedMatches": len(self._states),
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        """停止后台刷写并写入剩余的修改"""
+        self._closed.set()
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+
+
+# 首次使用时才连接数据库并建表
+chat_read_tracker: ChatReadTracker = LazyService(ChatReadTracker)
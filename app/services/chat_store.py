@@ -0,0 +1,114 @@
+"""
+聊天消息存储
+消息保存在 chat_messages 表，按 (match_id, timestamp, id) 建索引。历史记录按游标分页：
+before=消息ID 读取更早的一页，after=消息ID 读取更新的一页，都只沿索引读取一页加一条，
+与会话中的消息总数无关。消息ID 由纳秒时间戳（16 位十六进制）加随机后缀组成，
+同一秒内的消息按 ID 排序也就是发送顺序。
+"""
+
+import secrets
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from app.models.chat_message import ChatMessage
+from app.services.db_service import create_chat_message, get_chat_message, get_chat_messages
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class InvalidCursorError(Exception):
+    """游标不是该会话中的消息"""
+
+
+def new_message_id() -> str:
+    return f"{time.time_ns():016x}{secrets.token_hex(4)}"
+
+
+class ChatMessageStore:
+    """按会话分页读写聊天消息"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        if engine is None:
+            from app.utils.db_config import get_chat_engine
+            engine = get_chat_engine()
+        self.engine = engine
+        self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # 测试客户端和脚本不经过 lifespan 建表，首次使用时补建
+        ChatMessage.__table__.create(bind=engine, checkfirst=True)
+
+    def _with_db(self, func, *args, **kwargs):
+        db = self._session_factory()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    def send(
+        self,
+        match_id: str,
+        sender_id: str,
+        content: str,
+        msg_type: str,
+        sender_name: str = "",
+        sender_avatar: str = ""
+    ) -> Dict[str, Any]:
+        """保存一条消息，返回与历史记录相同格式的消息"""
+        message = self._with_db(create_chat_message, {
+            "id": new_message_id(),
+            "match_id": match_id,
+            "sender_id": sender_id,
+            "msg_type": msg_type,
+            "content": content,
+            "sender_name": sender_name,
+            "sender_avatar": sender_avatar,
+            "timestamp": int(time.time()),
+            "is_read": False,
+        })
+        return message.to_dict()
+
+    def _cursor(self, db, match_id: str, message_id: Optional[str]) -> Optional[ChatMessage]:
+        if not message_id:
+            return None
+        message = get_chat_message(db, message_id)
+        if message is None or message.match_id != match_id:
+            raise InvalidCursorError(message_id)
+        return message
+
+    def _history(self, db, match_id: str, limit: int, before: Optional[str], after: Optional[str]) -> Dict[str, Any]:
+        before_message = self._cursor(db, match_id, before)
+        after_message = self._cursor(db, match_id, after)
+        # 多读一条判断该方向上是否还有消息
+        rows = get_chat_messages(db, match_id, limit + 1, before=before_message, after=after_message)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after_message is not None:
+            rows.reverse()
+        messages = [row.to_dict() for row in rows]
+        return {
+            "list": messages,
+            "pageSize": limit,
+            "hasMore": has_more,
+            # 继续向前翻页传 before，拉取新消息传 after
+            "before": messages[-1]["id"] if messages else before,
+            "after": messages[0]["id"] if messages else after,
+        }
+
+    def history(
+        self,
+        match_id: str,
+        limit: int = 20,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """一页消息（从新到旧）；before/after 为消息ID，不属于该会话时抛出 InvalidCursorError"""
+        return self._with_db(self._history, match_id, limit, before, after)
+
+    def has_messages(self, match_id: str) -> bool:
+        return bool(self._with_db(get_chat_messages, match_id, 1))
+
+
+# 首次使用时才连接数据库并建表
+chat_store: ChatMessageStore = LazyService(ChatMessageStore)
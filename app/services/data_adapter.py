@@ -1,13 +1,22 @@
 import os
 from typing import Any, Dict, List, Optional
-from app.services.mock_data import mock_data_service
+from app.services.mock_data import mock_data_service, user_to_card
 from app.services.db_service import (
     create_user, get_user, get_user_by_email, get_users, update_user, delete_user,
     create_match, get_match, get_matches, update_match, delete_match,
-    add_match_detail, get_match_details
+    add_match_detail, get_match_details, get_ranking_candidates
 )
+from app.services.ranking import RankingEngine
+from app.utils.geo import location_of
+from app.config import settings
 from sqlalchemy.orm import Session
 from app.utils.db_config import get_db
+from app.utils.logger import get_logger
+from app.services.token_cache import token_cache
+from app.services.chat_store import chat_store
+from app.services.chat_read_state import chat_read_tracker
+
+logger = get_logger(__name__)
 
 class DataService:
     """数据服务适配器，根据环境选择使用模拟数据或数据库"""
@@ -20,6 +29,13 @@ class DataService:
         
         # 使用全局模拟数据服务实例
         self.mock_service = mock_data_service
+        
+        # 数据库模式下的候选人排序引擎，快照按 max_age 在后台定期重建
+        self.ranking_engine = RankingEngine(
+            loader=self._load_ranking_candidates,
+            max_age=settings.RANKING_SNAPSHOT_MAX_AGE,
+            background=True
+        )
     
     def _get_db(self):
         """获取数据库会话生成器"""
@@ -77,7 +93,7 @@ class DataService:
                     return mapped_dict
                 return None
             except Exception as e:
-                print(f"获取用户时出错：{e}")
+                logger.exception("get_user_failed", user_id=user_id)
                 return None
     
     def get_user_by_token(self, token: str) -> Optional[Dict[str, Any]]:
@@ -113,7 +129,7 @@ class DataService:
                     return mapped_dict
                 return None
             except Exception as e:
-                print(f"根据token获取用户时出错：{e}")
+                logger.exception("get_user_by_token_failed")
                 return None
     
     def update_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -123,6 +139,7 @@ class DataService:
         else:
             try:
                 user = self._with_db(update_user, user_id, profile_data)
+                token_cache.invalidate_user(user_id)
                 if user:
                     # 将数据库字段映射回前端字段
                     user_dict = user.__dict__.copy()
@@ -147,7 +164,7 @@ class DataService:
                     return mapped_dict
                 return None
             except Exception as e:
-                print(f"更新用户资料时出错：{e}")
+                logger.exception("update_profile_failed", user_id=user_id)
                 return None
     
     # 卡片和匹配相关方法
@@ -212,6 +229,38 @@ class DataService:
                 "pageSize": page_size
             }
     
+    def _load_ranking_candidates(self) -> List[Dict[str, Any]]:
+        """从数据库加载排序候选人"""
+        return self._with_db(get_ranking_candidates)
+    
+    def get_ranked_cards(
+        self,
+        requester: Dict[str, Any],
+        match_type: str,
+        user_role: str,
+        page: int,
+        page_size: int,
+        radius_km: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """按请求方偏好排序获取候选卡片，radius_km 不为空时只返回半径内的候选人"""
+        if self.use_mock:
+            return self.mock_service.get_ranked_cards(requester, match_type, user_role, page, page_size, radius_km)
+        else:
+            # 排序与取候选人详情使用同一个快照，后台重建替换快照时两者不会错位
+            snapshot = self.ranking_engine.snapshot()
+            ranked, total = self.ranking_engine.rank(
+                requester, match_type, user_role, (page - 1) * page_size, page_size,
+                radius_km=radius_km, snapshot=snapshot
+            )
+            candidates = snapshot.records
+            origin = location_of(requester)
+            return {
+                "total": total,
+                "list": [user_to_card(candidates[cid], score, origin) for cid, score in ranked if cid in candidates],
+                "page": page,
+                "pageSize": page_size
+            }
+    
     def create_match(self, user_id: str, card_id: str, action: str) -> Dict[str, Any]:
         """创建匹配"""
         if self.use_mock:
@@ -239,6 +288,9 @@ class DataService:
                         "detail_value": card_id
                     }
                     self._with_db(add_match_detail, match.id, detail_data)
+                    chat_read_tracker.start_conversation(
+                        match.id, (user_id, card_id), int(match.created_at.timestamp()) if match.created_at else 0
+                    )
                     
                     return {
                         "isMatch": True,
@@ -250,7 +302,7 @@ class DataService:
                         "matchId": None
                     }
             except Exception as e:
-                print(f"创建匹配时出错：{e}")
+                logger.exception("create_match_failed", user_id=user_id, card_id=card_id)
                 return {
                     "isMatch": False,
                     "matchId": None
@@ -297,7 +349,7 @@ class DataService:
                     "pageSize": page_size
                 }
             except Exception as e:
-                print(f"获取匹配列表时出错：{e}")
+                logger.exception("get_matches_failed", user_id=user_id)
                 return {
                     "total": 0,
                     "list": [],
@@ -338,42 +390,53 @@ class DataService:
                 match_dict["cardInfo"] = card_info
                 return match_dict
             except Exception as e:
-                print(f"获取匹配详情时出错：{e}")
+                logger.exception("get_match_detail_failed", match_id=match_id)
                 return {}
     
-    # 聊天相关方法 - 这些方法在数据库版本中需要额外实现
-    def get_chat_history(self, match_id: str, page: int, page_size: int) -> Dict[str, Any]:
-        """获取聊天记录"""
+    # 聊天相关方法 - 两种模式的消息都保存在 chat_messages 表中
+    def get_chat_history(
+        self, match_id: str, page_size: int, before: Optional[str] = None, after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """获取聊天记录（从新到旧），before/after 为消息ID游标"""
         if self.use_mock:
-            return self.mock_service.get_chat_history(match_id, page, page_size)
-        else:
-            # 在实际应用中，需要实现聊天记录的数据库模型和服务
-            # 这里返回空列表作为占位符
-            return {
-                "total": 0,
-                "list": [],
-                "page": page,
-                "pageSize": page_size
-            }
+            return self.mock_service.get_chat_history(match_id, page_size, before=before, after=after)
+        page = chat_store.history(match_id, page_size, before=before, after=after)
+        chat_read_tracker.apply_read_flags(match_id, page["list"])
+        return page
     
     def send_message(self, match_id: str, sender_id: str, content: str, msg_type: str) -> Dict[str, Any]:
         """发送消息"""
         if self.use_mock:
             return self.mock_service.send_message(match_id, sender_id, content, msg_type)
-        else:
-            # 在实际应用中，需要实现消息的数据库模型和服务
-            # 这里返回一个模拟的消息对象作为占位符
-            import time
-            return {
-                "id": f"msg_{int(time.time())}",
-                "content": content,
-                "type": msg_type,
-                "senderId": sender_id,
-                "senderAvatar": "",
-                "senderName": "",
-                "timestamp": int(time.time()),
-                "isRead": False
-            }
+        sender = self.get_user_by_id(sender_id) or {}
+        message = chat_store.send(
+            match_id,
+            sender_id,
+            content,
+            msg_type,
+            sender_name=sender.get("nickName") or "",
+            sender_avatar=sender.get("avatarUrl") or "",
+        )
+        match = self.get_match_by_id(match_id)
+        if match:
+            chat_read_tracker.record_message(match_id, message, (match["userId1"], match["userId2"]))
+        return message
+    
+    def mark_messages_read(self, match_id: str, user_id: str) -> Dict[str, Any]:
+        """把用户在会话中的已读水位移到最新消息"""
+        if self.use_mock:
+            return self.mock_service.mark_messages_read(match_id, user_id)
+        match = self.get_match_by_id(match_id)
+        peer_id = None
+        if match:
+            peer_id = match["userId2"] if match["userId1"] == user_id else match["userId1"]
+        return chat_read_tracker.mark_read(match_id, user_id, peer_id)
+    
+    def get_conversations(self, user_id: str, page_size: int, before: Optional[str] = None) -> Dict[str, Any]:
+        """用户的会话列表：最后一条消息预览与未读数，最近有消息的在前"""
+        if self.use_mock:
+            return self.mock_service.get_conversations(user_id, page_size, before=before)
+        return chat_read_tracker.conversations(user_id, page_size, before=before)
     
     def upload_file(self, file_type: str) -> Dict[str, Any]:
         """上传文件"""
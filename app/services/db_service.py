@@ -1,11 +1,22 @@
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from app.models.user import User
 from app.models.match import Match, MatchDetail
+from app.models.user_profile import UserProfile
+from app.models.chat_message import ChatMessage, ChatReadState
+from app.utils.geo import normalize_location
+from app.utils.db_writer import serialized_write
 
 # 用户相关操作
+@serialized_write
 def create_user(db: Session, user_data: Dict[str, Any]) -> User:
     db_user = User(**user_data)
+    if "location" in user_data and "latitude" not in user_data:
+        _sync_coordinates(db_user)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -17,31 +28,51 @@ def get_user(db: Session, user_id: str) -> Optional[User]:
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
+def get_user_by_openid(db: Session, openid: str) -> Optional[User]:
+    return db.query(User).filter(User.openid == openid).first()
+
+def get_user_by_phone(db: Session, phone: str) -> Optional[User]:
+    return db.query(User).filter(User.phone == phone).first()
+
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     return db.query(User).offset(skip).limit(limit).all()
 
+@serialized_write
 def update_user(db: Session, user_id: str, user_data: Dict[str, Any]) -> Optional[User]:
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
-        # 字段映射：前端字段名 -> 数据库字段名
-        field_mapping = {
-            'nickName': 'nick_name',
-            'avatarUrl': 'avatar_url',
-            'matchType': 'match_type',
-            'userRole': 'user_role',
-            'joinDate': 'join_date'
-        }
-        
-        for key, value in user_data.items():
-            # 使用映射后的字段名，如果没有映射则使用原字段名
-            db_field = field_mapping.get(key, key)
-            if hasattr(db_user, db_field):
-                setattr(db_user, db_field, value)
-        
+        _apply_user_data(db_user, user_data)
         db.commit()
         db.refresh(db_user)
     return db_user
 
+# 字段映射：前端字段名 -> 数据库字段名
+USER_FIELD_MAPPING = {
+    'nickName': 'nick_name',
+    'avatarUrl': 'avatar_url',
+    'matchType': 'match_type',
+    'userRole': 'user_role',
+    'joinDate': 'join_date'
+}
+
+def _apply_user_data(db_user: User, user_data: Dict[str, Any]):
+    """将更新数据写入用户对象（同步/异步更新共用）"""
+    for key, value in user_data.items():
+        # 使用映射后的字段名，如果没有映射则使用原字段名
+        db_field = USER_FIELD_MAPPING.get(key, key)
+        if hasattr(db_user, db_field):
+            setattr(db_user, db_field, value)
+    
+    # 位置变化且未显式提供坐标时，同步归一化坐标
+    if "location" in user_data and "latitude" not in user_data:
+        _sync_coordinates(db_user)
+
+def _sync_coordinates(db_user: User):
+    """根据 location 字段更新用户坐标"""
+    coordinate = normalize_location(db_user.location)
+    db_user.latitude, db_user.longitude = coordinate if coordinate else (None, None)
+
+@serialized_write
 def delete_user(db: Session, user_id: str) -> bool:
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
@@ -50,7 +81,41 @@ def delete_user(db: Session, user_id: str) -> bool:
         return True
     return False
 
+def get_ranking_candidates(db: Session) -> List[Dict[str, Any]]:
+    """获取排序候选人：每个激活的角色资料对应一条记录，合并用户基础信息"""
+    rows = (
+        db.query(UserProfile, User)
+        .join(User, User.id == UserProfile.user_id)
+        .filter(UserProfile.is_active == 1)
+        .all()
+    )
+    
+    return [_ranking_candidate(profile, user) for profile, user in rows]
+
+def _ranking_candidate(profile: UserProfile, user: User) -> Dict[str, Any]:
+    """合并角色资料与用户基础信息为排序候选人记录"""
+    # 角色类型形如 housing_seeker，取后半部分作为 userRole
+    user_role = profile.role_type.split("_", 1)[-1] if profile.role_type else user.user_role
+    return {
+        # 同一用户可有多个角色资料，快照中以资料ID区分各行
+        "key": profile.id,
+        "id": user.id,
+        "age": user.age,
+        "latitude": user.latitude,
+        "longitude": user.longitude,
+        "location": user.location,
+        "matchType": profile.scene_type,
+        "userRole": user_role,
+        "interests": user.interests or [],
+        "tags": profile.tags or [],
+        "nickName": profile.display_name or user.nick_name,
+        "avatarUrl": profile.avatar_url or user.avatar_url,
+        "occupation": user.occupation,
+        "bio": profile.bio or user.bio,
+    }
+
 # 匹配相关操作
+@serialized_write
 def create_match(db: Session, match_data: Dict[str, Any], details: List[Dict[str, Any]] = None) -> Match:
     db_match = Match(**match_data)
     db.add(db_match)
@@ -76,6 +141,7 @@ def get_matches(db: Session, user_id: Optional[str] = None, skip: int = 0, limit
         query = query.filter(Match.user_id == user_id)
     return query.offset(skip).limit(limit).all()
 
+@serialized_write
 def update_match(db: Session, match_id: str, match_data: Dict[str, Any]) -> Optional[Match]:
     db_match = db.query(Match).filter(Match.id == match_id).first()
     if db_match:
@@ -85,6 +151,7 @@ def update_match(db: Session, match_id: str, match_data: Dict[str, Any]) -> Opti
         db.refresh(db_match)
     return db_match
 
+@serialized_write
 def delete_match(db: Session, match_id: str) -> bool:
     db_match = db.query(Match).filter(Match.id == match_id).first()
     if db_match:
@@ -96,6 +163,7 @@ def delete_match(db: Session, match_id: str) -> bool:
     return False
 
 # 匹配详情相关操作
+@serialized_write
 def add_match_detail(db: Session, match_id: str, detail_data: Dict[str, Any]) -> MatchDetail:
     detail_data["match_id"] = match_id
     db_detail = MatchDetail(**detail_data)
@@ -106,3 +174,99 @@ def add_match_detail(db: Session, match_id: str, detail_data: Dict[str, Any]) ->
 
 def get_match_details(db: Session, match_id: str) -> List[MatchDetail]:
     return db.query(MatchDetail).filter(MatchDetail.match_id == match_id).all()
+
+# 聊天消息相关操作
+@serialized_write
+def create_chat_message(db: Session, message_data: Dict[str, Any]) -> ChatMessage:
+    db_message = ChatMessage(**message_data)
+    db.add(db_message)
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+def get_chat_message(db: Session, message_id: str) -> Optional[ChatMessage]:
+    return db.get(ChatMessage, message_id)
+
+def get_chat_messages(
+    db: Session,
+    match_id: str,
+    limit: int,
+    before: Optional[ChatMessage] = None,
+    after: Optional[ChatMessage] = None
+) -> List[ChatMessage]:
+    """沿 (match_id, timestamp, id) 索引读取一页消息：默认及 before 时从新到旧，after 时从旧到新"""
+    query = db.query(ChatMessage).filter(ChatMessage.match_id == match_id)
+    position = tuple_(ChatMessage.timestamp, ChatMessage.id)
+    if after is not None:
+        query = query.filter(position > tuple_(after.timestamp, after.id))
+        query = query.order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc())
+    else:
+        if before is not None:
+            query = query.filter(position < tuple_(before.timestamp, before.id))
+        query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+    return query.limit(limit).all()
+
+def count_chat_messages_from_others(db: Session, match_id: str, user_id: str, up_to: Optional[str] = None) -> int:
+    """会话中其他人发送的消息数（用户还没有已读记录时作为初始未读数），up_to 不为空时只统计ID不大于它的消息"""
+    query = db.query(ChatMessage).filter(
+        ChatMessage.match_id == match_id, ChatMessage.sender_id != user_id
+    )
+    if up_to is not None:
+        query = query.filter(ChatMessage.id <= up_to)
+    return query.count()
+
+# 已读状态相关操作
+def get_chat_read_states(db: Session, match_id: str) -> List[ChatReadState]:
+    return db.query(ChatReadState).filter(ChatReadState.match_id == match_id).all()
+
+def get_chat_read_state(db: Session, match_id: str, user_id: str) -> Optional[ChatReadState]:
+    return db.get(ChatReadState, (match_id, user_id))
+
+def get_chat_conversations(
+    db: Session,
+    user_id: str,
+    limit: int,
+    before: Optional[ChatReadState] = None
+) -> List[ChatReadState]:
+    """沿 (user_id, last_message_at, match_id) 索引读取用户的一页会话，最近有消息的在前"""
+    query = db.query(ChatReadState).filter(ChatReadState.user_id == user_id)
+    if before is not None:
+        position = tuple_(ChatReadState.last_message_at, ChatReadState.match_id)
+        query = query.filter(position < tuple_(before.last_message_at, before.match_id))
+    query = query.order_by(ChatReadState.last_message_at.desc(), ChatReadState.match_id.desc())
+    return query.limit(limit).all()
+
+_UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert, "mysql": mysql_insert}
+
+def _newer(new_value, old_value):
+    return func.coalesce(new_value, "") >= func.coalesce(old_value, "")
+
+@serialized_write
+def save_chat_read_states(db: Session, rows: List[Dict[str, Any]]):
+    """在一个事务中批量写入已读状态：整批一条 INSERT ... ON CONFLICT（executemany）
+
+    已有记录时已读水位只前进不后退：写入的水位比库中旧时保留库中的水位、已读时间和未读数；
+    最后一条消息同样保留较新的一条。多个进程各自刷写也不会把对方推进的水位覆盖回去。
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERT_DIALECTS:
+        raise NotImplementedError(f"不支持在 {dialect} 上批量写入已读状态")
+    table = ChatReadState.__table__
+    stmt = _UPSERT_DIALECTS[dialect](table)
+    new = stmt.inserted if dialect == "mysql" else stmt.excluded
+    read_newer = _newer(new.last_read_id, table.c.last_read_id)
+    message_newer = _newer(new.last_message_id, table.c.last_message_id)
+    # MySQL 按顺序赋值，后面的条件会读到前面已更新的列，水位列放在各自一组的最后
+    values = [("peer_id", func.coalesce(new.peer_id, table.c.peer_id))]
+    for column in ("last_read_at", "unread", "last_read_id"):
+        values.append((column, case((read_newer, new[column]), else_=table.c[column])))
+    for column in ("last_message_type", "last_message_preview", "last_sender_id", "last_message_at", "last_message_id"):
+        values.append((column, case((message_newer, new[column]), else_=table.c[column])))
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.match_id, table.c.user_id], set_=dict(values))
+    db.execute(stmt, rows)
+    db.commit()
@@ -0,0 +1,181 @@
+"""
+上传文件存储
+上传内容按固定大小的块复制到临时文件，边写边检查大小限制并计算 SHA-256，
+超过限制立即中止并删除临时文件；写完后 fsync，交给存储后端（见 storage_backend）登记为最终文件，
+单次上传占用的内存与文件大小无关，也不会留下写了一半的文件，重复的内容不占用额外存储。
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.services.storage_backend import storage_backend
+
+
+# 支持的图片和视频类型
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"]
+ALLOWED_VIDEO_TYPES = ["video/mp4", "video/avi", "video/mov", "video/wmv", "video/flv", "video/webm", "video/mkv", "video/3gp"]
+ALLOWED_IMAGE_EXTS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+ALLOWED_VIDEO_EXTS = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.3gp']
+
+
+class UploadRejectedError(Exception):
+    """上传的文件类型、扩展名不符合要求"""
+
+
+def resolve_upload_type(content_type: Optional[str], filename: Optional[str]) -> Tuple[str, int, str]:
+    """校验文件类型与扩展名，返回 (扩展名, 大小上限, 类型名称)，不合法时抛出 UploadRejectedError"""
+    if not content_type:
+        raise UploadRejectedError("无法识别文件类型")
+
+    is_image = content_type in ALLOWED_IMAGE_TYPES
+    is_video = content_type in ALLOWED_VIDEO_TYPES
+    if not is_image and not is_video:
+        raise UploadRejectedError(
+            "请上传图片或视频文件。支持的图片格式：JPEG, PNG, GIF, WebP；支持的视频格式：MP4, AVI, MOV, WMV, FLV, WebM, MKV, 3GP"
+        )
+
+    file_ext = os.path.splitext(filename or "unknown")[1].lower()
+    if is_image:
+        if file_ext not in ALLOWED_IMAGE_EXTS:
+            raise UploadRejectedError(f"图片文件扩展名不支持，支持的扩展名：{', '.join(ALLOWED_IMAGE_EXTS)}")
+        return file_ext, settings.MAX_IMAGE_SIZE, "图片"
+    if file_ext not in ALLOWED_VIDEO_EXTS:
+        raise UploadRejectedError(f"视频文件扩展名不支持，支持的扩展名：{', '.join(ALLOWED_VIDEO_EXTS)}")
+    return file_ext, settings.MAX_VIDEO_SIZE, "视频"
+
+
+def size_limit_message(type_name: str, max_size: int) -> str:
+    return f"{type_name}文件大小超过限制，最大允许 {max_size // (1024 * 1024)}MB"
+
+
+# 读取文件开头多少字节用于识别真实类型
+SNIFF_BYTES = 4096
+
+# 声明的 MIME 类型允许的实际内容：同一容器格式的文件经常互相改名（如 iPhone 的 .mov 标成 mp4），视为一致
+_ISO_MEDIA = {"mp4", "mov", "3gp"}
+_MATROSKA = {"webm", "mkv"}
+_ACCEPTED_CONTENT = {
+    "image/jpeg": {"jpeg"},
+    "image/jpg": {"jpeg"},
+    "image/png": {"png"},
+    "image/gif": {"gif"},
+    "image/webp": {"webp"},
+    "video/mp4": _ISO_MEDIA,
+    "video/mov": _ISO_MEDIA,
+    "video/3gp": _ISO_MEDIA,
+    "video/avi": {"avi"},
+    "video/wmv": {"wmv"},
+    "video/flv": {"flv"},
+    "video/webm": _MATROSKA,
+    "video/mkv": _MATROSKA,
+}
+
+
+def sniff_content(head: bytes) -> Optional[str]:
+    """根据文件头的魔数识别实际格式，无法识别时返回 None"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand == b"qt  ":
+            return "mov"
+        if brand.startswith((b"3gp", b"3g2")):
+            return "3gp"
+        return "mp4"
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free", b"skip"):
+        # 没有 ftyp 的老式 QuickTime 文件
+        return "mov"
+    if head.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+        return "wmv"
+    if head.startswith(b"FLV"):
+        return "flv"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm" if b"webm" in head[:64] else "mkv"
+    return None
+
+
+def verify_content(content_type: str, head: bytes):
+    """检查文件头与声明的类型一致，不一致时抛出 UploadRejectedError"""
+    actual = sniff_content(head)
+    if actual is None:
+        raise UploadRejectedError("无法识别的文件内容，请上传图片或视频文件")
+    if actual not in _ACCEPTED_CONTENT.get(content_type, ()):
+        raise UploadRejectedError("文件内容与声明的类型不符")
+
+
+class UploadTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"upload exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+def _write_chunk(f, chunk: bytes):
+    f.write(chunk)
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+def _discard(f, temp_path: str):
+    f.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+async def save_upload(
+    upload: UploadFile,
+    prefix: str,
+    file_ext: str,
+    max_size: int,
+    chunk_size: Optional[int] = None,
+    content_type: Optional[str] = None
+) -> Tuple[str, int, bool]:
+    """将上传文件流式保存为存储键 {prefix}/{sha256}{file_ext}，返回 (文件名, 字节数, 是否新增了文件)
+
+    超过 max_size 时抛出 UploadTooLargeError；传入 content_type 时先检查文件头，
+    与声明的类型不符时抛出 UploadRejectedError。两种情况存储中都不留下任何文件。
+    """
+    chunk_size = max(chunk_size or settings.UPLOAD_CHUNK_SIZE, SNIFF_BYTES)
+    # 解析器已经统计出大小时直接拒绝，不必复制
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLargeError(max_size)
+
+    # 第一块足够识别格式，写入任何数据之前检查
+    chunk = await upload.read(chunk_size)
+    if content_type is not None:
+        verify_content(content_type, chunk[:SNIFF_BYTES])
+
+    temp_path = await run_in_threadpool(storage_backend.staging_path)
+    f = await run_in_threadpool(open, temp_path, "wb")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        while chunk:
+            written += len(chunk)
+            if written > max_size:
+                raise UploadTooLargeError(max_size)
+            digest.update(chunk)
+            await run_in_threadpool(_write_chunk, f, chunk)
+            chunk = await upload.read(chunk_size)
+        await run_in_threadpool(_sync, f)
+    except BaseException:
+        await run_in_threadpool(_discard, f, temp_path)
+        raise
+    file_name, created = await run_in_threadpool(storage_backend.commit, temp_path, digest.hexdigest(), prefix, file_ext)
+    return file_name, written, created
@@ -0,0 +1,239 @@
+"""
+图片缩略图/变体生成
+图片上传成功后提交到后台线程池，按 IMAGE_VARIANT_WIDTHS 生成等比缩放的 WebP 变体，
+与原图放在同一目录：/uploads/{user_id}/{name}.jpg → /uploads/{user_id}/{name}_320.webp。
+卡片、资料等响应通过 variant_url 引用不小于显示宽度的最小变体；变体尚未生成、
+原图本身就足够小或未安装 Pillow 时返回原图地址，行为与之前一致。
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # 未安装 Pillow 时不生成变体，所有地址保持原图
+    Image = None
+    ImageOps = None
+
+UPLOAD_URL_PREFIX = "/uploads/"
+VARIANT_EXT = ".webp"
+# 动图缩放后只剩第一帧，不生成变体
+RESIZABLE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+GENERATED_CACHE_SIZE = 100_000
+# 从文件系统探测到的变体缓存时间（秒）：变体可能稍后由其他进程生成，未生成的结果不能永久缓存
+PROBE_TTL = 60
+
+
+def _parse_widths(value: str) -> Tuple[int, ...]:
+    return tuple(sorted({int(w) for w in value.split(",") if w.strip()}))
+
+
+def variant_path(file_path: str, width: int) -> str:
+    stem = os.path.splitext(file_path)[0]
+    return f"{stem}_{width}{VARIANT_EXT}"
+
+
+# 变体 {内容哈希}_{宽度}.webp：只为以内容哈希命名的上传生成变体，
+# 旧的上传文件（如 photo_2.webp）即使以 _数字.webp 结尾也不是变体
+_VARIANT_NAME_RE = re.compile(r"[0-9a-f]{64}_(\d+)" + re.escape(VARIANT_EXT))
+
+
+def is_variant(file_name: str, widths: Optional[Iterable[int]] = None) -> bool:
+    """文件名是否为派生的缩略图变体（不计入用户配额），宽度须为配置的变体宽度之一"""
+    match = _VARIANT_NAME_RE.fullmatch(file_name)
+    if match is None:
+        return False
+    return int(match.group(1)) in (image_variant_pipeline.widths if widths is None else widths)
+
+
+class ImageVariantPipeline:
+    """后台生成图片变体，并为响应挑选合适尺寸的地址"""
+
+    def __init__(self, widths: Optional[Iterable[int]] = None, workers: Optional[int] = None):
+        self.widths = tuple(sorted(widths)) if widths else _parse_widths(settings.IMAGE_VARIANT_WIDTHS)
+        self.workers = workers or settings.IMAGE_VARIANT_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: set[Future] = set()
+        # 已生成的变体宽度，命中时选择地址无需访问文件系统
+        self._generated: Dict[str, Tuple[int, ...]] = {}
+        # 从文件系统探测到的变体宽度（包括没有变体）及过期时间，PROBE_TTL 内不重复访问文件系统
+        self._probed: Dict[str, Tuple[float, Tuple[int, ...]]] = {}
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def check_dependencies(self):
+        """配置了变体宽度却未安装 Pillow 时抛出 RuntimeError；启动时调用，避免静默地不生成变体"""
+        if self.widths and not self.available:
+            raise RuntimeError(
+                "IMAGE_VARIANT_WIDTHS 已配置但未安装 Pillow：请 pip install Pillow，"
+                "或设置 IMAGE_VARIANT_WIDTHS= 关闭图片变体"
+            )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variants")
+            return self._executor
+
+    def submit(self, file_path: str) -> Optional[Future]:
+        """上传完成事件：图片提交到线程池生成变体，其他文件忽略"""
+        if not self.available or os.path.splitext(file_path)[1].lower() not in RESIZABLE_EXTS:
+            return None
+        future = self._get_executor().submit(self.generate, file_path)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if future.exception() is not None:
+            logger.warning("image_variant_failed", error=str(future.exception()))
+
+    def generate(self, file_path: str) -> List[int]:
+        """生成比原图窄的各个宽度的变体，返回生成（或已存在）的宽度"""
+        with Image.open(file_path) as source:
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            widths = []
+            for width in self.widths:
+                if width >= image.width:
+                    break
+                target = variant_path(file_path, width)
+                if not os.path.exists(target):
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image.resize((width, height), Image.LANCZOS)
+                    temp_path = os.path.join(os.path.dirname(target), f".{uuid.uuid4().hex}.part")
+                    try:
+                        resized.save(temp_path, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+                        os.replace(temp_path, target)
+                    except BaseException:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                        raise
+                widths.append(width)
+        if len(self._generated) >= GENERATED_CACHE_SIZE:
+            self._generated.clear()
+        self._generated[file_path] = tuple(widths)
+        self._probed.pop(file_path, None)
+        return widths
+
+    def local_path(self, url: str) -> Optional[str]:
+        """/uploads/ 地址对应的本地文件路径，其他地址返回 None"""
+        if not url.startswith(UPLOAD_URL_PREFIX):
+            return None
+        relative = url[len(UPLOAD_URL_PREFIX):]
+        if ".." in relative.split("/"):
+            return None
+        return os.path.join(settings.UPLOAD_DIR, relative)
+
+    def variant_url(self, url: Optional[str], display_width: int) -> Optional[str]:
+        """不小于 display_width 的最小已生成变体地址，没有时返回原地址"""
+        if not url or not self.available:
+            return url
+        file_path = self.local_path(url)
+        if file_path is None or os.path.splitext(file_path)[1].lower() not in RESIZABLE_EXTS:
+            return url
+        generated = self._variant_widths(file_path)
+        for width in self.widths:
+            if width < display_width:
+                continue
+            if width in generated:
+                return variant_path(url, width)
+            # 更大的变体只会更大，直接用原图
+            break
+        return url
+
+    def _variant_widths(self, file_path: str) -> Tuple[int, ...]:
+        """原图已有的变体宽度：本进程生成的直接返回，否则查文件系统并缓存 PROBE_TTL 秒"""
+        generated = self._generated.get(file_path)
+        if generated is not None:
+            return generated
+        now = time.monotonic()
+        probed = self._probed.get(file_path)
+        if probed is not None and probed[0] > now:
+            return probed[1]
+        widths = tuple(width for width in self.widths if os.path.exists(variant_path(file_path, width)))
+        if len(self._probed) >= GENERATED_CACHE_SIZE:
+            self._probed.clear()
+        self._probed[file_path] = (now + PROBE_TTL, widths)
+        return widths
+
+    def with_variants(self, item: Dict[str, Any], fields: Iterable[str], display_width: int) -> Dict[str, Any]:
+        """把 item 中的图片字段（字符串或字符串列表）换成变体地址；没有变化时返回原对象"""
+        updates = {}
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, str):
+                replaced = self.variant_url(value, display_width)
+                if replaced != value:
+                    updates[field] = replaced
+            elif isinstance(value, list) and value and isinstance(value[0], str):
+                replaced = [self.variant_url(v, display_width) for v in value]
+                if replaced != value:
+                    updates[field] = replaced
+        return {**item, **updates} if updates else item
+
+    def remove_variants(self, file_path: str) -> int:
+        """删除原图对应的全部变体，返回删除的数量"""
+        self._generated.pop(file_path, None)
+        self._probed.pop(file_path, None)
+        removed = 0
+        for width in self.widths:
+            try:
+                os.remove(variant_path(file_path, width))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待已提交的任务完成（测试与关闭时使用）"""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "available": self.available,
+            "widths": list(self.widths),
+            "pending": pending,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+image_variant_pipeline = ImageVariantPipeline()
@@ -0,0 +1,169 @@
+"""
+本地对象存储模拟
+用目录模拟 S3 兼容对象存储（类似单机 MinIO），实现 S3StorageBackend 用到的 boto3 S3 客户端方法：
+head_object、put_object、get_object（含 Range）、delete_object 以及分片上传的
+create_multipart_upload、upload_part、complete_multipart_upload、abort_multipart_upload。
+对象保存在 {root}/{bucket}/{key}，分片保存在 {root}/.multipart/{upload_id}/ 下，
+完成时按 Parts 的顺序合并后原子替换。错误与 botocore 的 ClientError 一样带有 response["Error"]["Code"]。
+通过 S3_ENDPOINT_URL=file:///目录 启用，只用于本地开发和测试。
+"""
+
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, List, Optional
+
+MULTIPART_DIR = ".multipart"
+
+
+class ObjectStoreError(Exception):
+    """与 botocore.exceptions.ClientError 相同的错误结构"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class _RangeBody:
+    """get_object 返回的 Body：只能读取 [start, end] 区间"""
+
+    def __init__(self, f: BinaryIO, start: int, end: int):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = end - start + 1
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        size = self._remaining if amt is None or amt < 0 else min(amt, self._remaining)
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+def _read_body(body: Any) -> bytes:
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    if isinstance(body, str):
+        return body.encode()
+    return body.read()
+
+
+def _etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+class LocalObjectStore:
+    """目录模拟的 S3 客户端"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _object_path(self, bucket: str, key: str) -> str:
+        if not key or ".." in key.split("/") or key.startswith("/"):
+            raise ObjectStoreError("InvalidArgument", f"非法的对象键: {key}")
+        return os.path.join(self.root, bucket, key)
+
+    def _upload_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise ObjectStoreError("NoSuchUpload", upload_id)
+        return os.path.join(self.root, MULTIPART_DIR, upload_id)
+
+    def _write(self, path: str, chunks: List[bytes]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.part")
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        path = self._object_path(Bucket, Key)
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise ObjectStoreError("404", "Not Found")
+        return {
+            "ContentLength": st.st_size,
+            "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        }
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs) -> Dict[str, Any]:
+        data = _read_body(Body)
+        self._write(self._object_path(Bucket, Key), [data])
+        return {"ETag": _etag(data)}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        head = self.head_object(Bucket, Key)
+        size = head["ContentLength"]
+        start, end = 0, size - 1
+        if Range:
+            first, _, last = Range.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                raise ObjectStoreError("InvalidRange", Range)
+        f = open(self._object_path(Bucket, Key), "rb")
+        return {**head, "Body": _RangeBody(f, start, end)}
+
+    def delete_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        try:
+            os.remove(self._object_path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(upload_id))
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: Any) -> Dict[str, Any]:
+        upload_dir = self._upload_dir(UploadId)
+        if not os.path.isdir(upload_dir):
+            raise ObjectStoreError("NoSuchUpload", UploadId)
+        data = _read_body(Body)
+        self._write(os.path.join(upload_dir, f"{PartNumber:05d}"), [data])
+        return {"ETag": _etag(data)}
+
+    def complete_multipart_upload(
+        self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        upload_dir = self._upload_dir(UploadId)
+        if not os.path.isdir(upload_dir):
+            raise ObjectStoreError("NoSuchUpload", UploadId)
+        chunks = []
+        for part in MultipartUpload["Parts"]:
+            try:
+                with open(os.path.join(upload_dir, f"{part['PartNumber']:05d}"), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                raise ObjectStoreError("InvalidPart", str(part["PartNumber"]))
+            if _etag(data) != part["ETag"]:
+                raise ObjectStoreError("InvalidPart", str(part["PartNumber"]))
+            chunks.append(data)
+        self._write(self._object_path(Bucket, Key), chunks)
+        self.abort_multipart_upload(Bucket, Key, UploadId)
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> Dict[str, Any]:
+        upload_dir = self._upload_dir(UploadId)
+        if os.path.isdir(upload_dir):
+            for name in os.listdir(upload_dir):
+                os.remove(os.path.join(upload_dir, name))
+            os.rmdir(upload_dir)
+        return {}
+
+    def pending_uploads(self) -> int:
+        """未完成的分片上传数量（测试使用）"""
+        multipart_root = os.path.join(self.root, MULTIPART_DIR)
+        return len(os.listdir(multipart_root)) if os.path.isdir(multipart_root) else 0
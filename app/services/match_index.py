@@ -0,0 +1,62 @@
+import bisect
+import itertools
+from typing import Any, Iterator, Optional
+
+
+class MatchParticipantIndex:
+    """匹配参与者索引
+
+    维护 用户ID -> 该用户参与的匹配（按 createTime 有序）的邻接表，以及 匹配ID -> 双方用户ID。
+    用户的匹配列表只遍历该用户自己的匹配，耗时与匹配总数无关；参与者校验为 O(1)。
+    createTime 相同的匹配按加入顺序排列，与原先对全部匹配做稳定排序的结果一致。
+    """
+
+    def __init__(self):
+        # 用户ID -> [(createTime, -加入序号, 匹配ID)]，升序；倒序遍历即从新到旧
+        self._by_user: dict[str, list[tuple[int, int, str]]] = {}
+        self._entries: dict[str, tuple[tuple[int, int, str], tuple[str, ...]]] = {}
+        self._seq = itertools.count()
+
+    def add(self, match: dict[str, Any]):
+        """加入匹配；已存在时按新的参与者和时间重建"""
+        match_id = match["id"]
+        if match_id in self._entries:
+            self.remove(match_id)
+        entry = (match.get("createTime") or 0, -next(self._seq), match_id)
+        participants = tuple(dict.fromkeys(
+            user_id for user_id in (match.get("userId1"), match.get("userId2")) if user_id
+        ))
+        for user_id in participants:
+            bisect.insort(self._by_user.setdefault(user_id, []), entry)
+        self._entries[match_id] = (entry, participants)
+
+    def remove(self, match_id: str):
+        entry, participants = self._entries.pop(match_id, (None, ()))
+        for user_id in participants:
+            entries = self._by_user.get(user_id)
+            if not entries:
+                continue
+            position = bisect.bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+            if not entries:
+                del self._by_user[user_id]
+
+    def matches_of(self, user_id: str) -> Iterator[str]:
+        """用户参与的匹配ID，从新到旧"""
+        # 复制一份，遍历期间新增匹配不影响迭代
+        for entry in reversed(list(self._by_user.get(user_id, ()))):
+            yield entry[2]
+
+    def count(self, user_id: str) -> int:
+        return len(self._by_user.get(user_id, ()))
+
+    def participants(self, match_id: str) -> Optional[tuple[str, ...]]:
+        entry = self._entries.get(match_id)
+        return entry[1] if entry else None
+
+    def is_participant(self, match_id: str, user_id: str) -> bool:
+        return user_id in (self.participants(match_id) or ())
+
+    def __len__(self) -> int:
+        return len(self._entries)
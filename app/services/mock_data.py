@@ -1,66 +1,113 @@
 from typing import Any, Optional
 import uuid
+import bisect
 import time
 import random
 import json
 import os
+from app.services.card_index import CardIndex, ANY_ROLE, encode_cursor, decode_cursor
+from app.services.ranking import RankingEngine, candidate_from_user
+from app.services.user_index import UserLookupIndex
+from app.services.match_index import MatchParticipantIndex
+from app.services.token_cache import token_cache
+from app.services.user_journal import UserJournal
+from app.services.image_variants import image_variant_pipeline
+from app.services.chat_store import chat_store
+from app.services.chat_read_state import chat_read_tracker
+from app.utils.lazy import LazyService
+from app.utils.geo import GridIndex, location_of, haversine_km, format_distance
+from app.config import settings
+from app.utils.logger import get_logger, HOT_PATH_SAMPLE_RATE
+
+# 卡片中引用图片的字段，列表页按卡片显示宽度引用缩略图
+CARD_IMAGE_FIELDS = ("avatar", "images")
+
+logger = get_logger(__name__)
+
+# 点赞后判定为匹配成功的最低得分
+MATCH_SCORE_THRESHOLD = 0.5
 
 class MockDataService:
     """模拟数据服务"""
     
-    def __init__(self):
+    def __init__(self, user_data_file: Optional[str] = None):
         """初始化模拟数据"""
         self.users: dict[str, dict[str, Any]] = {}
+        self.users_version = 0
+        self.user_lookup = UserLookupIndex()
         self.cards: dict[str, dict[str, Any]] = {}
+        self.card_index = CardIndex()
+        self.card_geo = GridIndex()
         self.matches: dict[str, dict[str, Any]] = {}
-        self.messages: dict[str, list[dict[str, Any]]] = {}
+        self.match_index = MatchParticipantIndex()
         self.sms_codes: dict[str, dict[str, Any]] = {}
         
-        # 用户数据本地存储文件路径
-        self.user_data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "test_user_data.json")
+        # 候选人排序引擎，用户数据变化后按需重建快照
+        self.ranking_engine = RankingEngine(
+            loader=lambda: [candidate_from_user(user) for user in list(self.users.values())],
+            version=lambda: self.users_version,
+            max_age=settings.RANKING_SNAPSHOT_MAX_AGE
+        )
+        
+        # 用户数据本地存储：快照文件 + 追加日志，每次变更只追加一条记录
+        self.user_data_file = user_data_file or settings.MOCK_USER_DATA_FILE
+        self.journal = UserJournal(
+            self.user_data_file,
+            fsync_interval=settings.USER_JOURNAL_FSYNC_INTERVAL,
+            compact_records=settings.USER_JOURNAL_COMPACT_RECORDS
+        )
+        self._persist_enabled = False
         
         # 初始化一些测试数据
         self._init_test_data()
         
-        # 尝试从本地文件加载用户数据
+        # 尝试从本地文件加载用户数据；之后的用户变更写入日志
         self._load_user_data_from_file()
+        self._persist_enabled = True
     
     def _load_fixed_housing_data(self):
         """加载固定的房源测试数据"""
         try:
-            # 获取项目根目录下的测试数据文件
-            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            json_file_path = os.path.join(current_dir, "fixed_housing_test_data.json")
+            json_file_path = settings.MOCK_FIXED_HOUSING_FILE
             
             if os.path.exists(json_file_path):
                 with open(json_file_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
         except Exception as e:
-            print(f"Warning: Could not load fixed housing data: {e}")
+            logger.warning("fixed_housing_data_load_failed", error=e)
         
         return None
     
     def _load_user_data_from_file(self):
-        """从本地文件加载用户数据"""
+        """从本地快照加载用户数据并回放变更日志"""
         try:
-            if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r', encoding='utf-8') as f:
-                    user_data = json.load(f)
-                    # 更新内存中的用户数据
-                    for user_id, user in user_data.items():
-                        self.users[user_id] = user
-                    print(f"Loaded user data from {self.user_data_file}")
+            user_data = self.journal.load()
+            if user_data:
+                # 更新内存中的用户数据
+                for user_id, user in user_data.items():
+                    user.setdefault("id", user_id)
+                    self.users[user_id] = user
+                    self.user_lookup.reindex(user)
+                self.users_version += 1
+                logger.info(
+                    "user_data_loaded", path=self.user_data_file, users=len(user_data),
+                    journal_records=self.journal.pending_records
+                )
         except Exception as e:
-            print(f"Warning: Could not load user data from file: {e}")
+            logger.warning("user_data_load_failed", path=self.user_data_file, error=e)
     
-    def _save_user_data_to_file(self):
-        """将用户数据保存到本地文件"""
+    def _persist_user(self, user_id: str):
+        """将单个用户的变更追加到日志"""
+        if not self._persist_enabled:
+            return
         try:
-            with open(self.user_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, ensure_ascii=False, indent=2)
-                print(f"Saved user data to {self.user_data_file}")
+            user = self.users.get(user_id)
+            if user is None:
+                self.journal.delete(user_id)
+            else:
+                self.journal.put(user)
         except Exception as e:
-            print(f"Warning: Could not save user data to file: {e}")
+            logger.warning("user_data_save_failed", path=self.journal.journal_path, user_id=user_id, error=e)
 
     def _init_test_data(self):
         """初始化测试数据"""
@@ -78,10 +125,12 @@ class MockDataService:
                 if "houseInfo" in card_data and "videoUrl" not in card_data["houseInfo"]:
                     card_data["houseInfo"]["videoUrl"] = "https://cdn.pixabay.com/video/2024/02/03/199109-909564730_tiny.mp4"
                 self.cards[card_data["id"]] = card_data
+                self.card_index.add(card_data)
+                self.card_geo.add(card_data["id"], location_of(card_data))
             
             # 加载固定的匹配数据
             for match_data in fixed_data.get("matches", []):
-                self.matches[match_data["id"]] = match_data
+                self._add_match(match_data)
         
         # 创建默认测试用户（如果没有加载到固定数据）
         if "user_001" not in self.users:
@@ -128,8 +177,7 @@ class MockDataService:
             })
         
         # 如果没有房源卡片，创建一些默认的
-        housing_cards = [card for card in self.cards.values() if card.get("matchType") == "housing"]
-        if not housing_cards:
+        if not self.card_index.count("housing", ANY_ROLE):
             for i in range(1, 4):
                 card_id = f"card_house_default_{i:03d}"
                 self.create_card({
@@ -138,7 +186,6 @@ class MockDataService:
                     "avatar": f"https://picsum.photos/200/200?random=house{i}",
                     "age": None,
                     "occupation": "房源",
-                    "distance": f"{random.randint(1, 15)}km",
                     "interests": [],
                     "matchType": "housing",
                     "userRole": "seeker",
@@ -155,7 +202,7 @@ class MockDataService:
         
         # 创建默认匹配记录（如果没有）
         if not self.matches:
-            self.matches["match_001"] = {
+            self._add_match({
                 "id": "match_001",
                 "userId1": "user_001",
                 "userId2": "card_001",
@@ -164,13 +211,18 @@ class MockDataService:
                 "isRead": False,
                 "type": "dating",
                 "status": "matched"
-            }
+            })
         
-        # 创建测试消息
-        if "match_001" not in self.messages:
-            self.messages["match_001"] = []
+        # 创建测试消息（消息持久化在数据库中，重启后不重复创建）
+        if "match_001" in self.matches and not chat_store.has_messages("match_001"):
             self.send_message("match_001", "user_001", "你好，很高兴认识你！", "text")
             self.send_message("match_001", "card_001", "你好，我也很高兴认识你！", "text")
+        
+        # 固定匹配也出现在双方的会话列表中（已有会话摘要时不变）
+        for match in self.matches.values():
+            chat_read_tracker.start_conversation(
+                match["id"], (match["userId1"], match["userId2"]), match.get("createTime", 0)
+            )
     
     def create_user(self, user_data: dict[str, Any]) -> dict[str, Any]:
         """创建用户"""
@@ -179,19 +231,42 @@ class MockDataService:
             "id": user_id,
             **user_data
         }
-        print(f"DEBUG: Creating user with ID: {user_id}")
         self.users[user_id] = user
-        print(f"DEBUG: Users after creation: {list(self.users.keys())}")
+        self.user_lookup.reindex(user)
+        token_cache.invalidate_user(user_id)
+        self.users_version += 1
+        self._persist_user(user_id)
+        logger.debug("user_created", user_id=user_id, user_count=len(self.users))
         return user
     
     def get_user_by_id(self, user_id: str) -> Optional[dict[str, Any]]:
         """根据ID获取用户"""
-        print(f"DEBUG: Looking for user_id: {user_id}")
-        print(f"DEBUG: Available users: {list(self.users.keys())}")
         result = self.users.get(user_id)
-        print(f"DEBUG: Found user: {result is not None}")
+        logger.debug("user_lookup", sample_rate=HOT_PATH_SAMPLE_RATE, user_id=user_id, found=result is not None)
         return result
     
+    def get_user_by_openid(self, openid: str) -> Optional[dict[str, Any]]:
+        """根据微信openid获取用户"""
+        return self.users.get(self.user_lookup.get("openid", openid))
+    
+    def get_user_by_phone(self, phone: str) -> Optional[dict[str, Any]]:
+        """根据手机号获取用户"""
+        return self.users.get(self.user_lookup.get("phone", phone))
+    
+    def get_user_by_email(self, email: str) -> Optional[dict[str, Any]]:
+        """根据邮箱获取用户"""
+        return self.users.get(self.user_lookup.get("email", email))
+    
+    def delete_user(self, user_id: str) -> bool:
+        """删除用户"""
+        if self.users.pop(user_id, None) is None:
+            return False
+        self.user_lookup.remove(user_id)
+        token_cache.invalidate_user(user_id)
+        self.users_version += 1
+        self._persist_user(user_id)
+        return True
+    
     def get_user_by_token(self, token: str) -> Optional[dict[str, Any]]:
         """根据token获取用户信息（测试模式）"""
         # 测试模式下，token就是用户ID
@@ -210,9 +285,16 @@ class MockDataService:
             return None  # Return None to indicate user not found
         
         user.update(profile_data)
+        # 位置变化且未显式提供坐标时，丢弃旧坐标，改为从 location 解析
+        if "location" in profile_data and "latitude" not in profile_data:
+            user.pop("latitude", None)
+            user.pop("longitude", None)
+        self.user_lookup.reindex(user)
+        token_cache.invalidate_user(user_id)
+        self.users_version += 1
         
-        # 将更新后的用户数据保存到本地文件
-        self._save_user_data_to_file()
+        # 将更新后的用户数据追加到本地日志
+        self._persist_user(user_id)
         
         return user
     
@@ -237,29 +319,124 @@ class MockDataService:
                 ])
         
         self.cards[card_id] = card
+        self.card_index.add(card)
+        self.card_geo.add(card_id, location_of(card))
         return card
     
-    def get_cards(self, match_type: str, user_role: str, page: int, page_size: int) -> dict[str, Any]:
-        """获取匹配卡片"""
+    def get_cards(
+        self,
+        match_type: str,
+        user_role: str,
+        page: int,
+        page_size: int,
+        origin: Optional[tuple[float, float]] = None,
+        radius_km: Optional[float] = None
+    ) -> dict[str, Any]:
+        """获取匹配卡片；传入 origin 时附带距离，同时传入 radius_km 时只返回半径内的卡片"""
         # 对于房源匹配，seeker用户应该看到所有房源卡片（不管房源的userRole）
-        if match_type == "housing":
-            filtered_cards = [
-                card for card in self.cards.values()
-                if card.get("matchType") == match_type
-            ]
-        else:
-            # 对于其他类型的匹配，按原逻辑过滤
-            filtered_cards = [
-                card for card in self.cards.values()
-                if card.get("matchType") == match_type and card.get("userRole") == user_role
-            ]
+        role_key = ANY_ROLE if match_type == "housing" else user_role
         
         start = (page - 1) * page_size
-        end = start + page_size
+        if origin is not None and radius_km is not None:
+            nearby = self._cards_within(match_type, role_key, origin, radius_km)
+            card_ids = [card_id for _, card_id in nearby[start:start + page_size]]
+            total = len(nearby)
+        else:
+            card_ids = self.card_index.page(match_type, role_key, start, page_size)
+            total = self.card_index.count(match_type, role_key)
+        
+        return {
+            "total": total,
+            "list": self._cards_with_distance(card_ids, origin),
+            "page": page,
+            "pageSize": page_size,
+            "nextCursor": self._next_card_cursor(card_ids, start + len(card_ids) < total)
+        }
+    
+    def get_cards_by_cursor(
+        self,
+        match_type: str,
+        user_role: str,
+        cursor: Optional[str],
+        page_size: int,
+        origin: Optional[tuple[float, float]] = None,
+        radius_km: Optional[float] = None
+    ) -> dict[str, Any]:
+        """基于游标获取匹配卡片，不统计总数；游标无效时抛出 ValueError"""
+        role_key = ANY_ROLE if match_type == "housing" else user_role
+        after_seq = decode_cursor(cursor)
+        
+        if origin is not None and radius_km is not None:
+            nearby = self._cards_within(match_type, role_key, origin, radius_km)
+            begin = 0 if after_seq is None else bisect.bisect_right(nearby, after_seq, key=lambda item: item[0])
+            card_ids = [card_id for _, card_id in nearby[begin:begin + page_size]]
+            has_more = begin + page_size < len(nearby)
+        else:
+            card_ids, has_more = self.card_index.page_after(match_type, role_key, after_seq, page_size)
+        
+        return {
+            "list": self._cards_with_distance(card_ids, origin),
+            "pageSize": page_size,
+            "hasMore": has_more,
+            "nextCursor": self._next_card_cursor(card_ids, has_more)
+        }
+    
+    def _cards_within(self, match_type: str, role_key: str, origin: tuple[float, float], radius_km: float) -> list[tuple[int, str]]:
+        """通过网格索引取半径内且属于该场景/角色的卡片，按 (序号, ID) 升序返回"""
+        nearby = []
+        for card_id in self.card_geo.within(origin[0], origin[1], radius_km):
+            card = self.cards.get(card_id)
+            if card is None or card.get("matchType") != match_type:
+                continue
+            if role_key != ANY_ROLE and card.get("userRole") != role_key:
+                continue
+            nearby.append((self.card_index.seq_of(card_id), card_id))
+        nearby.sort()
+        return nearby
+    
+    def _cards_with_distance(self, card_ids: list[str], origin: Optional[tuple[float, float]]) -> list[dict[str, Any]]:
+        """读取卡片，图片换成缩略图地址；已知请求方位置时按实际距离填充 distance"""
+        cards = [
+            image_variant_pipeline.with_variants(self.cards[card_id], CARD_IMAGE_FIELDS, settings.CARD_IMAGE_WIDTH)
+            for card_id in card_ids
+        ]
+        if origin is None:
+            return cards
+        result = []
+        for card in cards:
+            coordinate = self.card_geo.get(card["id"])
+            if coordinate is not None:
+                card = {**card, "distance": format_distance(haversine_km(*origin, *coordinate))}
+            result.append(card)
+        return result
+    
+    def _next_card_cursor(self, card_ids: list[str], has_more: bool) -> Optional[str]:
+        """根据当前页最后一张卡片生成下一页游标"""
+        if not card_ids or not has_more:
+            return None
+        return encode_cursor(self.card_index.seq_of(card_ids[-1]))
+    
+    def get_ranked_cards(
+        self,
+        requester: dict[str, Any],
+        match_type: str,
+        user_role: str,
+        page: int,
+        page_size: int,
+        radius_km: Optional[float] = None
+    ) -> dict[str, Any]:
+        """按请求方偏好排序获取候选用户卡片，radius_km 不为空时只返回半径内的用户"""
+        ranked, total = self.ranking_engine.rank(
+            requester, match_type, user_role, (page - 1) * page_size, page_size, radius_km=radius_km
+        )
+        origin = location_of(requester)
         
         return {
-            "total": len(filtered_cards),
-            "list": filtered_cards[start:end],
+            "total": total,
+            "list": [
+                user_to_card(self.users[user_id], score, origin)
+                for user_id, score in ranked if user_id in self.users
+            ],
             "page": page,
             "pageSize": page_size
         }
@@ -268,8 +445,12 @@ class MockDataService:
         """创建匹配"""
         # 在实际应用中，需要检查用户是否已经对该卡片进行过操作
         
-        # 模拟匹配逻辑
-        is_match = action == "like" and random.random() > 0.5
+        # 对方是用户时按偏好得分判定，普通卡片保持原有的模拟匹配逻辑
+        is_match = False
+        if action == "like":
+            user = self.users.get(user_id)
+            score = self.ranking_engine.score_pair(user, card_id) if user else None
+            is_match = score >= MATCH_SCORE_THRESHOLD if score is not None else random.random() > 0.5
         
         result = {
             "isMatch": is_match,
@@ -288,11 +469,9 @@ class MockDataService:
                 "type": "dating",
                 "status": "matched"
             }
-            self.matches[match_id] = match
+            self._add_match(match)
+            chat_read_tracker.start_conversation(match_id, (user_id, card_id), match["createTime"])
             result["matchId"] = match_id
-            
-            # 初始化消息列表
-            self.messages[match_id] = []
         
         return result
     
@@ -406,30 +585,42 @@ class MockDataService:
             "pageSize": page_size
         }
 
+    def _add_match(self, match: dict[str, Any]):
+        """保存匹配并加入参与者索引"""
+        self.matches[match["id"]] = match
+        self.match_index.add(match)
+    
+    def is_match_participant(self, match_id: str, user_id: str) -> bool:
+        """用户是否参与该匹配（查参与者索引）"""
+        return self.match_index.is_participant(match_id, user_id)
+    
     def get_matches_old(self, user_id: str, status: str, page: int, page_size: int) -> dict[str, Any]:
         """获取匹配列表 - 原有方法保持兼容性"""
-        filtered_matches = []
-        
-        for match in self.matches.values():
-            if match["userId1"] == user_id or match["userId2"] == user_id:
-                if status == "all" or \
-                   (status == "new" and not match["isRead"]) or \
-                   (status == "contacted" and match["isRead"]):
-                    # 添加卡片信息
-                    other_user_id = match["userId2"] if match["userId1"] == user_id else match["userId1"]
-                    card_info = self.cards.get(other_user_id, {}) or self.users.get(other_user_id, {})
-                    match_with_card = {**match, "cardInfo": card_info}
-                    filtered_matches.append(match_with_card)
-        
-        # 按创建时间排序
-        filtered_matches.sort(key=lambda x: x["createTime"], reverse=True)
+        # 参与者索引已按创建时间排序，只遍历该用户的匹配
+        filtered_matches = [
+            match for match in (self.matches[match_id] for match_id in self.match_index.matches_of(user_id))
+            if status == "all" or
+            (status == "new" and not match["isRead"]) or
+            (status == "contacted" and match["isRead"])
+        ]
         
         start = (page - 1) * page_size
         end = start + page_size
         
+        # 只为当前页添加卡片信息和未读数
+        page_matches = []
+        for match in filtered_matches[start:end]:
+            other_user_id = match["userId2"] if match["userId1"] == user_id else match["userId1"]
+            card_info = self.cards.get(other_user_id, {}) or self.users.get(other_user_id, {})
+            page_matches.append({
+                **match,
+                "cardInfo": card_info,
+                "unreadCount": chat_read_tracker.unread_count(match["id"], user_id)
+            })
+        
         return {
             "total": len(filtered_matches),
-            "list": filtered_matches[start:end],
+            "list": page_matches,
             "page": page,
             "pageSize": page_size
         }
@@ -449,51 +640,72 @@ class MockDataService:
         card_info = self.cards.get(other_user_id, {}) or self.users.get(other_user_id, {})
         return {**match, "cardInfo": card_info}
     
-    def get_chat_history(self, match_id: str, page: int, page_size: int) -> dict[str, Any]:
-        """获取聊天记录"""
-        messages = self.messages.get(match_id, [])
-        
-        # 按时间排序
-        messages.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        return {
-            "total": len(messages),
-            "list": messages[start:end],
-            "page": page,
-            "pageSize": page_size
-        }
+    def get_chat_history(
+        self, match_id: str, page_size: int, before: Optional[str] = None, after: Optional[str] = None
+    ) -> dict[str, Any]:
+        """获取聊天记录（从新到旧），before/after 为消息ID游标"""
+        page = chat_store.history(match_id, page_size, before=before, after=after)
+        chat_read_tracker.apply_read_flags(match_id, page["list"])
+        return page
     
     def send_message(self, match_id: str, sender_id: str, content: str, msg_type: str) -> dict[str, Any]:
         """发送消息"""
-        if match_id not in self.messages:
-            self.messages[match_id] = []
-        
         # 获取发送者信息
         sender = self.get_user_by_id(sender_id) or self.cards.get(sender_id, {})
         
-        message = {
-            "id": str(uuid.uuid4()),
-            "content": content,
-            "type": msg_type,
-            "senderId": sender_id,
-            "senderAvatar": sender.get("avatarUrl") or sender.get("avatar", ""),
-            "senderName": sender.get("nickName") or sender.get("name", ""),
-            "timestamp": int(time.time()),
-            "isRead": False
-        }
-        
-        self.messages[match_id].append(message)
+        message = chat_store.send(
+            match_id,
+            sender_id,
+            content,
+            msg_type,
+            sender_name=sender.get("nickName") or sender.get("name", ""),
+            sender_avatar=sender.get("avatarUrl") or sender.get("avatar", ""),
+        )
         
-        # 标记匹配为已读
+        # 对方的未读计数加一，匹配本身的已读状态只在对方标记已读时改变
         match = self.matches.get(match_id)
         if match:
-            match["isRead"] = True
+            chat_read_tracker.record_message(match_id, message, (match["userId1"], match["userId2"]))
         
         return message
     
+    def mark_messages_read(self, match_id: str, user_id: str) -> dict[str, Any]:
+        """把用户在会话中的已读水位移到最新消息"""
+        match = self.matches.get(match_id)
+        peer_id = None
+        if match:
+            peer_id = match["userId2"] if match["userId1"] == user_id else match["userId1"]
+        result = chat_read_tracker.mark_read(match_id, user_id, peer_id)
+        if match and not match["isRead"]:
+            match["isRead"] = True
+        return result
+    
+    def get_unread_counts(self, user_id: str) -> dict[str, Any]:
+        """用户各会话的未读消息数"""
+        counts = {
+            match_id: chat_read_tracker.unread_count(match_id, user_id)
+            for match_id in self.match_index.matches_of(user_id)
+        }
+        return {"matches": counts, "total": sum(counts.values())}
+    
+    def get_conversations(self, user_id: str, page_size: int, before: Optional[str] = None) -> dict[str, Any]:
+        """用户的会话列表：对方信息、最后一条消息预览与未读数，最近有消息的在前"""
+        # 模拟模式的匹配不持久化，重启前创建的匹配已不存在，其会话摘要在分页时跳过
+        page = chat_read_tracker.conversations(
+            user_id, page_size, before=before, include=lambda match_id: match_id in self.matches
+        )
+        for conversation in page["list"]:
+            match = self.matches[conversation["matchId"]]
+            peer_id = match["userId2"] if match["userId1"] == user_id else match["userId1"]
+            peer = self.cards.get(peer_id, {}) or self.users.get(peer_id, {})
+            conversation["peerId"] = peer_id
+            conversation["peer"] = {
+                "id": peer_id,
+                "name": peer.get("nickName") or peer.get("name", ""),
+                "avatar": peer.get("avatarUrl") or peer.get("avatar", ""),
+            }
+        return page
+    
     def upload_file(self, file_type: str) -> dict[str, Any]:
         """上传文件"""
         # 模拟文件上传
@@ -502,4 +714,29 @@ class MockDataService:
             "url": f"https://picsum.photos/400/300?random=upload-{file_type}-{file_id}"
         }
 
-mock_data_service = MockDataService()
\ No newline at end of file
+def user_to_card(
+    user: dict[str, Any],
+    score: Optional[float] = None,
+    origin: Optional[tuple[float, float]] = None
+) -> dict[str, Any]:
+    """将用户数据转换为匹配卡片格式，已知请求方位置 origin 时附带距离"""
+    card = {
+        "id": user["id"],
+        "name": user.get("nickName", ""),
+        "avatar": image_variant_pipeline.variant_url(user.get("avatarUrl", ""), settings.CARD_IMAGE_WIDTH),
+        "age": user.get("age"),
+        "occupation": user.get("occupation"),
+        "interests": user.get("interests") or [],
+        "matchType": user.get("matchType"),
+        "userRole": user.get("userRole"),
+        "bio": user.get("bio")
+    }
+    if score is not None:
+        card["score"] = round(score, 4)
+    coordinate = location_of(user)
+    if origin is not None and coordinate is not None:
+        card["distance"] = format_distance(haversine_km(*origin, *coordinate))
+    return card
+
+# 首次使用时才加载测试数据；应用启动时由 lifespan 在后台预热
+mock_data_service: MockDataService = LazyService(MockDataService)
\ No newline at end of file
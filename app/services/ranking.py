@@ -0,0 +1,359 @@
+from typing import Any, Callable, Iterable, Optional, Union
+import threading
+import time
+import numpy as np
+from app.services.card_index import ANY_ROLE
+from app.utils.geo import (
+    approx_distance_km_array, grid_cell, grid_cells_within, haversine_km_array, location_of
+)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 各评分项权重，请求方未设置对应偏好时该项权重按比例分摊给其他项
+WEIGHT_AGE = 0.4
+WEIGHT_INTERESTS = 0.4
+WEIGHT_TAGS = 0.2
+WEIGHT_DISTANCE = 0.2
+
+# 年龄超出偏好范围时的线性衰减区间（岁）
+AGE_TOLERANCE = 5.0
+
+# 年龄未知的候选人年龄得分
+UNKNOWN_AGE_SCORE = 0.5
+
+# 位置未知的候选人距离得分
+UNKNOWN_DISTANCE_SCORE = 0.5
+
+# 场景下不区分角色（房源场景seeker可以看到所有房源）
+ANY_ROLE_MATCH_TYPES = {"housing"}
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """逐元素统计 uint64 中置位的个数"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return _POPCOUNT8[words.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+
+def candidate_from_user(user: dict[str, Any]) -> dict[str, Any]:
+    """将模拟用户数据转换为候选人记录"""
+    coordinate = location_of(user)
+    return {
+        "id": user.get("id"),
+        "latitude": coordinate[0] if coordinate else None,
+        "longitude": coordinate[1] if coordinate else None,
+        "age": user.get("age"),
+        "matchType": user.get("matchType"),
+        "userRole": user.get("userRole"),
+        "interests": user.get("interests") or [],
+        "tags": user.get("tags") or [],
+    }
+
+
+class CandidateSnapshot:
+    """候选人列式快照
+
+    行按 (matchType, userRole) 分组连续存放，同一场景/角色的候选人是一段连续切片，
+    兴趣和标签编码为按字（64位）连续存放的 uint64 位图，评分时全部使用向量化运算。
+    有坐标的行按网格分桶，半径查询只读取覆盖圆的网格。
+    records 保存构建快照时的候选人记录，排序结果与展示用的记录来自同一次加载。
+
+    每行以候选人记录的 key 标识（没有 key 时用 id）。数据库模式下同一用户的每个角色资料各占一行，
+    key 为资料ID；rows_of_user 记录用户ID对应的全部行，排序时据此排除请求方自己的所有资料。
+    """
+
+    def __init__(self, candidates: Iterable[dict[str, Any]]):
+        rows = [c for c in candidates if c.get("id") is not None]
+        rows.sort(key=lambda c: (str(c.get("matchType")), str(c.get("userRole"))))
+
+        count = len(rows)
+        # 行标识，同一用户的多个角色资料互不覆盖
+        self.ids: list[str] = [str(c.get("key") or c["id"]) for c in rows]
+        self.row_of: dict[str, int] = {key: i for i, key in enumerate(self.ids)}
+        self.records: dict[str, dict[str, Any]] = dict(zip(self.ids, rows))
+        self.rows_of_user: dict[str, list[int]] = {}
+        for i, c in enumerate(rows):
+            self.rows_of_user.setdefault(c["id"], []).append(i)
+        self.ages = np.array(
+            [c["age"] if isinstance(c.get("age"), (int, float)) else np.nan for c in rows],
+            dtype=np.float32,
+        )
+        self.age_unknown = np.isnan(self.ages)
+
+        # 坐标列与网格桶（桶内行号升序）
+        coordinates = [location_of(c) for c in rows]
+        self.lats = np.array([xy[0] if xy else np.nan for xy in coordinates], dtype=np.float32)
+        self.lons = np.array([xy[1] if xy else np.nan for xy in coordinates], dtype=np.float32)
+        self.location_unknown = np.isnan(self.lats)
+        cells: dict[tuple[int, int], list[int]] = {}
+        for i, xy in enumerate(coordinates):
+            if xy:
+                cells.setdefault(grid_cell(*xy), []).append(i)
+        self._cells = {cell: np.array(members, dtype=np.int64) for cell, members in cells.items()}
+
+        # 场景/角色分组区间
+        self._ranges: dict[tuple[Optional[str], Optional[str]], tuple[int, int]] = {}
+        for i, c in enumerate(rows):
+            for key in ((c.get("matchType"), c.get("userRole")), (c.get("matchType"), ANY_ROLE)):
+                start, _ = self._ranges.get(key, (i, i))
+                self._ranges[key] = (start, i + 1)
+
+        # 兴趣/标签词表与位图
+        self.vocabulary: dict[str, int] = {}
+        bit_rows: list[int] = []
+        bit_ids: list[int] = []
+        for i, c in enumerate(rows):
+            for term in set(c.get("interests") or []) | set(c.get("tags") or []):
+                if not isinstance(term, str):
+                    continue
+                bit = self.vocabulary.setdefault(term, len(self.vocabulary))
+                bit_rows.append(i)
+                bit_ids.append(bit)
+
+        # features[word, row]：同一个字的所有行连续存放，按场景切片时无需拷贝
+        width = max(1, (len(self.vocabulary) + 63) // 64)
+        self.features = np.zeros((width, count), dtype=np.uint64)
+        if bit_rows:
+            bits = np.array(bit_ids, dtype=np.uint64)
+            np.bitwise_or.at(
+                self.features,
+                ((bits // 64).astype(np.int64), np.array(bit_rows, dtype=np.int64)),
+                np.left_shift(np.uint64(1), bits % np.uint64(64)),
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def range_of(self, match_type: str, user_role: Optional[str]) -> tuple[int, int]:
+        """场景/角色对应的行区间，user_role 为 ANY_ROLE 时不区分角色"""
+        return self._ranges.get((match_type, user_role), (0, 0))
+
+    def rows_within(self, origin: tuple[float, float], radius_km: float, start: int, end: int) -> np.ndarray:
+        """区间内距 origin 不超过 radius_km 的行号（升序）"""
+        buckets = []
+        for cell in grid_cells_within(origin[0], origin[1], radius_km):
+            members = self._cells.get(cell)
+            if members is not None:
+                buckets.append(members[np.searchsorted(members, start):np.searchsorted(members, end)])
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(buckets)
+        distances = haversine_km_array(origin[0], origin[1], self.lats[rows], self.lons[rows])
+        rows = rows[distances <= radius_km]
+        rows.sort()
+        return rows
+
+    def encode_terms(self, terms: Iterable[Any]) -> tuple[dict[int, np.uint64], int]:
+        """将请求方的兴趣/标签编码为 {字序号: 掩码}，返回 (掩码, 词数)；词表外的词也计入词数"""
+        masks: dict[int, int] = {}
+        unique_terms = {t for t in terms if isinstance(t, str)}
+        for term in unique_terms:
+            bit = self.vocabulary.get(term)
+            if bit is not None:
+                masks[bit // 64] = masks.get(bit // 64, 0) | (1 << (bit % 64))
+        return {word: np.uint64(mask) for word, mask in masks.items()}, len(unique_terms)
+
+    def overlap(self, masks: dict[int, np.uint64], rows: Union[slice, np.ndarray], count: int) -> np.ndarray:
+        """统计 rows（区间切片或行号数组）中每个候选人与掩码重合的词数"""
+        counts = np.zeros(count, dtype=np.uint8)
+        for word, mask in masks.items():
+            counts += _popcount(self.features[word, rows] & mask)
+        return counts
+
+
+class RankingEngine:
+    """候选人排序引擎
+
+    根据请求方偏好（ageRange、interests、tags、distance）对快照中的候选人向量化打分，
+    通过 argpartition 部分排序取 Top-K；指定半径时先经网格索引裁剪候选人。候选数据变化后快照按 max_age 节流重建。
+    background=True 时只有首次构建在请求中同步完成，之后过期的快照在后台线程重建，请求继续使用旧快照
+    （适用于没有版本号、每隔 max_age 都要重建的数据库模式）。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[dict[str, Any]]],
+        version: Optional[Callable[[], Any]] = None,
+        max_age: float = 5.0,
+        background: bool = False,
+    ):
+        self._loader = loader
+        self._version = version
+        self._max_age = max_age
+        self._background = background
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CandidateSnapshot] = None
+        self._snapshot_version: Any = None
+        self._built_at = 0.0
+        self._building = False
+
+    def snapshot(self) -> CandidateSnapshot:
+        """获取当前快照，数据变化且超过 max_age 时重建；重建期间其他请求继续使用旧快照"""
+        with self._lock:
+            version = self._version() if self._version else None
+            stale = self._version is None or version != self._snapshot_version
+            expired = stale and time.monotonic() - self._built_at >= self._max_age
+            current = self._snapshot
+            if current is not None and (not expired or self._building):
+                return current
+            self._building = True
+
+        if current is not None and self._background:
+            threading.Thread(
+                target=self._refresh, args=(version,), name="ranking-snapshot", daemon=True
+            ).start()
+            return current
+        return self._rebuild(version)
+
+    def _rebuild(self, version: Any) -> CandidateSnapshot:
+        """加载候选人并构建快照，构建完成后整体替换"""
+        try:
+            snapshot = CandidateSnapshot(self._loader())
+        except BaseException:
+            with self._lock:
+                self._building = False
+            raise
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_version = version
+            self._built_at = time.monotonic()
+            self._building = False
+        return snapshot
+
+    def _refresh(self, version: Any):
+        """后台重建；失败时保留旧快照，max_age 之后再重试"""
+        try:
+            self._rebuild(version)
+        except Exception:
+            logger.exception("ranking_snapshot_refresh_failed")
+            with self._lock:
+                self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """丢弃快照，下次访问时立即重建"""
+        with self._lock:
+            self._snapshot = None
+
+    def rank(
+        self,
+        requester: dict[str, Any],
+        match_type: str,
+        user_role: str,
+        offset: int,
+        limit: int,
+        radius_km: Optional[float] = None,
+        snapshot: Optional[CandidateSnapshot] = None,
+    ) -> tuple[list[tuple[str, float]], int]:
+        """返回 ([(候选人行标识, 得分)], 候选总数)，按得分降序、同分按快照顺序；行标识即 records 的键
+
+        radius_km 不为空时只保留距请求方该半径内的候选人，请求方位置未知时结果为空。
+        传入 snapshot 时在该快照上排序，调用方可以用同一快照的 records 取候选人详情。
+        """
+        snap = snapshot or self.snapshot()
+        role_key = ANY_ROLE if match_type in ANY_ROLE_MATCH_TYPES else user_role
+        start, end = snap.range_of(match_type, role_key)
+        origin = location_of(requester)
+
+        if radius_km is None:
+            rows: Union[slice, np.ndarray] = slice(start, end)
+            row_numbers = None
+            total = end - start
+        elif origin is None:
+            return [], 0
+        else:
+            rows = row_numbers = snap.rows_within(origin, radius_km, start, end)
+            total = len(row_numbers)
+
+        scores = self._score(snap, requester, rows, total, origin)
+        # 排除请求方自己（包括其同一场景下的其他角色资料）
+        for self_row in snap.rows_of_user.get(requester.get("id"), ()):
+            if not start <= self_row < end:
+                continue
+            position = self_row - start if row_numbers is None else int(np.searchsorted(row_numbers, self_row))
+            if row_numbers is None or (position < len(row_numbers) and row_numbers[position] == self_row):
+                scores[position] = -np.inf
+                total -= 1
+
+        k = min(max(offset, 0) + limit, total)
+        if k <= 0 or offset >= k:
+            return [], max(total, 0)
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        # 得分降序，同分时按行号升序保证分页稳定
+        order = top[np.lexsort((top, -scores[top]))][:k]
+
+        page = order[offset:k]
+        if row_numbers is None:
+            return [(snap.ids[start + i], float(scores[i])) for i in page], total
+        return [(snap.ids[row_numbers[i]], float(scores[i])) for i in page], total
+
+    def score_pair(self, requester: dict[str, Any], candidate_id: str) -> Optional[float]:
+        """计算请求方对单个候选人的得分，候选人不在快照中时返回 None"""
+        snap = self.snapshot()
+        row = snap.row_of.get(candidate_id)
+        if row is None:
+            return None
+        return float(self._score(snap, requester, slice(row, row + 1), 1, location_of(requester))[0])
+
+    def _score(
+        self,
+        snap: CandidateSnapshot,
+        requester: dict[str, Any],
+        rows: Union[slice, np.ndarray],
+        count: int,
+        origin: Optional[tuple[float, float]],
+    ) -> np.ndarray:
+        preferences = requester.get("preferences") or {}
+        components: list[tuple[float, np.ndarray]] = []
+
+        age_range = preferences.get("ageRange") or preferences.get("age_range")
+        if isinstance(age_range, (list, tuple)) and len(age_range) == 2 and all(
+            isinstance(v, (int, float)) for v in age_range
+        ):
+            low, high = sorted(float(v) for v in age_range)
+            ages = snap.ages[rows]
+            # 1 - (超出范围的年数 / 容忍区间)，截断到 [0, 1]
+            age_score = np.subtract(low, ages)
+            np.maximum(age_score, 0, out=age_score)
+            above = np.subtract(ages, high)
+            np.maximum(above, 0, out=above)
+            age_score += above
+            age_score *= np.float32(-1.0 / AGE_TOLERANCE)
+            age_score += np.float32(1.0)
+            np.clip(age_score, 0.0, 1.0, out=age_score)
+            np.copyto(age_score, np.float32(UNKNOWN_AGE_SCORE), where=snap.age_unknown[rows])
+            components.append((WEIGHT_AGE, age_score))
+
+        preferred_distance = preferences.get("distance")
+        if origin is not None and isinstance(preferred_distance, (int, float)) and preferred_distance > 0:
+            # 偏好距离内得满分，超出后在同样长度内线性衰减到 0
+            distance_score = approx_distance_km_array(origin[0], origin[1], snap.lats[rows], snap.lons[rows])
+            distance_score *= np.float32(-1.0 / preferred_distance)
+            distance_score += np.float32(2.0)
+            np.clip(distance_score, 0.0, 1.0, out=distance_score)
+            np.copyto(distance_score, np.float32(UNKNOWN_DISTANCE_SCORE), where=snap.location_unknown[rows])
+            components.append((WEIGHT_DISTANCE, distance_score))
+
+        interest_terms = list(requester.get("interests") or []) + list(preferences.get("interests") or [])
+        for weight, terms in ((WEIGHT_INTERESTS, interest_terms), (WEIGHT_TAGS, preferences.get("tags") or [])):
+            masks, term_count = snap.encode_terms(terms)
+            if term_count:
+                overlap = snap.overlap(masks, rows, count).astype(np.float32)
+                overlap *= np.float32(1.0 / term_count)
+                components.append((weight, overlap))
+
+        scores = np.zeros(count, dtype=np.float32)
+        if not components:
+            return scores
+
+        total_weight = sum(weight for weight, _ in components)
+        for weight, values in components:
+            values *= np.float32(weight / total_weight)
+            scores += values
+        return scores
@@ -0,0 +1,427 @@
+"""
+断点续传上传
+大文件（主要是视频）分三步上传：创建会话 → 按序号上传分片（可乱序、可重传） → 完成合并。
+每个会话是 RESUMABLE_UPLOAD_DIR 下的一个目录：manifest.json 在创建时写入一次，之后只读；
+每个分片先写临时文件再原子重命名为 {序号:06d}.chunk，已接收的分片由目录中的文件得出，
+并发上传不同分片不需要加锁，也不会互相覆盖。会话目录不在 UPLOAD_DIR 内，未完成的数据不会被静态访问。
+完成时按序号合并到临时文件，同时计算 SHA-256 校验，再登记到存储后端（见 storage_backend），
+得到与普通上传相同的 /uploads/{user_id}/{file} 地址。
+超过 RESUMABLE_UPLOAD_TTL 没有任何分片写入的会话视为放弃，在创建新会话时顺带清理。
+
+创建会话时按声明的大小在存储配额账本中预留空间，合并成功后转为实际占用，
+取消、过期清理或合并失败时释放；每个用户同时进行的会话数不超过 RESUMABLE_UPLOAD_MAX_SESSIONS。
+会话的归属与预留只在本进程内存中，重启后首次使用时从会话清单重建。
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.services.storage_backend import storage_backend
+from app.services.storage_quota import storage_quota, QuotaExceededError
+from app.services.file_storage import (
+    resolve_upload_type, size_limit_message, verify_content, UploadRejectedError, SNIFF_BYTES
+)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MIN_CHUNK_SIZE = 64 * 1024
+_UPLOAD_ID_RE = re.compile(r"[0-9a-f]{32}")
+_CHUNK_RE = re.compile(r"(\d{6})\.chunk")
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class ResumableUploadError(Exception):
+    """断点续传请求无法处理，code 与接口返回的 BaseResponse.code 一致"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def _chunk_name(index: int) -> str:
+    return f"{index:06d}.chunk"
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResumableUploadStore:
+    """基于目录的断点续传会话存储"""
+
+    PURGE_INTERVAL = 600  # 两次清理过期会话之间的最短间隔（秒）
+
+    def __init__(self, root: Optional[str] = None, ttl: Optional[int] = None):
+        self._root = root
+        self._ttl = ttl
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        # 进行中的会话：upload_id -> (用户ID, 预留的字节数)，首次使用时从 _sessions_root 的会话清单加载
+        self._sessions: Dict[str, Tuple[str, int]] = {}
+        self._sessions_root: Optional[str] = None
+
+    @property
+    def root(self) -> str:
+        return self._root or settings.RESUMABLE_UPLOAD_DIR
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl if self._ttl is not None else settings.RESUMABLE_UPLOAD_TTL
+
+    def _session_dir(self, upload_id: str) -> str:
+        if not _UPLOAD_ID_RE.fullmatch(upload_id or ""):
+            raise ResumableUploadError(404, "上传会话不存在")
+        return os.path.join(self.root, upload_id)
+
+    def _load(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """读取会话清单并检查归属与是否过期"""
+        session_dir = self._session_dir(upload_id)
+        try:
+            with open(os.path.join(session_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ResumableUploadError(404, "上传会话不存在")
+        if manifest["user_id"] != str(user_id):
+            raise ResumableUploadError(403, "无权限访问此上传会话")
+        if self._expires_at(session_dir) < time.time():
+            raise ResumableUploadError(410, "上传会话已过期，请重新上传")
+        return manifest
+
+    def _expires_at(self, session_dir: str) -> float:
+        # 每写入一个分片目录的 mtime 都会更新，过期时间从最后一次活动算起
+        return os.stat(session_dir).st_mtime + self.ttl
+
+    def _received(self, session_dir: str) -> List[int]:
+        received = []
+        for name in os.listdir(session_dir):
+            match = _CHUNK_RE.fullmatch(name)
+            if match:
+                received.append(int(match.group(1)))
+        return sorted(received)
+
+    def _registry(self) -> Dict[str, Tuple[str, int]]:
+        """进行中的会话（调用方持有 _lock）；首次使用或会话目录变化时从会话清单重建并重新预留"""
+        root = self.root
+        if self._sessions_root == root:
+            return self._sessions
+        for user_id, reserved in self._sessions.values():
+            storage_quota.cancel_reservation(user_id, reserved)
+        self._sessions = {}
+        self._sessions_root = root
+        try:
+            entries = list(os.scandir(root))
+        except FileNotFoundError:
+            return self._sessions
+        for entry in entries:
+            if not _UPLOAD_ID_RE.fullmatch(entry.name):
+                continue
+            try:
+                with open(os.path.join(entry.path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, NotADirectoryError, ValueError):
+                continue
+            try:
+                reserved = storage_quota.reserve(manifest["user_id"], manifest["size"])
+            except QuotaExceededError:
+                # 重启期间配额已被占用，合并时再预留
+                reserved = 0
+            self._sessions[entry.name] = (manifest["user_id"], reserved)
+        return self._sessions
+
+    def _release(self, upload_id: str) -> Tuple[Optional[str], int]:
+        """会话结束，从登记中移除，返回 (用户ID, 预留的字节数)；未登记时用户ID为 None"""
+        with self._lock:
+            user_id, reserved = self._registry().pop(upload_id, (None, 0))
+        return user_id, reserved
+
+    def _discard(self, upload_id: str):
+        """会话被取消或过期，释放预留的空间"""
+        user_id, reserved = self._release(upload_id)
+        if user_id is not None:
+            storage_quota.cancel_reservation(user_id, reserved)
+
+    def _ensure_reserved(self, upload_id: str, user_id: str, size: int):
+        """合并前确认会话已预留空间（重启后未能重新预留的会话在这里预留），配额不足时抛出 ResumableUploadError"""
+        with self._lock:
+            sessions = self._registry()
+            owner, reserved = sessions.get(upload_id, (str(user_id), 0))
+            if reserved <= 0:
+                try:
+                    reserved = storage_quota.reserve(owner, size)
+                except QuotaExceededError as e:
+                    raise ResumableUploadError(400, str(e))
+            sessions[upload_id] = (owner, reserved)
+
+    def _expire_user_sessions(self, user_id: str, now: float):
+        """用户会话数达到上限时，先清理其中已过期的会话（调用方持有 _lock）"""
+        sessions = self._registry()
+        for upload_id in [uid for uid, (owner, _) in sessions.items() if owner == user_id]:
+            session_dir = os.path.join(self.root, upload_id)
+            try:
+                expired = self._expires_at(session_dir) < now
+            except FileNotFoundError:
+                expired = True
+            if expired:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                owner, reserved = sessions.pop(upload_id)
+                storage_quota.cancel_reservation(owner, reserved)
+
+    def _chunk_length(self, manifest: Dict[str, Any], index: int) -> int:
+        if index == manifest["total_chunks"] - 1:
+            return manifest["size"] - index * manifest["chunk_size"]
+        return manifest["chunk_size"]
+
+    def initiate(
+        self,
+        user_id: str,
+        filename: str,
+        content_type: str,
+        size: int,
+        chunk_size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """创建上传会话，返回会话状态"""
+        try:
+            file_ext, max_size, type_name = resolve_upload_type(content_type, filename)
+        except UploadRejectedError as e:
+            raise ResumableUploadError(400, str(e))
+        if size > max_size:
+            raise ResumableUploadError(400, size_limit_message(type_name, max_size))
+        if sha256 is not None:
+            sha256 = sha256.lower()
+            if not _SHA256_RE.fullmatch(sha256):
+                raise ResumableUploadError(400, "sha256 必须是64位十六进制字符串")
+
+        self.purge_expired(force=False)
+
+        user_id = str(user_id)
+        upload_id = uuid.uuid4().hex
+        max_sessions = settings.RESUMABLE_UPLOAD_MAX_SESSIONS
+        with self._lock:
+            sessions = self._registry()
+            if max_sessions > 0:
+                open_sessions = sum(1 for owner, _ in sessions.values() if owner == user_id)
+                if open_sessions >= max_sessions:
+                    self._expire_user_sessions(user_id, time.time())
+                    open_sessions = sum(1 for owner, _ in sessions.values() if owner == user_id)
+                if open_sessions >= max_sessions:
+                    raise ResumableUploadError(429, f"未完成的上传会话过多（最多 {max_sessions} 个），请先完成或取消已有的上传")
+            # 会话可能保留 RESUMABLE_UPLOAD_TTL 之久，创建时就按声明的大小预留，期间其他上传不能占用这部分配额
+            try:
+                reserved = storage_quota.reserve(user_id, size)
+            except QuotaExceededError as e:
+                raise ResumableUploadError(400, str(e))
+            sessions[upload_id] = (user_id, reserved)
+
+        chunk_size = min(max(chunk_size or settings.RESUMABLE_CHUNK_SIZE, MIN_CHUNK_SIZE), settings.RESUMABLE_MAX_CHUNK_SIZE)
+        session_dir = os.path.join(self.root, upload_id)
+        manifest = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "filename": filename,
+            "ext": file_ext,
+            "content_type": content_type,
+            "size": size,
+            "chunk_size": chunk_size,
+            "total_chunks": (size + chunk_size - 1) // chunk_size,
+            "sha256": sha256,
+            "created_at": time.time(),
+        }
+        try:
+            os.makedirs(session_dir)
+            with open(os.path.join(session_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+        except BaseException:
+            shutil.rmtree(session_dir, ignore_errors=True)
+            self._discard(upload_id)
+            raise
+        logger.info("resumable_upload_initiated", upload_id=upload_id, user_id=user_id, size=size, chunks=manifest["total_chunks"])
+        return self.status(upload_id, user_id)
+
+    def status(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """会话状态：客户端断线后据此只补传缺失的分片"""
+        manifest = self._load(upload_id, user_id)
+        session_dir = self._session_dir(upload_id)
+        received = self._received(session_dir)
+        received_set = set(received)
+        return {
+            "upload_id": upload_id,
+            "size": manifest["size"],
+            "chunk_size": manifest["chunk_size"],
+            "total_chunks": manifest["total_chunks"],
+            "received": received,
+            "missing": [i for i in range(manifest["total_chunks"]) if i not in received_set],
+            "expires_at": self._expires_at(session_dir),
+        }
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        user_id: str,
+        index: int,
+        body: AsyncIterator[bytes],
+        sha256: Optional[str] = None
+    ) -> int:
+        """流式写入一个分片，长度必须与清单一致；提供 sha256 时校验分片内容。重复上传同一分片会覆盖旧内容"""
+        manifest = await run_in_threadpool(self._load, upload_id, user_id)
+        if not 0 <= index < manifest["total_chunks"]:
+            raise ResumableUploadError(400, f"分片序号超出范围，应为 0 到 {manifest['total_chunks'] - 1}")
+        expected = self._chunk_length(manifest, index)
+
+        session_dir = self._session_dir(upload_id)
+        temp_path = os.path.join(session_dir, f".{index:06d}.{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        written = 0
+        buffer = bytearray()
+        # 第一个分片的开头就是文件头，收到足够的字节后立即核对类型，不再接收其余内容
+        sniffed = index != 0
+        try:
+            f = await run_in_threadpool(open, temp_path, "wb")
+        except FileNotFoundError:
+            raise ResumableUploadError(404, "上传会话不存在")
+        try:
+            async for data in body:
+                written += len(data)
+                if written > expected:
+                    raise ResumableUploadError(400, f"分片长度超过 {expected} 字节")
+                digest.update(data)
+                buffer += data
+                if not sniffed and len(buffer) >= min(SNIFF_BYTES, expected):
+                    self._verify_head(manifest, bytes(buffer[:SNIFF_BYTES]))
+                    sniffed = True
+                if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(f.write, bytes(buffer))
+                    buffer.clear()
+            if not sniffed:
+                self._verify_head(manifest, bytes(buffer[:SNIFF_BYTES]))
+            if buffer:
+                await run_in_threadpool(f.write, bytes(buffer))
+            await run_in_threadpool(f.close)
+            if written != expected:
+                raise ResumableUploadError(400, f"分片长度应为 {expected} 字节，实际收到 {written} 字节")
+            if sha256 is not None and digest.hexdigest() != sha256.lower():
+                raise ResumableUploadError(400, "分片校验失败，请重新上传该分片")
+            try:
+                await run_in_threadpool(os.replace, temp_path, os.path.join(session_dir, _chunk_name(index)))
+            except FileNotFoundError:
+                # 会话在写入期间被完成或取消
+                raise ResumableUploadError(404, "上传会话不存在")
+        except BaseException:
+            f.close()
+            await run_in_threadpool(_remove, temp_path)
+            raise
+        return written
+
+    def _verify_head(self, manifest: Dict[str, Any], head: bytes):
+        try:
+            verify_content(manifest["content_type"], head)
+        except UploadRejectedError as e:
+            raise ResumableUploadError(400, str(e))
+
+    def _assemble(self, manifest: Dict[str, Any], working_dir: str) -> Tuple[str, bool]:
+        """按序号合并分片到临时文件，校验通过后登记到存储后端，返回 (文件名, 是否新增了文件)"""
+        temp_path = storage_backend.staging_path()
+        digest = hashlib.sha256()
+        try:
+            with open(temp_path, "wb") as out:
+                for index in range(manifest["total_chunks"]):
+                    with open(os.path.join(working_dir, _chunk_name(index)), "rb") as chunk:
+                        while True:
+                            data = chunk.read(settings.UPLOAD_CHUNK_SIZE)
+                            if not data:
+                                break
+                            digest.update(data)
+                            out.write(data)
+                out.flush()
+                os.fsync(out.fileno())
+                assembled = out.tell()
+            if assembled != manifest["size"]:
+                raise ResumableUploadError(400, f"文件大小不一致，应为 {manifest['size']} 字节，实际 {assembled} 字节")
+            if manifest["sha256"] and digest.hexdigest() != manifest["sha256"]:
+                raise ResumableUploadError(400, "文件校验失败，请重新上传")
+        except BaseException:
+            _remove(temp_path)
+            raise
+        return storage_backend.commit(temp_path, digest.hexdigest(), manifest["user_id"], manifest["ext"])
+
+    async def complete(self, upload_id: str, user_id: str) -> Tuple[str, int, bool]:
+        """合并全部分片，返回 (文件URL, 字节数, 是否新增了文件)；缺少分片时返回缺失列表，会话保留以便补传
+
+        新增了文件时把创建会话时的预留转为实际占用，内容已存在或合并失败时释放预留。
+        """
+        manifest = await run_in_threadpool(self._load, upload_id, user_id)
+        session_dir = self._session_dir(upload_id)
+        received = set(await run_in_threadpool(self._received, session_dir))
+        missing = [i for i in range(manifest["total_chunks"]) if i not in received]
+        if missing:
+            raise ResumableUploadError(409, f"还有 {len(missing)} 个分片未上传", data={"missing": missing})
+        await run_in_threadpool(self._ensure_reserved, upload_id, user_id, manifest["size"])
+
+        # 先把会话目录改名占住，并发的重复完成请求或迟到的分片写入都会得到 404
+        working_dir = os.path.join(self.root, f".{upload_id}.completing")
+        try:
+            await run_in_threadpool(os.rename, session_dir, working_dir)
+        except FileNotFoundError:
+            raise ResumableUploadError(404, "上传会话不存在")
+
+        try:
+            file_name, created = await run_in_threadpool(self._assemble, manifest, working_dir)
+        except BaseException:
+            self._discard(upload_id)
+            raise
+        finally:
+            await run_in_threadpool(shutil.rmtree, working_dir, True)
+        owner, reserved = self._release(upload_id)
+        if created:
+            storage_quota.commit_reservation(manifest["user_id"], reserved, manifest["size"])
+        elif owner is not None:
+            storage_quota.cancel_reservation(owner, reserved)
+        logger.info("resumable_upload_completed", upload_id=upload_id, user_id=user_id, size=manifest["size"])
+        return f"/uploads/{manifest['user_id']}/{file_name}", manifest["size"], created
+
+    def abort(self, upload_id: str, user_id: str):
+        """取消上传并删除已接收的分片"""
+        self._load(upload_id, user_id)
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        self._discard(upload_id)
+
+    def purge_expired(self, now: Optional[float] = None, force: bool = True) -> int:
+        """删除超过 TTL 没有活动的会话，返回删除的数量；force=False 时按 PURGE_INTERVAL 限频"""
+        now = now if now is not None else time.time()
+        if not force and now - self._last_purge < self.PURGE_INTERVAL:
+            return 0
+        self._last_purge = now
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        purged = 0
+        for entry in entries:
+            try:
+                if entry.is_dir() and entry.stat().st_mtime + self.ttl < now:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    self._discard(entry.name)
+                    purged += 1
+            except FileNotFoundError:
+                continue
+        if purged:
+            logger.info("resumable_upload_purged", count=purged)
+        return purged
+
+
+resumable_upload_store = ResumableUploadStore()
@@ -0,0 +1,264 @@
+"""
+上传文件存储后端
+上传、删除和 /uploads/ 访问都通过 storage_backend，按 STORAGE_BACKEND 选择：
+- local：保存在 UPLOAD_DIR（见 blob_store，相同内容硬链接到同一个 blob），单机部署使用
+- s3：保存在 S3 兼容的对象存储（S3、MinIO、OSS、COS 等），多个 API 节点共享同一份文件，
+  节点本身不保存上传内容；大文件使用分片上传（multipart upload），/uploads/ 地址不变，由节点转发 Range 读取
+
+存储键是 /uploads/ 之后的相对路径，即 {user_id}/{sha256}{ext}。
+内容总是先写入本机临时文件（边写边检查大小并计算哈希，确定文件名后才能登记），再由 commit 交给后端。
+S3_ENDPOINT_URL 为 file:///目录 时使用 local_object_store 中的目录模拟对象存储，本地开发和测试不需要启动 MinIO。
+"""
+
+import os
+import stat
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Tuple
+from starlette.responses import Response
+from app.config import settings
+from app.services.blob_store import blob_store, BlobStore
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+from app.utils.media import media_response
+
+logger = get_logger(__name__)
+
+try:
+    import boto3
+except ImportError:
+    # 只在 STORAGE_BACKEND=s3 且使用真实对象存储时需要
+    boto3 = None
+
+_NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+def _is_not_found(error: Exception) -> bool:
+    """boto3 的 ClientError 与本地模拟存储的错误都带有 response["Error"]["Code"]"""
+    response = getattr(error, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in _NOT_FOUND_CODES
+
+
+def _check_key(key: str) -> str:
+    """拒绝越界和隐藏文件（上传中的临时文件）的键，与静态访问规则一致"""
+    parts = key.split("/")
+    if not key or any(not part or part.startswith(".") for part in parts):
+        raise FileNotFoundError(key)
+    return key
+
+
+class StorageBackend(ABC):
+    """存储后端接口"""
+
+    name = ""
+
+    @abstractmethod
+    def staging_path(self) -> str:
+        """写入新上传内容的本机临时文件路径"""
+
+    @abstractmethod
+    def commit(self, temp_path: str, digest: str, prefix: str, file_ext: str) -> Tuple[str, bool]:
+        """把已写完的临时文件登记为 {prefix}/{digest}{file_ext}，临时文件总会被删除，返回 (文件名, 是否新增了文件)"""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[os.stat_result]:
+        """文件信息，不存在时返回 None"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """删除文件，不存在时抛出 FileNotFoundError"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """文件在本机的路径（生成图片变体使用），对象存储返回 None"""
+        return None
+
+    @abstractmethod
+    def media_response(self, key: str, request_headers: Any, send_body: bool = True) -> Response:
+        """/uploads/{key} 的响应（支持 Range 与条件请求），不存在时抛出 FileNotFoundError"""
+
+
+class LocalStorageBackend(StorageBackend):
+    """UPLOAD_DIR 下的本地文件，按内容去重"""
+
+    name = "local"
+
+    def __init__(self, root: Optional[str] = None, blobs: Optional[BlobStore] = None):
+        self._root = root
+        self.blobs = blobs or blob_store
+
+    @property
+    def root(self) -> str:
+        return self._root or settings.UPLOAD_DIR
+
+    def _path(self, key: str) -> str:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, _check_key(key)))
+        if os.path.commonpath([root, path]) != root:
+            raise FileNotFoundError(key)
+        return path
+
+    def staging_path(self) -> str:
+        return self.blobs.staging_path()
+
+    def commit(self, temp_path: str, digest: str, prefix: str, file_ext: str) -> Tuple[str, bool]:
+        return self.blobs.commit(temp_path, digest, os.path.join(self.root, prefix), file_ext)
+
+    def stat(self, key: str) -> Optional[os.stat_result]:
+        try:
+            stat_result = os.stat(self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+    def delete(self, key: str):
+        # 内容的最后一个引用删除后才释放存储
+        self.blobs.release(self._path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        try:
+            return self._path(key)
+        except FileNotFoundError:
+            return None
+
+    def media_response(self, key: str, request_headers: Any, send_body: bool = True) -> Response:
+        path = self._path(key)
+        try:
+            return media_response(path, os.stat(path), request_headers, send_body=send_body)
+        except (NotADirectoryError, ValueError):
+            raise FileNotFoundError(key)
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 兼容对象存储；超过 multipart_threshold 的文件分片上传"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        client: Any = None,
+        key_prefix: Optional[str] = None,
+        multipart_threshold: Optional[int] = None,
+        part_size: Optional[int] = None
+    ):
+        self.bucket = bucket or settings.S3_BUCKET
+        self.key_prefix = (key_prefix if key_prefix is not None else settings.S3_KEY_PREFIX).strip("/")
+        self.multipart_threshold = multipart_threshold or settings.S3_MULTIPART_THRESHOLD
+        self.part_size = part_size or settings.S3_MULTIPART_CHUNK_SIZE
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = create_s3_client()
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        key = _check_key(key)
+        return f"{self.key_prefix}/{key}" if self.key_prefix else key
+
+    def _head(self, object_key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=object_key)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+    def staging_path(self) -> str:
+        fd, path = tempfile.mkstemp(prefix="upload-", suffix=".part")
+        os.close(fd)
+        return path
+
+    def commit(self, temp_path: str, digest: str, prefix: str, file_ext: str) -> Tuple[str, bool]:
+        file_name = f"{digest}{file_ext}"
+        object_key = self._object_key(f"{prefix}/{file_name}")
+        try:
+            if self._head(object_key) is not None:
+                logger.info("upload_deduplicated", digest=digest, scope="user")
+                return file_name, False
+            self._upload(temp_path, object_key)
+            return file_name, True
+        finally:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+
+    def _upload(self, temp_path: str, object_key: str):
+        size = os.path.getsize(temp_path)
+        if size <= self.multipart_threshold:
+            with open(temp_path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=f)
+            return
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=object_key)["UploadId"]
+        try:
+            parts = []
+            with open(temp_path, "rb") as f:
+                for part_number in range(1, (size + self.part_size - 1) // self.part_size + 1):
+                    body = f.read(self.part_size)
+                    result = self.client.upload_part(
+                        Bucket=self.bucket, Key=object_key, UploadId=upload_id, PartNumber=part_number, Body=body
+                    )
+                    parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            # 未完成的分片会一直占用存储，失败时立即放弃
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+        logger.info("upload_multipart_completed", key=object_key, parts=len(parts), size=size)
+
+    def stat(self, key: str) -> Optional[os.stat_result]:
+        head = self._head(self._object_key(key))
+        if head is None:
+            return None
+        mtime = head["LastModified"].timestamp()
+        return os.stat_result((stat.S_IFREG | 0o644, 0, 0, 1, 0, 0, head["ContentLength"], mtime, mtime, mtime))
+
+    def delete(self, key: str):
+        object_key = self._object_key(key)
+        # delete_object 对不存在的键也返回成功，先确认存在以保持与本地存储相同的语义
+        if self._head(object_key) is None:
+            raise FileNotFoundError(key)
+        self.client.delete_object(Bucket=self.bucket, Key=object_key)
+
+    def media_response(self, key: str, request_headers: Any, send_body: bool = True) -> Response:
+        stat_result = self.stat(key)
+        if stat_result is None:
+            raise FileNotFoundError(key)
+        object_key = self._object_key(key)
+
+        def open_range(start: int, end: int):
+            return self.client.get_object(Bucket=self.bucket, Key=object_key, Range=f"bytes={start}-{end}")["Body"]
+
+        return media_response(key, stat_result, request_headers, send_body=send_body, open_range=open_range)
+
+
+def create_s3_client() -> Any:
+    endpoint = settings.S3_ENDPOINT_URL
+    if endpoint.startswith("file://"):
+        from app.services.local_object_store import LocalObjectStore
+        return LocalObjectStore(endpoint[len("file://"):])
+    if boto3 is None:
+        raise RuntimeError("STORAGE_BACKEND=s3 需要安装 boto3（pip install boto3）")
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint or None,
+        region_name=settings.S3_REGION or None,
+        aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+        aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+    )
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend()
+    if settings.STORAGE_BACKEND != "local":
+        raise ValueError(f"未知的 STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend()
+
+
+storage_backend: StorageBackend = LazyService(create_storage_backend)
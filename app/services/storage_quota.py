@@ -0,0 +1,151 @@
+"""
+用户存储配额
+每个用户已占用的字节数和文件数保存在内存中，上传和删除时增减，检查配额只需一次字典查找，
+不需要遍历 UPLOAD_DIR/{user_id}。每次变更以 {"id": 用户ID, "bytes": ..., "files": ...}
+的完整结果追加到变更日志（与模拟用户数据相同的 UserJournal），重启后回放恢复。
+上线前已有的上传文件可用 scripts/rebuild_storage_ledger.py 扫描一次生成初始账本。
+
+账本只在本节点内存和本机文件中。STORAGE_BACKEND=s3 多节点部署时文件是共享的，账本却不是：
+每个节点只记录经自己上传和删除的文件，配额实际上按节点计算（见 ReadMe 存储后端一节的限制）。
+"""
+
+import heapq
+import threading
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.services.user_journal import UserJournal
+from app.utils.lazy import LazyService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QuotaExceededError(Exception):
+    """上传后将超过用户的存储配额"""
+
+    def __init__(self, used: int, incoming: int, quota: int):
+        super().__init__(
+            f"存储空间不足，已使用 {used / (1024 * 1024):.1f}MB，"
+            f"本次上传 {incoming / (1024 * 1024):.1f}MB，上限 {quota // (1024 * 1024)}MB"
+        )
+        self.used = used
+        self.incoming = incoming
+        self.quota = quota
+
+
+class StorageQuotaLedger:
+    """按用户统计上传占用的存储空间"""
+
+    def __init__(self, ledger_file: Optional[str] = None, quota: Optional[int] = None):
+        self.quota = quota if quota is not None else settings.USER_STORAGE_QUOTA
+        self.journal = UserJournal(
+            ledger_file or settings.STORAGE_LEDGER_FILE,
+            fsync_interval=settings.USER_JOURNAL_FSYNC_INTERVAL,
+            compact_records=settings.USER_JOURNAL_COMPACT_RECORDS,
+        )
+        self._lock = threading.Lock()
+        # 进行中上传预留的字节数，只在内存中，不写入日志
+        self._reserved: Dict[str, int] = {}
+        self._usage: Dict[str, Dict[str, Any]] = self.journal.load()
+
+    def usage(self, user_id: str) -> Dict[str, Any]:
+        entry = self._usage.get(str(user_id))
+        return {
+            "userId": str(user_id),
+            "bytes": entry["bytes"] if entry else 0,
+            "files": entry["files"] if entry else 0,
+            "quota": self.quota,
+        }
+
+    def _used(self, user_id: str) -> int:
+        entry = self._usage.get(user_id)
+        return (entry["bytes"] if entry else 0) + self._reserved.get(user_id, 0)
+
+    def check(self, user_id: str, incoming: int):
+        """上传 incoming 字节后超过配额时抛出 QuotaExceededError；配额为 0 表示不限制
+
+        只检查不占用，已预留给进行中上传的字节也计入已用。
+        """
+        if self.quota <= 0:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            used = self._used(user_id)
+        if used + incoming > self.quota:
+            raise QuotaExceededError(used, incoming, self.quota)
+
+    def reserve(self, user_id: str, incoming: int) -> int:
+        """检查配额并为即将写入的 incoming 字节预留空间，返回预留的字节数
+
+        检查与预留在同一把锁内完成，并发上传不会都通过检查后一起超出配额。
+        写入完成后调用 commit_reservation，失败时调用 cancel_reservation。
+        """
+        if self.quota <= 0 or incoming <= 0:
+            return 0
+        user_id = str(user_id)
+        with self._lock:
+            used = self._used(user_id)
+            if used + incoming > self.quota:
+                raise QuotaExceededError(used, incoming, self.quota)
+            self._reserved[user_id] = self._reserved.get(user_id, 0) + incoming
+        return incoming
+
+    def cancel_reservation(self, user_id: str, reserved: int):
+        """释放预留的空间（上传失败或内容已存在）"""
+        with self._lock:
+            self._unreserve(str(user_id), reserved)
+
+    def commit_reservation(self, user_id: str, reserved: int, size: int):
+        """把预留转为实际占用：在同一把锁内释放预留并按实际大小记录新增的文件"""
+        self._apply(user_id, size, 1, reserved=reserved)
+
+    def _unreserve(self, user_id: str, reserved: int):
+        if reserved <= 0:
+            return
+        remaining = self._reserved.get(user_id, 0) - reserved
+        if remaining > 0:
+            self._reserved[user_id] = remaining
+        else:
+            self._reserved.pop(user_id, None)
+
+    def _apply(self, user_id: str, delta_bytes: int, delta_files: int, reserved: int = 0):
+        user_id = str(user_id)
+        with self._lock:
+            self._unreserve(user_id, reserved)
+            entry = self._usage.get(user_id) or {"id": user_id, "bytes": 0, "files": 0}
+            entry = {
+                "id": user_id,
+                "bytes": max(entry["bytes"] + delta_bytes, 0),
+                "files": max(entry["files"] + delta_files, 0),
+            }
+            if entry["files"] == 0 and entry["bytes"] == 0:
+                self._usage.pop(user_id, None)
+                self.journal.delete(user_id)
+            else:
+                self._usage[user_id] = entry
+                self.journal.put(entry)
+
+    def charge(self, user_id: str, size: int):
+        """记录用户新增了一个 size 字节的文件"""
+        self._apply(user_id, size, 1)
+
+    def release(self, user_id: str, size: int):
+        """记录用户删除了一个 size 字节的文件"""
+        self._apply(user_id, -size, -1)
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """占用空间最多的用户"""
+        with self._lock:
+            entries = list(self._usage.values())
+        largest = heapq.nlargest(limit, entries, key=lambda entry: entry["bytes"])
+        return [self.usage(entry["id"]) for entry in largest]
+
+    def rebuild(self, usage: Dict[str, Dict[str, Any]]):
+        """用扫描得到的结果整体替换账本（离线维护脚本使用）"""
+        with self._lock:
+            self._usage = {user_id: {"id": user_id, **entry} for user_id, entry in usage.items()}
+            self.journal.write_snapshot(self._usage)
+
+
+# 首次使用时才加载账本
+storage_quota: StorageQuotaLedger = LazyService(StorageQuotaLedger)
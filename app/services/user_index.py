@@ -0,0 +1,56 @@
+from typing import Any, Iterable, Optional
+
+# 登录/注册按这些字段查找用户
+LOOKUP_FIELDS = ("openid", "phone", "email")
+
+
+class UserLookupIndex:
+    """用户二级索引
+
+    维护 openid/phone/email -> 用户ID 的哈希索引，登录查找耗时与用户总数无关。
+    用户字典会被原地修改，因此索引记录每个用户上次建索引时的字段值，
+    reindex 时只更新发生变化的字段。同一个值对应多个用户时按建索引顺序返回第一个，
+    与原先遍历 users 找到的第一个用户一致。
+    """
+
+    def __init__(self, fields: Iterable[str] = LOOKUP_FIELDS):
+        self.fields = tuple(fields)
+        self._index: dict[str, dict[Any, dict[str, None]]] = {field: {} for field in self.fields}
+        self._values: dict[str, dict[str, Any]] = {}
+
+    def reindex(self, user: dict[str, Any]):
+        """加入用户，或在用户的索引字段变化后更新索引"""
+        user_id = user["id"]
+        old_values = self._values.get(user_id, {})
+        new_values = {field: user.get(field) for field in self.fields if user.get(field)}
+        for field in self.fields:
+            old, new = old_values.get(field), new_values.get(field)
+            if old == new:
+                continue
+            if old is not None:
+                self._discard(field, old, user_id)
+            if new is not None:
+                self._index[field].setdefault(new, {})[user_id] = None
+        self._values[user_id] = new_values
+
+    def remove(self, user_id: str):
+        for field, value in self._values.pop(user_id, {}).items():
+            self._discard(field, value, user_id)
+
+    def get(self, field: str, value: Any) -> Optional[str]:
+        """按字段值查找用户ID，不存在时返回 None"""
+        if not value:
+            return None
+        holders = self._index[field].get(value)
+        return next(iter(holders)) if holders else None
+
+    def _discard(self, field: str, value: Any, user_id: str):
+        holders = self._index[field].get(value)
+        if holders is None:
+            return
+        holders.pop(user_id, None)
+        if not holders:
+            del self._index[field][value]
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,229 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 尚未关闭的日志；进程退出时统一关闭，只注册一次 atexit，不为每个实例注册（也不因此一直持有实例）
+_open_journals: "weakref.WeakSet[UserJournal]" = weakref.WeakSet()
+
+
+def _close_open_journals():
+    for journal in list(_open_journals):
+        try:
+            journal.close()
+        except Exception:
+            logger.exception("user_journal_close_failed", path=journal.journal_path)
+
+
+atexit.register(_close_open_journals)
+
+
+class UserJournal:
+    """用户数据追加日志
+
+    快照文件（test_user_data.json）加上一个 JSON-lines 变更日志：每次用户变更只追加一行
+    {"op": "put", "id": ..., "user": {...}} 或 {"op": "del", "id": ...}，写入耗时与用户总数无关。
+
+    - 每行写入后立即 flush 到操作系统，进程崩溃不丢数据；fsync 由后台线程每 fsync_interval
+      秒批量执行一次（为 0 时每次写入都 fsync），断电最多丢失一个批次
+    - 日志累计 compact_records 条后轮转为 <journal>.<序号>.old，由后台线程把旧快照与轮转日志
+      合并成新快照（写临时文件、fsync 后原子替换），整个过程不读取内存中的用户数据
+    - 启动时依次加载快照、残留的轮转日志和当前日志；末尾写了一半的行被忽略。
+      put/del 记录的是完整结果，重复回放同一段日志结果不变
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        journal_path: Optional[str] = None,
+        fsync_interval: float = 0.05,
+        compact_records: int = 10000
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal.jsonl"
+        self.fsync_interval = fsync_interval
+        self.compact_records = compact_records
+        self._lock = threading.Lock()
+        self._file = None
+        self._records = 0
+        self._dirty = False
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+        _open_journals.add(self)
+
+    @property
+    def pending_records(self) -> int:
+        """当前日志中尚未合并进快照的记录数"""
+        return self._records
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        """加载快照并回放日志，返回用户ID -> 用户数据"""
+        users = self._read_snapshot()
+        for path in self._rotated_journals():
+            self._replay(path, users)
+        self._records, valid_bytes = self._replay(self.journal_path, users)
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > valid_bytes:
+            # 截掉崩溃时写了一半的行，否则后续追加的记录会接在半行后面
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return users
+
+    def put(self, user: dict[str, Any]):
+        """记录用户的最新完整数据"""
+        self._append({"op": "put", "id": user["id"], "user": user})
+
+    def delete(self, user_id: str):
+        self._append({"op": "del", "id": user_id})
+
+    def compact(self, wait: bool = True):
+        """轮转当前日志并合并进快照；wait 为 True 时等待合并完成后返回"""
+        if wait:
+            self._join_compactor()
+        self._start_compaction()
+        if wait:
+            self._join_compactor()
+
+    def write_snapshot(self, users: dict[str, dict[str, Any]]):
+        """用给定数据整体替换快照并清空全部日志（离线维护脚本使用）"""
+        with self._lock:
+            self._close_file()
+            self._write_snapshot_file(users)
+            for path in self._rotated_journals() + [self.journal_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self._records = 0
+
+    def close(self):
+        """刷盘并关闭日志，等待进行中的合并完成"""
+        self._join_compactor()
+        with self._lock:
+            self._closed = True
+            self._close_file()
+        _open_journals.discard(self)
+
+    def _append(self, record: dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self._records += 1
+            if self.fsync_interval <= 0:
+                os.fsync(self._file.fileno())
+            else:
+                self._dirty = True
+            need_compaction = self.compact_records > 0 and self._records >= self.compact_records
+        if self.fsync_interval > 0:
+            self._ensure_flusher()
+        if need_compaction:
+            self._start_compaction()
+
+    def _join_compactor(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="user-journal-fsync", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._dirty and self._file is not None:
+                    os.fsync(self._file.fileno())
+                    self._dirty = False
+
+    def _start_compaction(self):
+        with self._lock:
+            if self._compactor is not None or self._records == 0:
+                return
+            self._close_file()
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, f"{self.journal_path}.{time.time_ns():020d}.old")
+            self._records = 0
+            self._compactor = threading.Thread(target=self._compact, name="user-journal-compact", daemon=True)
+            self._compactor.start()
+
+    def _compact(self):
+        started = time.perf_counter()
+        try:
+            users = self._read_snapshot()
+            rotated = self._rotated_journals()
+            replayed = sum(self._replay(path, users)[0] for path in rotated)
+            self._write_snapshot_file(users)
+            for path in rotated:
+                os.remove(path)
+            logger.info(
+                "user_journal_compacted", records=replayed, users=len(users),
+                ms=round((time.perf_counter() - started) * 1000, 1)
+            )
+        except Exception:
+            logger.exception("user_journal_compaction_failed")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._dirty = False
+
+    def _rotated_journals(self) -> list[str]:
+        return sorted(glob.glob(glob.escape(self.journal_path) + ".*.old"))
+
+    def _read_snapshot(self) -> dict[str, dict[str, Any]]:
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_snapshot_file(self, users: dict[str, dict[str, Any]]):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(users, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    @staticmethod
+    def _replay(path: str, users: dict[str, dict[str, Any]]) -> tuple[int, int]:
+        """回放一个日志文件，返回 (回放的记录数, 完整记录占用的字节数)"""
+        if not os.path.exists(path):
+            return 0, 0
+        count = valid_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的最后一行
+                    logger.warning("user_journal_truncated_record", path=path, line=count + 1)
+                    break
+                if record["op"] == "put":
+                    users[record["id"]] = record["user"]
+                elif record["op"] == "del":
+                    users.pop(record["id"], None)
+                count += 1
+                valid_bytes += len(line)
+        return count, valid_bytes
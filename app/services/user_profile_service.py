@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from app.models.user_profile import UserProfile
 from app.models.user import User
+from app.utils.db_writer import serialized_write, async_serialized_write
 from app.models.user_profile_schemas import (
     UserProfileCreate, UserProfileUpdate, UserProfile as UserProfileSchema,
     UserProfilesResponse, UserAllProfilesResponse, UserProfilesByScene
@@ -14,11 +16,21 @@ class UserProfileService:
     """用户角色资料服务"""
     
     @staticmethod
+    @serialized_write
     def create_profile(db: Session, user_id: str, profile_data: UserProfileCreate) -> UserProfile:
         """创建用户角色资料"""
+        db_profile = UserProfileService.build_profile(user_id, profile_data)
+        db.add(db_profile)
+        db.commit()
+        db.refresh(db_profile)
+        return db_profile
+    
+    @staticmethod
+    def build_profile(user_id: str, profile_data: UserProfileCreate) -> UserProfile:
+        """根据创建请求构建角色资料对象"""
         profile_id = f"profile_{profile_data.scene_type}_{profile_data.role_type}_{uuid.uuid4().hex[:8]}"
         
-        db_profile = UserProfile(
+        return UserProfile(
             id=profile_id,
             user_id=user_id,
             role_type=profile_data.role_type,
@@ -31,11 +43,6 @@ class UserProfileService:
             tags=profile_data.tags,
             visibility=profile_data.visibility or "public"
         )
-        
-        db.add(db_profile)
-        db.commit()
-        db.refresh(db_profile)
-        return db_profile
     
     @staticmethod
     def get_user_profiles(db: Session, user_id: str, active_only: bool = False) -> List[UserProfile]:
@@ -72,7 +79,11 @@ class UserProfileService:
         # 获取基础用户信息
         user = db.query(User).filter(User.id == user_id).first()
         
-        # 合并资料数据和基础用户信息
+        return UserProfileService.merge_profile_with_user(profile, user)
+    
+    @staticmethod
+    def merge_profile_with_user(profile: UserProfile, user: Optional[User]) -> Dict[str, Any]:
+        """合并角色资料数据和基础用户信息"""
         result = {
             "id": profile.id,
             "user_id": profile.user_id,
@@ -119,6 +130,7 @@ class UserProfileService:
         ).order_by(UserProfile.created_at.desc()).all()
     
     @staticmethod
+    @serialized_write
     def update_profile(db: Session, profile_id: str, update_data: UserProfileUpdate) -> Optional[UserProfile]:
         """更新用户角色资料"""
         db_profile = db.query(UserProfile).filter(UserProfile.id == profile_id).first()
@@ -135,6 +147,7 @@ class UserProfileService:
         return db_profile
     
     @staticmethod
+    @serialized_write
     def delete_profile(db: Session, profile_id: str) -> bool:
         """删除用户角色资料"""
         db_profile = db.query(UserProfile).filter(UserProfile.id == profile_id).first()
@@ -147,6 +160,7 @@ class UserProfileService:
         return True
     
     @staticmethod
+    @serialized_write
     def toggle_profile_status(db: Session, profile_id: str, is_active: int) -> Optional[UserProfile]:
         """切换资料激活状态"""
         db_profile = db.query(UserProfile).filter(UserProfile.id == profile_id).first()
@@ -163,6 +177,11 @@ class UserProfileService:
     def get_user_all_profiles_response(db: Session, user_id: str) -> UserAllProfilesResponse:
         """获取用户所有角色资料的完整响应"""
         all_profiles = UserProfileService.get_user_profiles(db, user_id)
+        return UserProfileService.build_all_profiles_response(user_id, all_profiles)
+    
+    @staticmethod
+    def build_all_profiles_response(user_id: str, all_profiles: List[UserProfile]) -> UserAllProfilesResponse:
+        """按场景分组构建用户所有角色资料的响应"""
         active_profiles = [p for p in all_profiles if p.is_active == 1]
         
         # 按场景分组
@@ -305,4 +324,112 @@ class UserProfileService:
         return templates.get(scene_type, {}).get(role_type, {
             "profile_data": {},
             "preferences": {}
-        })
\ No newline at end of file
+        })
+
+
+class AsyncUserProfileService:
+    """用户角色资料服务（异步版本），供 async def 路由使用"""
+    
+    @staticmethod
+    @async_serialized_write
+    async def create_profile(db: AsyncSession, user_id: str, profile_data: UserProfileCreate) -> UserProfile:
+        """创建用户角色资料"""
+        db_profile = UserProfileService.build_profile(user_id, profile_data)
+        db.add(db_profile)
+        await db.commit()
+        await db.refresh(db_profile)
+        return db_profile
+    
+    @staticmethod
+    async def get_user_profiles(db: AsyncSession, user_id: str, active_only: bool = False) -> List[UserProfile]:
+        """获取用户的所有角色资料"""
+        query = select(UserProfile).where(UserProfile.user_id == user_id)
+        
+        if active_only:
+            query = query.where(UserProfile.is_active == 1)
+        
+        result = await db.scalars(query.order_by(UserProfile.created_at.desc()))
+        return list(result)
+    
+    @staticmethod
+    async def get_profile_by_id(db: AsyncSession, profile_id: str) -> Optional[UserProfile]:
+        """根据资料ID获取角色资料"""
+        return await db.scalar(select(UserProfile).where(UserProfile.id == profile_id))
+    
+    @staticmethod
+    async def get_user_profile_by_role(db: AsyncSession, user_id: str, scene_type: str, role_type: str) -> Optional[Dict[str, Any]]:
+        """获取用户在特定场景和角色下的资料，包含基础用户信息"""
+        profile = await db.scalar(
+            select(UserProfile).where(
+                UserProfile.user_id == user_id,
+                UserProfile.scene_type == scene_type,
+                UserProfile.role_type == role_type,
+                UserProfile.is_active == 1
+            )
+        )
+        
+        if not profile:
+            return None
+        
+        user = await db.scalar(select(User).where(User.id == user_id))
+        return UserProfileService.merge_profile_with_user(profile, user)
+    
+    @staticmethod
+    async def get_profiles_by_scene(db: AsyncSession, user_id: str, scene_type: str) -> List[UserProfile]:
+        """获取用户在特定场景下的所有角色资料"""
+        result = await db.scalars(
+            select(UserProfile)
+            .where(UserProfile.user_id == user_id, UserProfile.scene_type == scene_type)
+            .order_by(UserProfile.created_at.desc())
+        )
+        return list(result)
+    
+    @staticmethod
+    @async_serialized_write
+    async def update_profile(db: AsyncSession, profile_id: str, update_data: UserProfileUpdate) -> Optional[UserProfile]:
+        """更新用户角色资料"""
+        db_profile = await AsyncUserProfileService.get_profile_by_id(db, profile_id)
+        
+        if not db_profile:
+            return None
+        
+        update_dict = update_data.dict(exclude_unset=True)
+        for field, value in update_dict.items():
+            setattr(db_profile, field, value)
+        
+        await db.commit()
+        await db.refresh(db_profile)
+        return db_profile
+    
+    @staticmethod
+    @async_serialized_write
+    async def delete_profile(db: AsyncSession, profile_id: str) -> bool:
+        """删除用户角色资料"""
+        db_profile = await AsyncUserProfileService.get_profile_by_id(db, profile_id)
+        
+        if not db_profile:
+            return False
+        
+        await db.delete(db_profile)
+        await db.commit()
+        return True
+    
+    @staticmethod
+    @async_serialized_write
+    async def toggle_profile_status(db: AsyncSession, profile_id: str, is_active: int) -> Optional[UserProfile]:
+        """切换资料激活状态"""
+        db_profile = await AsyncUserProfileService.get_profile_by_id(db, profile_id)
+        
+        if not db_profile:
+            return None
+        
+        db_profile.is_active = is_active
+        await db.commit()
+        await db.refresh(db_profile)
+        return db_profile
+    
+    @staticmethod
+    async def get_user_all_profiles_response(db: AsyncSession, user_id: str) -> UserAllProfilesResponse:
+        """获取用户所有角色资料的完整响应"""
+        all_profiles = await AsyncUserProfileService.get_user_profiles(db, user_id)
+        return UserProfileService.build_all_profiles_response(user_id, all_profiles)
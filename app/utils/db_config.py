@@ -1,7 +1,14 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Optional
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from app.config import settings
 
 # 环境变量配置
 ENV = os.getenv("ENVIRONMENT", "development")
@@ -11,20 +18,230 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     DATABASE_URLS = {
         "development": "sqlite:///./vmatch_dev.db",
-        "testing": "sqlite:///./vmatch_test.db", 
+        "testing": "sqlite:///./vmatch_test.db",
         "production": "sqlite:///./vmatch_prod.db"
     }
     DATABASE_URL = DATABASE_URLS.get(ENV, "sqlite:///./vmatch_dev.db")
 
-# 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# SQLite 每执行多少条虚拟机指令检查一次语句超时
+SQLITE_PROGRESS_INTERVAL = 10000
+
+
+class PoolMetrics:
+    """连接池获取连接的统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waitAvgMs": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "waitMaxMs": round(self.max_wait * 1000, 3),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = self.timeouts = 0
+            self.total_wait = self.max_wait = 0.0
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录获取连接耗时（含排队等待和新建溢出连接）的 QueuePool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    return database_url.startswith("sqlite") and (":memory:" in database_url or database_url.rstrip("/") == "sqlite:")
+
+
+def _install_statement_timeout(db_engine: Engine, timeout_ms: int):
+    """按数据库类型设置语句超时"""
+    backend = db_engine.url.get_backend_name()
+    seconds = timeout_ms / 1000
+
+    if backend == "sqlite":
+        # SQLite 没有语句超时，通过进度回调在超过截止时间后中断执行
+        @event.listens_for(db_engine, "connect")
+        def _install_progress_handler(dbapi_connection, connection_record):
+            info = connection_record.info
+
+            def _check_deadline():
+                deadline = info.get("statement_deadline")
+                return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+            dbapi_connection.set_progress_handler(_check_deadline, SQLITE_PROGRESS_INTERVAL)
+
+        @event.listens_for(db_engine, "before_cursor_execute")
+        def _start_deadline(conn, cursor, statement, parameters, context, executemany):
+            conn.info["statement_deadline"] = time.monotonic() + seconds
+
+        @event.listens_for(db_engine, "after_cursor_execute")
+        def _clear_deadline(conn, cursor, statement, parameters, context, executemany):
+            conn.info["statement_deadline"] = None
+
+    elif backend == "mysql":
+        @event.listens_for(db_engine, "connect")
+        def _set_mysql_timeout(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {int(timeout_ms)}")
+            cursor.close()
+
+
+def _install_sqlite_pragmas(db_engine: Engine):
+    """SQLite 生产模式：每个新连接开启 WAL 并调优缓存、内存映射和锁等待"""
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    @event.listens_for(db_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def is_sqlite_file(db_engine: Engine) -> bool:
+    """是否为 SQLite 文件数据库"""
+    return db_engine.url.get_backend_name() == "sqlite" and not _is_memory_sqlite(str(db_engine.url))
+
+
+def create_db_engine(database_url: str = DATABASE_URL, **engine_kwargs) -> Engine:
+    """创建数据库引擎，连接池参数来自 Settings，可通过 engine_kwargs 覆盖"""
+    is_sqlite = database_url.startswith("sqlite")
+    connect_args: dict[str, Any] = {"check_same_thread": False} if is_sqlite else {}
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout_ms > 0 and database_url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={int(timeout_ms)}"
+
+    options: dict[str, Any] = {"connect_args": connect_args}
+    if not _is_memory_sqlite(database_url):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    options.update(engine_kwargs)
+
+    db_engine = create_engine(database_url, **options)
+    if settings.SQLITE_WAL and is_sqlite_file(db_engine):
+        _install_sqlite_pragmas(db_engine)
+    if timeout_ms > 0:
+        _install_statement_timeout(db_engine, timeout_ms)
+    return db_engine
+
+
+def pool_status(db_engine: Engine = None) -> dict[str, Any]:
+    """连接池状态：配置、当前占用与获取连接耗时统计"""
+    pool = (db_engine or engine).pool
+    status: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "poolSize": pool.size(),
+            "maxOverflow": pool._max_overflow,
+            "checkedOut": pool.checkedout(),
+            "checkedIn": pool.checkedin(),
+            # overflow() 在未建满常驻连接时为负数，表示还可创建的常驻连接数
+            "overflow": max(pool.overflow(), 0),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.metrics.snapshot())
+    return status
+
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(database_url: str = DATABASE_URL) -> str:
+    """将同步数据库URL转换为对应的异步驱动URL"""
+    scheme, sep, rest = database_url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支持异步访问的数据库: {scheme}")
+    return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+
+def create_async_db_engine(database_url: str = DATABASE_URL, **engine_kwargs) -> AsyncEngine:
+    """创建异步数据库引擎，服务端数据库的连接池参数及 SQLite 连接参数与同步引擎一致"""
+    url = async_database_url(database_url)
+    options: dict[str, Any] = {}
+    if url.startswith("postgresql") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(int(settings.DB_STATEMENT_TIMEOUT_MS))}}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    # aiosqlite 沿用 SQLAlchemy 默认的 NullPool：每个会话独占一个连接线程，用完即关闭，
+    # 避免池中连接的后台线程阻止进程退出，也避免连接跨事件循环复用
+    options.update(engine_kwargs)
+
+    async_engine = create_async_engine(url, **options)
+    if settings.SQLITE_WAL and is_sqlite_file(async_engine.sync_engine):
+        _install_sqlite_pragmas(async_engine.sync_engine)
+    return async_engine
+
+
+# 创建数据库引擎（全局唯一，所有模块共用同一个连接池）
+engine = create_db_engine()
 
 # 创建会话
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 聊天数据库引擎在首次使用时创建
+_chat_engine: Optional[Engine] = None
+_chat_engine_lock = threading.Lock()
+
+# 异步引擎在首次使用时创建
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
 # 创建Base类
 Base = declarative_base()
 
@@ -34,4 +251,32 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_chat_engine() -> Engine:
+    """聊天消息与已读状态使用的引擎；未设置 CHAT_DATABASE_URL 或与主库相同时共用主库连接池"""
+    global _chat_engine
+    if not settings.CHAT_DATABASE_URL or settings.CHAT_DATABASE_URL == DATABASE_URL:
+        return engine
+    with _chat_engine_lock:
+        if _chat_engine is None:
+            _chat_engine = create_db_engine(settings.CHAT_DATABASE_URL)
+        return _chat_engine
+
+def get_async_engine() -> AsyncEngine:
+    """获取全局异步引擎"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    """创建异步会话"""
+    get_async_engine()
+    return _async_session_factory()
+
+# 获取异步数据库会话，供 async def 路由使用，查询不会阻塞事件循环
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
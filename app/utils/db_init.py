@@ -1,10 +1,66 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
 from app.utils.db_config import Base, engine
-from app.models import User, Match, MatchDetail
+from app.utils.logger import get_logger
+from app.models import User, Match, MatchDetail, ChatMessage, ChatReadState
+
+logger = get_logger(__name__)
+
+
+def _column_ddl(column, dialect) -> str:
+    """ADD COLUMN 的列定义：SQLite 不能追加带约束的列，只保留类型和常量默认值，唯一性由索引保证"""
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar and isinstance(default.arg, (bool, int, float)):
+        ddl += f" DEFAULT {int(default.arg) if isinstance(default.arg, bool) else default.arg}"
+    return ddl
+
+
+def upgrade_schema(bind: Engine = engine) -> list[str]:
+    """补齐已有表中缺少的列和索引，返回执行的变更
+
+    create_all 只创建不存在的表，不会修改已有的表；模型新增的列（如 users.openid、latitude/longitude）
+    和索引由这里追加。唯一索引的列已有重复值时跳过该索引并记录日志，不阻止启动。
+    """
+    inspector = inspect(bind)
+    changes = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, bind.dialect)}"))
+                changes.append(f"{table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique:
+                    columns = ", ".join(column.name for column in index.columns)
+                    duplicates = conn.execute(text(
+                        f"SELECT {columns} FROM {table.name} GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT 5"
+                    )).fetchall()
+                    # NULL 不参与唯一性校验
+                    duplicates = [row for row in duplicates if None not in tuple(row)]
+                    if duplicates:
+                        logger.warning("unique_index_skipped", index=index.name, duplicates=[tuple(row) for row in duplicates])
+                        continue
+                index.create(bind=conn)
+                changes.append(index.name)
+    if changes:
+        logger.info("schema_upgraded", changes=changes)
+    return changes
+
 
 def init_db():
-    """初始化数据库，创建所有表"""
+    """初始化数据库，创建所有表并补齐已有表缺少的列和索引"""
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
 
 if __name__ == "__main__":
     init_db()
-    print("数据库初始化完成")
\ No newline at end of file
+    print("数据库初始化完成")
@@ -0,0 +1,138 @@
+"""
+数据库写入队列
+SQLite 同一时刻只允许一个写事务，并发写入会出现 "database is locked"。
+开启 SQLITE_WRITE_QUEUE 后，被 serialized_write 装饰的写操作统一交给单个写线程顺序执行，
+读操作仍在各自的请求线程中并发执行。异步写操作（async_serialized_write）同样在写线程中排队：
+轮到它时写线程暂停，由事件循环执行该异步写，完成后写线程继续处理后面的写操作，
+同步写与异步写始终只有一个在执行。
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+from app.config import settings
+from app.utils.db_config import engine, is_sqlite_file
+
+T = TypeVar("T")
+
+
+class SerialWriter:
+    """单线程写入队列，submit 阻塞到写操作执行完成并返回其结果或抛出其异常"""
+
+    def __init__(self, name: str = "db-writer"):
+        self._name = name
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writer_thread: Optional[int] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """排队及执行中的写操作数量"""
+        return self._pending
+
+    def _enqueue(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=self._name, initializer=self._mark_writer_thread
+                )
+            self._pending += 1
+            future = self._executor.submit(func, *args, **kwargs)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        # 写操作内部再调用写操作时直接执行，避免单线程队列自我等待
+        if threading.get_ident() == self._writer_thread:
+            return func(*args, **kwargs)
+        return self._enqueue(func, *args, **kwargs).result()
+
+    @contextlib.asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        """在写线程中排队，轮到时写线程暂停直到退出上下文；等待期间不阻塞事件循环
+
+        异步写操作必须在事件循环中执行，不能交给写线程；占住写线程即可与同步写操作互斥。
+        """
+        loop = asyncio.get_running_loop()
+        acquired = loop.create_future()
+        released = threading.Event()
+
+        def notify():
+            if not acquired.done():
+                acquired.set_result(None)
+
+        def hold():
+            try:
+                loop.call_soon_threadsafe(notify)
+            except RuntimeError:
+                # 事件循环已关闭，等待方不存在
+                return
+            released.wait()
+
+        self._enqueue(hold)
+        try:
+            await acquired
+            yield
+        finally:
+            # 等待期间被取消时，写线程轮到 hold 后立即放行
+            released.set()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _mark_writer_thread(self):
+        self._writer_thread = threading.get_ident()
+
+
+db_writer = SerialWriter()
+
+# 只有 SQLite 文件数据库需要串行写入，其他数据库自行处理并发写
+WRITE_QUEUE_ENABLED = settings.SQLITE_WRITE_QUEUE and is_sqlite_file(engine)
+
+
+def serialized_write(func: Callable[..., T]) -> Callable[..., T]:
+    """将数据库写操作放入写入队列执行；写入队列关闭时直接调用"""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        if not WRITE_QUEUE_ENABLED:
+            return func(*args, **kwargs)
+        return db_writer.submit(func, *args, **kwargs)
+
+    return wrapper
+
+
+# 标记当前任务已占住写线程，嵌套的异步写操作直接执行
+_holding_write_lock: contextvars.ContextVar[bool] = contextvars.ContextVar("holding_write_lock", default=False)
+
+
+def async_serialized_write(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """异步写操作与同步写操作在同一个写入队列中排队，等待期间不阻塞事件循环；写入队列关闭时直接调用
+
+    执行期间写线程暂停，异步写操作内部不能再同步等待 serialized_write 的写操作。
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        if not WRITE_QUEUE_ENABLED or _holding_write_lock.get():
+            return await func(*args, **kwargs)
+        async with db_writer.exclusive():
+            token = _holding_write_lock.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _holding_write_lock.reset(token)
+
+    return wrapper
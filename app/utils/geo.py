@@ -0,0 +1,211 @@
+"""
+地理位置工具
+将用户/卡片的位置统一为 (纬度, 经度)，并提供网格空间索引用于按半径筛选
+"""
+
+import math
+from typing import Any, Iterable, Optional
+import numpy as np
+from app.models.enums import Region
+
+EARTH_RADIUS_KM = 6371.0088
+
+# 每纬度对应的公里数
+KM_PER_DEGREE = 111.32
+
+# 网格边长（度），约 55 公里
+GRID_CELL_DEGREES = 0.5
+
+# Region 枚举城市的市中心坐标 (纬度, 经度)，用于离线将地区文本转换为坐标
+REGION_CENTROIDS: dict[str, tuple[float, float]] = {
+    Region.BEIJING.value: (39.9042, 116.4074),
+    Region.SHANGHAI.value: (31.2304, 121.4737),
+    Region.GUANGZHOU.value: (23.1291, 113.2644),
+    Region.SHENZHEN.value: (22.5431, 114.0579),
+    Region.HANGZHOU.value: (30.2741, 120.1551),
+    Region.CHENGDU.value: (30.5728, 104.0668),
+    Region.WUHAN.value: (30.5928, 114.3055),
+    Region.XIAN.value: (34.3416, 108.9398),
+    Region.NANJING.value: (32.0603, 118.7969),
+    Region.SUZHOU.value: (31.2990, 120.5853),
+    Region.TIANJIN.value: (39.3434, 117.3616),
+    Region.CHONGQING.value: (29.5630, 106.5516),
+    Region.QINGDAO.value: (36.0671, 120.3826),
+    Region.DALIAN.value: (38.9140, 121.6147),
+    Region.XIAMEN.value: (24.4798, 118.0894),
+    Region.CHANGSHA.value: (28.2282, 112.9388),
+}
+
+Coordinate = tuple[float, float]
+
+
+def _valid(lat: Any, lon: Any) -> Optional[Coordinate]:
+    if isinstance(lat, bool) or isinstance(lon, bool):
+        return None
+    if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return float(lat), float(lon)
+
+
+def region_centroid(text: str) -> Optional[Coordinate]:
+    """从地区文本（如"上海市 上海市 徐汇区"）中识别 Region 城市并返回市中心坐标"""
+    for name, centroid in REGION_CENTROIDS.items():
+        if name in text:
+            return centroid
+    return None
+
+
+def normalize_location(location: Any) -> Optional[Coordinate]:
+    """将位置统一为 (纬度, 经度)
+
+    支持 {"latitude", "longitude"} 字典、[纬度, 经度] 数值列表、
+    [省, 市, 区] 文本列表以及自由文本字符串，无法识别时返回 None。
+    """
+    if not location:
+        return None
+    if isinstance(location, dict):
+        return _valid(
+            location.get("latitude", location.get("lat")),
+            location.get("longitude", location.get("lng", location.get("lon")))
+        )
+    if isinstance(location, (list, tuple)):
+        if len(location) == 2 and all(isinstance(v, (int, float)) for v in location):
+            return _valid(location[0], location[1])
+        return region_centroid(" ".join(str(part) for part in location if part))
+    if isinstance(location, str):
+        return region_centroid(location)
+    return None
+
+
+def location_of(record: Optional[dict[str, Any]]) -> Optional[Coordinate]:
+    """获取用户/卡片记录的坐标：优先使用 latitude/longitude 字段，其次解析 location"""
+    if not record:
+        return None
+    coordinate = _valid(record.get("latitude"), record.get("longitude"))
+    if coordinate:
+        return coordinate
+    coordinate = normalize_location(record.get("location"))
+    if coordinate:
+        return coordinate
+    house_info = record.get("houseInfo")
+    if isinstance(house_info, dict):
+        return normalize_location(house_info.get("location"))
+    return None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """两点间的球面距离（公里）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """一点到一组点的球面距离（公里），坐标未知（NaN）的结果为 NaN"""
+    phi1 = np.float32(math.radians(lat))
+    phi2 = np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2
+    a += np.float32(math.cos(phi1)) * np.cos(phi2) * np.sin(np.radians(lons - np.float32(lon)) / 2) ** 2
+    np.sqrt(a, out=a)
+    np.minimum(a, 1.0, out=a)
+    np.arcsin(a, out=a)
+    a *= np.float32(2 * EARTH_RADIUS_KM)
+    return a
+
+
+def approx_distance_km_array(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """等距矩形投影近似距离（公里），百公里内误差可忽略，用于评分时避免逐点三角函数"""
+    dlat = np.subtract(lats, np.float32(lat))
+    dlon = np.subtract(lons, np.float32(lon))
+    dlon *= np.float32(math.cos(math.radians(lat)))
+    dlat *= dlat
+    dlon *= dlon
+    dlat += dlon
+    np.sqrt(dlat, out=dlat)
+    dlat *= np.float32(KM_PER_DEGREE)
+    return dlat
+
+
+def format_distance(km: Optional[float]) -> Optional[str]:
+    """格式化距离用于卡片展示"""
+    if km is None or math.isnan(km):
+        return None
+    if km < 1:
+        return f"{max(int(km * 1000), 1)}m"
+    if km < 10:
+        return f"{km:.1f}km"
+    return f"{int(round(km))}km"
+
+
+def grid_cell(lat: float, lon: float) -> tuple[int, int]:
+    """坐标所在的网格"""
+    return int(math.floor(lat / GRID_CELL_DEGREES)), int(math.floor(lon / GRID_CELL_DEGREES))
+
+
+def grid_cells_within(lat: float, lon: float, radius_km: float) -> Iterable[tuple[int, int]]:
+    """覆盖以 (lat, lon) 为圆心、radius_km 为半径的圆的全部网格"""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    # 取圆内纬度绝对值最大处的余弦，保证经度方向覆盖完整
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+    low_row, low_col = grid_cell(min_lat, lon - dlon)
+    high_row, high_col = grid_cell(max_lat, lon + dlon)
+    for row in range(low_row, high_row + 1):
+        for col in range(low_col, high_col + 1):
+            yield row, col
+
+
+class GridIndex:
+    """网格空间索引
+
+    按 GRID_CELL_DEGREES 将坐标划分到网格桶，半径查询只访问覆盖圆的网格，
+    再逐个计算精确距离，耗时与附近的点数相关而与总数无关。
+    """
+
+    def __init__(self):
+        self._cells: dict[tuple[int, int], dict[str, Coordinate]] = {}
+        self._points: dict[str, Coordinate] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._points
+
+    def add(self, key: str, coordinate: Optional[Coordinate]):
+        """添加或移动一个点，坐标为 None 时从索引中移除"""
+        self.remove(key)
+        if coordinate is None:
+            return
+        self._points[key] = coordinate
+        self._cells.setdefault(grid_cell(*coordinate), {})[key] = coordinate
+
+    def remove(self, key: str):
+        coordinate = self._points.pop(key, None)
+        if coordinate is None:
+            return
+        cell = grid_cell(*coordinate)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def get(self, key: str) -> Optional[Coordinate]:
+        return self._points.get(key)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> dict[str, float]:
+        """返回半径内的 {key: 距离(公里)}"""
+        result: dict[str, float] = {}
+        for cell in grid_cells_within(lat, lon, radius_km):
+            for key, (point_lat, point_lon) in self._cells.get(cell, {}).items():
+                distance = haversine_km(lat, lon, point_lat, point_lon)
+                if distance <= radius_km:
+                    result[key] = distance
+        return result
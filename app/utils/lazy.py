@@ -0,0 +1,41 @@
+"""
+延迟初始化
+模块级单例（如 mock_data_service）在导入时只创建代理，首次访问属性时才构造真实实例，
+导入 app.main 不再加载数据文件；并发的首次访问只构造一次。
+"""
+
+import threading
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """首次访问属性时才调用 factory 创建实例的代理，属性读写均转发到实例"""
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get_instance(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, "_instance", self._factory())
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get_instance(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.get_instance(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self.get_instance(), name)
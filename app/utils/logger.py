@@ -0,0 +1,106 @@
+"""
+结构化日志
+按级别门控：未启用的级别直接返回，不拼接任何字符串；字段值可以是无参函数，
+只在日志真正输出时才求值。热点路径（每个请求都会经过的查找）通过 sample_rate 采样输出。
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+from typing import Any, Dict, Optional
+from app.config import settings
+
+# 热点路径日志的默认采样率
+HOT_PATH_SAMPLE_RATE = settings.LOG_HOT_PATH_SAMPLE_RATE
+
+_configured = False
+
+
+def _resolve(value: Any) -> Any:
+    """惰性字段：无参函数在输出时才求值"""
+    return value() if callable(value) else value
+
+
+class StructuredFormatter(logging.Formatter):
+    """输出 `时间 级别 logger 事件 key=value ...` 文本或单行 JSON"""
+
+    def __init__(self, fmt_type: str = "text"):
+        super().__init__()
+        self.fmt_type = fmt_type
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {key: _resolve(value) for key, value in getattr(record, "fields", {}).items()}
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        if self.fmt_type == "json":
+            payload = {"ts": timestamp, "level": record.levelname, "logger": record.name, "event": record.getMessage(), **fields}
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        parts = [timestamp, record.levelname, record.name, record.getMessage()]
+        parts.extend(f"{key}={value}" for key, value in fields.items())
+        line = " ".join(str(part) for part in parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger:
+    """标准库 logger 的结构化封装：log.info("user_created", user_id=...)"""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any], sample_rate: float, exc_info: Any):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            return
+        self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info, stacklevel=3)
+
+    def debug(self, event: str, sample_rate: float = 1.0, exc_info: Any = None, **fields: Any):
+        self._log(logging.DEBUG, event, fields, sample_rate, exc_info)
+
+    def info(self, event: str, sample_rate: float = 1.0, exc_info: Any = None, **fields: Any):
+        self._log(logging.INFO, event, fields, sample_rate, exc_info)
+
+    def warning(self, event: str, sample_rate: float = 1.0, exc_info: Any = None, **fields: Any):
+        self._log(logging.WARNING, event, fields, sample_rate, exc_info)
+
+    def error(self, event: str, sample_rate: float = 1.0, exc_info: Any = None, **fields: Any):
+        self._log(logging.ERROR, event, fields, sample_rate, exc_info)
+
+    def exception(self, event: str, **fields: Any):
+        """在 except 块中记录错误及堆栈"""
+        self._log(logging.ERROR, event, fields, 1.0, True)
+
+
+def configure_logging(level: Optional[str] = None, fmt_type: Optional[str] = None, stream=None):
+    """为 app.* logger 安装结构化输出，重复调用时只更新级别和格式"""
+    global _configured
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel((level or settings.LOG_LEVEL).upper())
+    app_logger.propagate = False
+
+    formatter = StructuredFormatter(fmt_type or settings.LOG_FORMAT)
+    if not _configured or stream is not None:
+        for handler in list(app_logger.handlers):
+            app_logger.removeHandler(handler)
+        handler = logging.StreamHandler(stream or sys.stderr)
+        app_logger.addHandler(handler)
+        _configured = True
+    for handler in app_logger.handlers:
+        handler.setFormatter(formatter)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """获取结构化 logger，name 使用模块名（app.xxx）以继承 app 的级别与输出配置"""
+    if not _configured:
+        configure_logging()
+    return StructuredLogger(name)
+
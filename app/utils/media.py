@@ -0,0 +1,201 @@
+"""
+媒体文件响应
+在 StaticFiles 的基础上增加：
+- HTTP Range（单段 bytes 区间，含 If-Range），拖动视频进度条只下载需要的部分
+- ETag / If-None-Match、If-Modified-Since 条件请求，重复访问返回 304
+- 内容寻址的文件（文件名即 SHA-256，见 blob_store）内容永不变化，使用一年的 immutable 缓存
+- 服务器支持 ASGI zerocopysend 扩展时直接交给 sendfile，否则按固定大小分块读取，内存占用与文件大小无关
+- 对象存储中的文件通过 open_range 按区间读取后分块转发（见 storage_backend）
+"""
+
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Mapping, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.config import settings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 内容寻址文件及其图片变体：{sha256}.ext、{sha256}_{宽度}.webp
+_CONTENT_ADDRESSED_RE = re.compile(r"([0-9a-f]{64}(?:_\d+)?)\.[0-9a-z]+")
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+# mimetypes 识别不准的扩展名
+_MEDIA_TYPES = {".3gp": "video/3gpp", ".webp": "image/webp", ".mkv": "video/x-matroska"}
+
+
+def media_type_for(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return _MEDIA_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def entity_tag(path: str, stat_result: os.stat_result) -> Tuple[str, bool]:
+    """返回 (ETag, 是否内容寻址)；内容寻址文件直接用内容哈希作为强校验值"""
+    match = _CONTENT_ADDRESSED_RE.fullmatch(os.path.basename(path))
+    if match:
+        return f'"{match.group(1)}"', True
+    # 对象存储的文件信息只有秒级修改时间
+    mtime_ns = stat_result.st_mtime_ns or int(stat_result.st_mtime * 1_000_000_000)
+    return f'"{mtime_ns:x}-{stat_result.st_size:x}"', False
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match 使用弱比较：忽略 W/ 前缀
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _not_modified_since(header: str, stat_result: os.stat_result) -> bool:
+    try:
+        return int(stat_result.st_mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单段 Range，返回闭区间 (start, end)；多段或格式不合法返回 None（按完整文件响应），
+    区间无法满足时抛出 ValueError"""
+    match = _RANGE_RE.fullmatch(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError(header)
+    return start, end
+
+
+class MediaFileResponse(Response):
+    """发送文件的 [start, end] 区间"""
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int,
+        headers: Mapping[str, str],
+        media_type: str,
+        send_body: bool = True,
+        open_range: Optional[Callable[[int, int], Any]] = None
+    ):
+        self.path = path
+        self.open_range = open_range
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.send_body = send_body
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if not self.send_body or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if self.open_range is not None:
+            await self._send_stream(send, count)
+            return
+        f = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+            chunk_size = settings.MEDIA_CHUNK_SIZE
+            offset = self.start
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(os.pread, f.fileno(), min(chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 文件在发送过程中被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(f.close)
+
+    async def _send_stream(self, send: Send, count: int):
+        body = await run_in_threadpool(self.open_range, self.start, self.end)
+        try:
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(body.read, min(settings.MEDIA_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(body.close)
+
+
+def media_response(
+    path: str,
+    stat_result: os.stat_result,
+    request_headers: Mapping[str, str],
+    send_body: bool = True,
+    open_range: Optional[Callable[[int, int], Any]] = None
+) -> Response:
+    """根据条件请求和 Range 头生成 200/206/304/416 响应；open_range(start, end) 返回可 read/close 的区间内容，
+    不传时直接读取本地文件 path"""
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise ValueError(path)
+    size = stat_result.st_size
+    etag, immutable = entity_tag(path, stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}",
+    }
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif "if-modified-since" in request_headers and _not_modified_since(request_headers["if-modified-since"], stat_result):
+        return Response(status_code=304, headers=headers)
+
+    media_type = media_type_for(path)
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    # If-Range 与当前版本不一致时忽略 Range，返回完整的新内容
+    if range_header and if_range is not None and if_range.strip() not in (etag, last_modified):
+        range_header = None
+    if range_header and size > 0:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return MediaFileResponse(path, start, end, 206, headers, media_type, send_body, open_range)
+    return MediaFileResponse(path, 0, size - 1, 200, headers, media_type, send_body, open_range)
@@ -0,0 +1,61 @@
+"""
+请求体大小限制
+multipart 表单在进入路由之前就会被完整解析并缓存到临时文件，路由内的大小检查无法阻止超大请求占满磁盘。
+该中间件对指定路径：Content-Length 超过上限时直接返回 413，不读取请求体；
+没有 Content-Length（分块传输）时边接收边计数，超过上限立即中止，
+并把应用对中止请求给出的错误响应换成同样的 413 响应，两种情况返回的内容一致。
+"""
+
+from typing import Dict
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _too_large(max_body: int) -> dict:
+    return {"code": 413, "message": f"请求体超过限制，最大允许 {max_body // (1024 * 1024)}MB", "data": None}
+
+
+class RequestBodyLimitMiddleware:
+    """按路径限制请求体大小的 ASGI 中间件"""
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        max_body = self.limits.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if max_body is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > max_body:
+                await JSONResponse(_too_large(max_body), status_code=413)(scope, receive, send)
+                return
+
+        received = 0
+        exceeded = False
+        replaced = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    exceeded = True
+                    # 请求体在路由解析表单时读取，抛出 HTTPException 才能中止解析（其他异常会被当作表单格式错误）
+                    raise HTTPException(status_code=413, detail=_too_large(max_body)["message"])
+            return message
+
+        async def limited_send(message: Message):
+            nonlocal replaced
+            if message["type"] == "http.response.start" and exceeded:
+                replaced = True
+            if not replaced:
+                await send(message)
+
+        await self.app(scope, limited_receive, limited_send)
+        if replaced:
+            await JSONResponse(_too_large(max_body), status_code=413)(scope, receive, send)
@@ -0,0 +1,77 @@
+"""
+应用启动
+导入 app.main 只注册路由；lifespan 同步建表（只执行 CREATE IF NOT EXISTS 和补齐缺少的列，耗时很短），
+数据库路由处理第一个请求时表结构已就绪。加载模拟数据等耗时步骤放到后台线程执行，
+worker 启动后立即可以接受连接。预热完成前 /system/ready 返回 503；
+此期间到达的请求在首次使用模拟数据时等待加载完成，不会读到不完整的数据。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _load_mock_data():
+    from app.services.mock_data import mock_data_service
+    mock_data_service.get_instance()
+
+
+# 预热步骤，按顺序执行
+WARM_UP_STEPS: list[tuple[str, Callable[[], None]]] = [
+    ("mock_data", _load_mock_data),
+]
+
+
+class StartupState:
+    """后台预热的进度与结果"""
+
+    def __init__(self, steps: list[tuple[str, Callable[[], None]]] = WARM_UP_STEPS):
+        self.steps = steps
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.durations: dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.error is None
+
+    def start(self) -> threading.Thread:
+        """启动后台预热，重复调用只启动一次"""
+        with self._lock:
+            if self._thread is None:
+                self.started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self.run, name="app-warm-up", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def run(self):
+        try:
+            for name, step in self.steps:
+                started = time.perf_counter()
+                step()
+                self.durations[name] = round((time.perf_counter() - started) * 1000, 1)
+            logger.info("app_ready", **{f"{name}_ms": ms for name, ms in self.durations.items()})
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.exception("app_warm_up_failed")
+        finally:
+            self._ready.set()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": {name: self.durations.get(name) for name, _ in self.steps},
+            "error": self.error,
+        }
+
+
+startup_state = StartupState()
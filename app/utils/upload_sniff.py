@@ -0,0 +1,106 @@
+"""
+上传内容预检
+multipart 表单在进入路由之前会被完整接收并缓存，路由里再检查类型时带宽和磁盘已经消耗掉了。
+该中间件对指定路径先只接收请求体的开头，解析出文件字段的文件名、Content-Type 和前 SNIFF_BYTES 字节，
+类型不允许或文件头与声明的类型不符时直接返回错误，不再接收剩余的请求体；
+检查通过后把已接收的部分原样交给路由继续处理。
+文件字段之前的表单字段过大（超过 max_prefix）时不做预检，由路由中的同一检查兜底。
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.file_storage import resolve_upload_type, verify_content, UploadRejectedError, SNIFF_BYTES
+
+_BOUNDARY_RE = re.compile(rb'boundary="?([^";,]+)"?', re.IGNORECASE)
+_FILENAME_RE = re.compile(r'filename="([^"]*)"', re.IGNORECASE)
+
+
+def _header(scope: Scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def find_file_head(body: bytes, boundary: bytes, complete: bool) -> Optional[Tuple[str, str, bytes]]:
+    """在请求体开头中查找第一个文件字段，返回 (文件名, Content-Type, 文件开头)；
+    数据还不够判断时返回 None，请求体已完整但没有文件字段时返回空文件名"""
+    delimiter = b"--" + boundary
+    pos = body.find(delimiter)
+    while pos != -1:
+        part_start = pos + len(delimiter)
+        if body[part_start:part_start + 2] == b"--":
+            break
+        header_end = body.find(b"\r\n\r\n", part_start)
+        if header_end == -1:
+            return None
+        headers = {}
+        for line in body[part_start:header_end].decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        data_start = header_end + 4
+        next_pos = body.find(b"\r\n" + delimiter, data_start)
+        filename = _FILENAME_RE.search(headers.get("content-disposition", ""))
+        if filename:
+            data_end = next_pos if next_pos != -1 else len(body)
+            if data_end - data_start < SNIFF_BYTES and next_pos == -1 and not complete:
+                return None
+            return filename.group(1), headers.get("content-type", ""), body[data_start:min(data_end, data_start + SNIFF_BYTES)]
+        if next_pos == -1:
+            return None
+        pos = next_pos + 2
+    return ("", "", b"") if complete else None
+
+
+class UploadSniffMiddleware:
+    """按路径预检 multipart 上传的文件类型和文件头"""
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_prefix: int = 64 * 1024):
+        self.app = app
+        self.paths = set(paths)
+        self.max_prefix = max_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("path") not in self.paths or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+        content_type = _header(scope, b"content-type") or b""
+        boundary = _BOUNDARY_RE.search(content_type)
+        if not content_type.lower().startswith(b"multipart/form-data") or not boundary:
+            await self.app(scope, receive, send)
+            return
+
+        received: List[Message] = []
+        body = b""
+        complete = False
+        head = None
+        while head is None and len(body) <= self.max_prefix:
+            message = await receive()
+            received.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            complete = not message.get("more_body", False)
+            head = find_file_head(body, boundary.group(1), complete)
+            if complete:
+                break
+
+        if head is not None and head[0]:
+            filename, file_content_type, data = head
+            try:
+                resolve_upload_type(file_content_type, filename)
+                verify_content(file_content_type, data)
+            except UploadRejectedError as e:
+                # 与上传接口的错误格式一致，剩余请求体不再接收
+                await JSONResponse({"code": 400, "message": str(e), "data": None})(scope, receive, send)
+                return
+
+        async def replay() -> Message:
+            if received:
+                return received.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
@@ -5,59 +5,23 @@
 
 import os
 import sys
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.config import settings
-from app.utils.db_config import Base, engine
-from app.models.user import User
+from app.utils.db_config import engine
+from app.utils.db_init import upgrade_schema
 
 def migrate_user_table():
-    """迁移用户表，添加新字段"""
+    """迁移用户表，添加新字段和登录查找用的唯一索引（应用启动时 init_db 也会执行同样的迁移）"""
     print("开始迁移用户表...")
     
     try:
-        # 检查表是否存在
-        with engine.connect() as conn:
-            # 获取现有列信息
-            result = conn.execute(text("PRAGMA table_info(users)"))
-            existing_columns = {row[1] for row in result.fetchall()}
-            print(f"现有列: {existing_columns}")
-            
-            # 需要添加的新列
-            new_columns = {
-                'nick_name': 'VARCHAR',
-                'avatar_url': 'VARCHAR',
-                'gender': 'INTEGER',
-                'age': 'INTEGER',
-                'occupation': 'VARCHAR',
-                'location': 'JSON',
-                'bio': 'TEXT',
-                'match_type': 'VARCHAR',
-                'user_role': 'VARCHAR',
-                'interests': 'JSON',
-                'preferences': 'JSON',
-                'phone': 'VARCHAR',
-                'education': 'VARCHAR',
-                'join_date': 'INTEGER'
-            }
-            
-            # 添加缺失的列
-            for column_name, column_type in new_columns.items():
-                if column_name not in existing_columns:
-                    try:
-                        sql = f"ALTER TABLE users ADD COLUMN {column_name} {column_type}"
-                        conn.execute(text(sql))
-                        print(f"添加列: {column_name}")
-                    except Exception as e:
-                        print(f"添加列 {column_name} 时出错: {e}")
-            
-            conn.commit()
-            print("用户表迁移完成！")
-            
+        changes = upgrade_schema(engine)
+        for change in changes:
+            print(f"添加: {change}")
+        print("用户表迁移完成！")
     except Exception as e:
         print(f"迁移过程中出错: {e}")
         return False
@@ -78,7 +42,7 @@ def verify_migration():
             required_columns = [
                 'nick_name', 'avatar_url', 'gender', 'age', 'occupation',
                 'location', 'bio', 'match_type', 'user_role', 'interests',
-                'preferences', 'phone', 'education', 'join_date'
+                'preferences', 'phone', 'education', 'join_date', 'openid'
             ]
             
             missing_columns = [col for col in required_columns if col not in columns]
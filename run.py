@@ -18,7 +18,9 @@ def main():
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # 聊天 WebSocket 多为空闲长连接，关闭逐条压缩可使每个连接少占约 90KB 内存
+        ws_per_message_deflate=False
     )
 
 if __name__ == "__main__":
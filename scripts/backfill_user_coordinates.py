@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+用户坐标回填脚本
+为 users 表补充 latitude/longitude 列，并将已有的地区文本（Region 枚举城市）
+离线转换为市中心坐标；同时回填模拟数据文件 test_user_data.json
+
+用法: python scripts/backfill_user_coordinates.py [--dry-run] [--overwrite]
+"""
+
+import sys
+import os
+import argparse
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.db_config import engine, SessionLocal
+from app.utils.db_init import upgrade_schema
+from app.models.user import User
+from app.services.user_journal import UserJournal
+from app.utils.geo import normalize_location
+
+USER_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_user_data.json")
+
+
+def ensure_columns():
+    """添加缺失的坐标列"""
+    for change in upgrade_schema(engine):
+        print(f"添加: {change}")
+
+
+def backfill_database(dry_run=False, overwrite=False):
+    """回填数据库用户坐标"""
+    db = SessionLocal()
+    updated = unresolved = 0
+    try:
+        for user in db.query(User).all():
+            if user.latitude is not None and not overwrite:
+                continue
+            coordinate = normalize_location(user.location)
+            if coordinate is None:
+                unresolved += 1
+                continue
+            user.latitude, user.longitude = coordinate
+            updated += 1
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    finally:
+        db.close()
+    print(f"数据库: 回填 {updated} 个用户，{unresolved} 个用户的位置无法识别")
+
+
+def backfill_user_data_file(dry_run=False, overwrite=False):
+    """回填模拟数据文件中的用户坐标"""
+    if not os.path.exists(USER_DATA_FILE):
+        return
+    # 快照加上变更日志才是完整数据，写回时合并为新快照
+    journal = UserJournal(USER_DATA_FILE)
+    users = journal.load()
+
+    updated = 0
+    for user in users.values():
+        if user.get("latitude") is not None and not overwrite:
+            continue
+        coordinate = normalize_location(user.get("location"))
+        if coordinate is not None:
+            user["latitude"], user["longitude"] = coordinate
+            updated += 1
+
+    if updated and not dry_run:
+        journal.write_snapshot(users)
+    print(f"模拟数据: 回填 {updated} 个用户")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回填用户坐标")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写入")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已有坐标")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        ensure_columns()
+    backfill_database(args.dry_run, args.overwrite)
+    backfill_user_data_file(args.dry_run, args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
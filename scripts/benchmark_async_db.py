@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+异步数据库访问压测
+对比 async def 路由中直接使用同步会话（阻塞事件循环）与使用异步会话时，
+并发请求下订单查询和健康检查请求的延迟分布
+
+用法: python scripts/benchmark_async_db.py [并发数] [请求数]
+"""
+
+import sys
+import os
+import asyncio
+import random
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 使用临时数据库，避免影响开发数据
+_tmp_dir = tempfile.mkdtemp(prefix="vmatch_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy.orm import Session
+from app.models.order import Base as OrderBase, MembershipOrder, OrderStatus
+from app.routers import membership_orders
+from app.utils.db_config import engine, get_db, SessionLocal
+
+USERS = 200
+ORDERS = 20_000
+
+
+def seed():
+    """生成测试订单"""
+    OrderBase.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1)
+    db = SessionLocal()
+    db.bulk_save_objects([
+        MembershipOrder(
+            id=f"order_{i:07d}",
+            plan_name=rng.choice(["月度会员", "季度会员", "年度会员"]),
+            amount=rng.choice([29.9, 79.9, 299.9]),
+            date=start + timedelta(minutes=i),
+            status=rng.choice(list(OrderStatus)),
+            user_id=f"user_{rng.randrange(USERS):04d}",
+            created_at=start + timedelta(minutes=i),
+            updated_at=start + timedelta(minutes=i),
+        )
+        for i in range(ORDERS)
+    ])
+    db.commit()
+    db.close()
+
+
+def build_app():
+    app = FastAPI()
+    app.include_router(membership_orders.router, prefix="/async")
+
+    @app.get("/sync/memberships/orders")
+    async def legacy_orders(
+        user_id: str = Query(...),
+        page: int = Query(1),
+        page_size: int = Query(10),
+        db: Session = Depends(get_db)
+    ):
+        """原有实现：在 async def 中直接调用同步会话"""
+        query = db.query(MembershipOrder).filter(MembershipOrder.user_id == user_id)
+        query = query.order_by(MembershipOrder.created_at.desc())
+        orders = query.offset((page - 1) * page_size).limit(page_size).all()
+        total = query.count()
+        return {"code": 200, "data": {"orders": [o.to_dict() for o in orders], "total": total}}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+def start_server(app):
+    """在后台线程中启动 uvicorn，压测客户端运行在独立的事件循环中"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(base_url, prefix, concurrency, total):
+    timings = {"orders": [], "ping": []}
+    rng = random.Random(11)
+    plan = [("ping" if rng.random() < 0.2 else "orders", f"user_{rng.randrange(USERS):04d}") for _ in range(total)]
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            while not queue.empty():
+                kind, user_id = queue.get_nowait()
+                url = "/ping" if kind == "ping" else f"{prefix}/memberships/orders"
+                start = time.perf_counter()
+                response = await client.get(url, params={"user_id": user_id})
+                timings[kind].append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    for kind in ("orders", "ping"):
+        values = timings[kind]
+        print(
+            f"{prefix:>6} {kind:>6} | 请求 {len(values):>5} | p50 {percentile(values, 0.5):7.2f} ms | "
+            f"p99 {percentile(values, 0.99):7.2f} ms"
+        )
+    print(f"{prefix:>6} 吞吐 {total / elapsed:,.0f} req/s")
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    seed()
+    server, base_url = start_server(build_app())
+    print(f"订单数: {ORDERS:,}，并发: {concurrency}，请求数: {total}（20% 为 /ping）")
+    for prefix in ("/sync", "/async"):
+        asyncio.run(run(base_url, prefix, concurrency, total))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
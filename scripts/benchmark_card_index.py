@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+匹配卡片分页基准测试
+对比原有的全量扫描过滤与 CardIndex 倒排索引在不同卡片规模下的单页耗时
+
+用法: python scripts/benchmark_card_index.py [规模1 规模2 ...]
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.card_index import CardIndex, ANY_ROLE
+
+MATCH_TYPES = ["housing", "dating", "activity"]
+USER_ROLES = ["seeker", "provider"]
+PAGE_SIZE = 10
+
+
+def build_cards(count):
+    """生成测试卡片"""
+    cards = {}
+    for i in range(count):
+        card_id = f"card_{i:07d}"
+        cards[card_id] = {
+            "id": card_id,
+            "name": f"卡片{i}",
+            "matchType": MATCH_TYPES[i % len(MATCH_TYPES)],
+            "userRole": USER_ROLES[(i // len(MATCH_TYPES)) % len(USER_ROLES)],
+        }
+    return cards
+
+
+def scan_page(cards, match_type, user_role, page, page_size):
+    """原有实现：全量过滤后切片"""
+    if match_type == "housing":
+        filtered = [c for c in cards.values() if c.get("matchType") == match_type]
+    else:
+        filtered = [
+            c for c in cards.values()
+            if c.get("matchType") == match_type and c.get("userRole") == user_role
+        ]
+    start = (page - 1) * page_size
+    return len(filtered), filtered[start:start + page_size]
+
+
+def index_page(cards, index, match_type, user_role, page, page_size):
+    """索引实现：直接读取倒排列表中的目标页"""
+    role_key = ANY_ROLE if match_type == "housing" else user_role
+    start = (page - 1) * page_size
+    ids = index.page(match_type, role_key, start, page_size)
+    return index.count(match_type, role_key), [cards[card_id] for card_id in ids]
+
+
+def time_per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(count):
+    cards = build_cards(count)
+
+    start = time.perf_counter()
+    index = CardIndex()
+    for card in cards.values():
+        index.add(card)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # 校验两种实现结果一致
+    for match_type, user_role, page in [("dating", "seeker", 1), ("housing", "seeker", 3)]:
+        assert scan_page(cards, match_type, user_role, page, PAGE_SIZE) == \
+            index_page(cards, index, match_type, user_role, page, PAGE_SIZE)
+
+    scan_repeat = max(1, 2_000_000 // count)
+    scan_ms = time_per_call(lambda: scan_page(cards, "dating", "seeker", 5, PAGE_SIZE), scan_repeat) * 1000
+    index_ms = time_per_call(lambda: index_page(cards, index, "dating", "seeker", 5, PAGE_SIZE), 10000) * 1000
+
+    print(f"{count:>10,} | {build_ms:>10.1f} | {scan_ms:>12.3f} | {index_ms:>12.4f} | {scan_ms / index_ms:>9.0f}x")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'卡片数':>10} | {'建索引(ms)':>10} | {'扫描/页(ms)':>12} | {'索引/页(ms)':>12} | {'加速':>9}")
+    print("-" * 66)
+    for count in counts:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
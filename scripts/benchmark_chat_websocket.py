@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+聊天 WebSocket 空闲连接压测
+启动单个 uvicorn worker（临时数据库与数据文件，不影响开发数据），建立指定数量的空闲 WebSocket 连接并保持，
+测量：
+- 建立全部连接的耗时
+- worker 常驻内存的增长（平均每个连接占用）
+- 保持期间普通 HTTP 请求的延迟（空闲连接不应拖慢事件循环）
+- 一条消息推送到全部连接的耗时
+
+需要安装 websockets（pip install websockets），uvicorn 也依赖它处理 WebSocket。
+
+用法: python scripts/benchmark_chat_websocket.py [连接数] [保持秒数]
+"""
+
+import sys
+import os
+import asyncio
+import json
+import resource
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import httpx
+    import websockets
+except ImportError as e:
+    print(f"缺少依赖: {e.name}，请先 pip install websockets httpx")
+    sys.exit(1)
+
+# 接收推送的用户与发送消息的用户（示例数据中 match_001 的双方）
+LISTENER = "card_001"
+SENDER = "user_001"
+CONNECT_CONCURRENCY = 500
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def start_server(tmp_dir: str, port: int) -> subprocess.Popen:
+    shutil.copy(os.path.join(PROJECT_ROOT, "test_user_data.json"), os.path.join(tmp_dir, "users.json"))
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'app.db')}",
+        "CHAT_DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'chat.db')}",
+        "MOCK_USER_DATA_FILE": os.path.join(tmp_dir, "users.json"),
+        "UPLOAD_DIR": os.path.join(tmp_dir, "uploads"),
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--ws", "websockets",
+         "--ws-per-message-deflate", "false", "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        preexec_fn=raise_fd_limit,
+    )
+
+
+async def wait_ready(base_url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                if (await client.get(f"{base_url}/api/v1/system/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("服务未能启动")
+
+
+async def http_latency_ms(client: httpx.AsyncClient, base_url: str, samples: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(samples):
+        await client.get(f"{base_url}/api/v1/system/health")
+    return (time.perf_counter() - started) / samples * 1000
+
+
+async def run(connections: int, hold: float):
+    raise_fd_limit()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    ws_url = f"ws://127.0.0.1:{port}/api/v1/chat/ws?token={LISTENER}"
+    tmp_dir = tempfile.mkdtemp(prefix="chat-ws-bench-")
+    server = start_server(tmp_dir, port)
+    sockets = []
+    try:
+        await wait_ready(base_url)
+        async with httpx.AsyncClient(headers={"Authorization": f"Bearer {SENDER}"}) as client:
+            baseline_latency = await http_latency_ms(client, base_url)
+            baseline_rss = rss_kb(server.pid)
+
+            semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+            async def open_one():
+                async with semaphore:
+                    sockets.append(await websockets.connect(ws_url, ping_interval=None, max_queue=4))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(open_one() for _ in range(connections)))
+            connect_seconds = time.perf_counter() - started
+            stats = (await client.get(f"{base_url}/api/v1/system/chat-connections")).json()["data"]
+
+            await asyncio.sleep(hold)
+            held_rss = rss_kb(server.pid)
+            held_latency = await http_latency_ms(client, base_url)
+
+            started = time.perf_counter()
+            await client.post(
+                f"{base_url}/api/v1/chat/send",
+                json={"matchId": "match_001", "content": "benchmark", "type": "text"},
+            )
+            await asyncio.gather(*(ws.recv() for ws in sockets))
+            fan_out_ms = (time.perf_counter() - started) * 1000
+
+        print(json.dumps({
+            "connections": connections,
+            "serverConnections": stats["connections"],
+            "connectSeconds": round(connect_seconds, 2),
+            "rssBaselineMb": round(baseline_rss / 1024, 1),
+            "rssHeldMb": round(held_rss / 1024, 1),
+            "rssPerConnectionKb": round((held_rss - baseline_rss) / connections, 1),
+            "httpLatencyBaselineMs": round(baseline_latency, 2),
+            "httpLatencyHeldMs": round(held_latency, 2),
+            "fanOutMs": round(fan_out_ms, 1),
+        }, ensure_ascii=False, indent=2))
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    hold = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(run(connections, hold))
+
+
+if __name__ == "__main__":
+    main()
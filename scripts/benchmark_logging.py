@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+请求路径日志开销基准测试
+在 10 万用户下对比原先每次调用都打印全部用户ID的 DEBUG 输出与结构化日志（INFO 级别、DEBUG 级别采样）的单次调用耗时
+
+用法: python scripts/benchmark_logging.py [用户数] [调用次数]
+"""
+
+import sys
+import os
+import contextlib
+import io
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.auth import AuthService
+from app.services.mock_data import mock_data_service
+from app.utils.logger import configure_logging
+
+
+def legacy_get_user_by_id(user_id):
+    """原有实现：每次查找都打印全部用户ID"""
+    print(f"DEBUG: Looking for user_id: {user_id}")
+    print(f"DEBUG: Available users: {list(mock_data_service.users.keys())}")
+    result = mock_data_service.users.get(user_id)
+    print(f"DEBUG: Found user: {result is not None}")
+    return result
+
+
+def legacy_get_user_from_token(token):
+    """原有实现：固定测试token逐个遍历用户并打印全部用户ID"""
+    print(f"DEBUG: get_user_from_token called with token: {token}")
+    print(f"DEBUG: Searching for existing test_user_001 in users: {list(mock_data_service.users.keys())}")
+    for user in mock_data_service.users.values():
+        if user.get("id") == "test_user_001":
+            print(f"DEBUG: Found existing test_user_001")
+            return user
+    return None
+
+
+def measure(func, arg, calls):
+    """返回单次调用平均耗时（微秒），输出写入内存避免终端速度影响结果"""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(arg)
+        elapsed = time.perf_counter() - start
+    return elapsed / calls * 1e6
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    for i in range(user_count):
+        user_id = f"bench_user_{i:06d}"
+        mock_data_service.users[user_id] = {"id": user_id, "nickName": f"用户{i}"}
+    AuthService.get_user_from_token("test_token_001")
+    target = f"bench_user_{user_count // 2:06d}"
+    print(f"用户数: {user_count:,}，每项调用 {calls} 次")
+
+    cases = [
+        ("get_user_by_id", legacy_get_user_by_id, mock_data_service.get_user_by_id, target),
+        ("get_user_from_token", legacy_get_user_from_token, AuthService.get_user_from_token, "test_token_001"),
+    ]
+    for name, legacy, current, arg in cases:
+        print(f"{name}")
+        print(f"  原 DEBUG print       {measure(legacy, arg, calls):10.2f} us/次")
+        for level in ("INFO", "DEBUG"):
+            configure_logging(level=level, stream=io.StringIO())
+            print(f"  结构化日志 {level:<5}     {measure(current, arg, calls * 100):10.2f} us/次")
+
+
+if __name__ == "__main__":
+    main()
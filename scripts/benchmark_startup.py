@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+应用冷启动基准测试
+生成大规模模拟数据文件后，在独立进程中分别测量：
+- 导入 app.main 并建表的耗时（lifespan 同步部分完成，worker 可以开始接受连接的时间）
+- lifespan 启动后台预热到就绪的耗时
+- 导入时同步加载全部数据（原有方式）的总耗时
+
+用法: python scripts/benchmark_startup.py [用户数] [房源卡片数] [重复次数]
+"""
+
+import sys
+import os
+import json
+import random
+import subprocess
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = ["北京", "上海", "广州", "深圳", "杭州", "成都"]
+
+# 子进程中执行的测量代码
+PROBE = """
+import time, json
+started = time.perf_counter()
+import app.main
+from app.utils.db_init import init_db
+init_db()
+imported = time.perf_counter()
+from app.utils.startup import startup_state
+startup_state.start()
+startup_state.wait()
+ready = time.perf_counter()
+print(json.dumps({"import": imported - started, "warm_up": ready - imported, "ready": startup_state.ready}))
+"""
+
+
+def build_fixtures(tmp_dir, user_count, card_count, seed=42):
+    rng = random.Random(seed)
+    users = {
+        f"user_{i:07d}": {
+            "id": f"user_{i:07d}",
+            "nickName": f"用户{i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice([1, 2]),
+            "location": rng.choice(CITIES),
+            "matchType": rng.choice(["dating", "housing", "activity"]),
+            "userRole": rng.choice(["seeker", "provider"]),
+            "interests": rng.sample(["编程", "旅行", "摄影", "音乐", "电影", "健身"], 3),
+            "preferences": {"ageRange": [20, 40], "distance": 10},
+            "phone": f"139{i:08d}",
+        }
+        for i in range(user_count)
+    }
+    housing = {
+        "testUsers": [],
+        "housingCards": [
+            {
+                "id": f"house_{i:07d}",
+                "matchType": "housing",
+                "userRole": "provider",
+                "name": f"房源{i}",
+                "houseInfo": {
+                    "location": rng.choice(CITIES),
+                    "price": rng.randint(1500, 12000),
+                    "videoUrl": "https://example.com/video.mp4",
+                },
+            }
+            for i in range(card_count)
+        ],
+        "matches": [],
+    }
+    paths = {
+        "MOCK_USER_DATA_FILE": os.path.join(tmp_dir, "users.json"),
+        "MOCK_FIXED_HOUSING_FILE": os.path.join(tmp_dir, "housing.json"),
+    }
+    with open(paths["MOCK_USER_DATA_FILE"], "w", encoding="utf-8") as f:
+        json.dump(users, f, ensure_ascii=False, indent=2)
+    with open(paths["MOCK_FIXED_HOUSING_FILE"], "w", encoding="utf-8") as f:
+        json.dump(housing, f, ensure_ascii=False, indent=2)
+    return paths
+
+
+def probe(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    card_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    tmp_dir = tempfile.mkdtemp(prefix="vmatch_startup_")
+    env = dict(os.environ)
+    env.update(build_fixtures(tmp_dir, user_count, card_count))
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'startup.db')}",
+        "CHAT_DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, 'chat.db')}",
+        "UPLOAD_DIR": os.path.join(tmp_dir, "uploads"),
+        "LOG_LEVEL": "WARNING",
+    })
+
+    print(f"用户数: {user_count:,}，房源卡片数: {card_count:,}，重复 {repeat} 次取中位数")
+    runs = [probe(env) for _ in range(repeat)]
+    assert all(run["ready"] for run in runs)
+    median = lambda key: sorted(run[key] for run in runs)[len(runs) // 2]
+    imported, warm_up = median("import"), median("warm_up")
+    print(f"导入 app.main 并建表（可接受连接）  {imported * 1000:9.1f} ms")
+    print(f"后台预热至就绪                      {warm_up * 1000:9.1f} ms")
+    print(f"原方式（导入即加载全部数据）        {(imported + warm_up) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
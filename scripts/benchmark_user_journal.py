@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+用户资料更新持久化基准测试
+在 10 万用户下顺序执行 1 万次 update_profile，对比原先每次整体重写 JSON 文件与追加日志的耗时，
+并验证重启后回放日志得到的数据与内存一致
+
+用法: python scripts/benchmark_user_journal.py [用户数] [更新次数]
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.mock_data import MockDataService
+
+# 原有实现整体重写耗时过长，只采样这么多次后按比例估算
+LEGACY_SAMPLES = 5
+
+
+def build_users(count, seed=42):
+    rng = random.Random(seed)
+    return {
+        f"bench_user_{i:06d}": {
+            "id": f"bench_user_{i:06d}",
+            "nickName": f"用户{i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice([1, 2]),
+            "location": rng.choice(["北京", "上海", "广州", "深圳", "杭州"]),
+            "bio": "这是一段个人简介" * 4,
+            "interests": rng.sample(["编程", "旅行", "摄影", "音乐", "电影", "健身"], 3),
+            "preferences": {"ageRange": [20, 40], "distance": 10},
+        }
+        for i in range(count)
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    tmp_dir = tempfile.mkdtemp(prefix="vmatch_journal_")
+    data_file = os.path.join(tmp_dir, "users.json")
+    users = build_users(user_count)
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(users, f, ensure_ascii=False, indent=2)
+
+    started = time.perf_counter()
+    service = MockDataService(user_data_file=data_file)
+    print(f"用户数: {user_count:,}，更新次数: {updates:,}，启动加载 {time.perf_counter() - started:.2f} s")
+
+    # 原有实现：每次更新整体重写文件
+    legacy = []
+    for _ in range(LEGACY_SAMPLES):
+        start = time.perf_counter()
+        with open(os.path.join(tmp_dir, "legacy.json"), "w", encoding="utf-8") as f:
+            json.dump(service.users, f, ensure_ascii=False, indent=2)
+        legacy.append(time.perf_counter() - start)
+    legacy_each = sum(legacy) / len(legacy)
+    print(f"整体重写  单次 {legacy_each * 1000:9.2f} ms，{updates:,} 次估算 {legacy_each * updates:9.1f} s")
+
+    rng = random.Random(7)
+    ids = list(users)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(updates):
+        start = time.perf_counter()
+        service.update_profile(rng.choice(ids), {"bio": f"更新 {i}", "age": rng.randint(18, 60)})
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    print(
+        f"追加日志  单次 p50 {percentile(latencies, 0.5) * 1000:.3f} ms / p99 {percentile(latencies, 0.99) * 1000:.3f} ms，"
+        f"{updates:,} 次共 {elapsed:.2f} s"
+    )
+
+    service.journal.close()
+    reloaded = MockDataService(user_data_file=data_file)
+    consistent = all(reloaded.users.get(user_id) == service.users[user_id] for user_id in ids)
+    print(f"重启回放  {'一致' if consistent else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+上传文件存储清理脚本
+删除没有任何用户 URL 引用的 blob，以及进程中断遗留在 staging 目录中的临时文件，
+同时清理过期的断点续传会话。适合放在定时任务中执行。
+
+用法: python scripts/collect_upload_garbage.py [--staging-max-age 秒]
+"""
+
+import sys
+import os
+import argparse
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.blob_store import blob_store
+from app.services.resumable_upload import resumable_upload_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="清理上传文件存储")
+    parser.add_argument("--staging-max-age", type=float, default=3600, help="临时文件保留时间（秒）")
+    args = parser.parse_args()
+
+    removed = blob_store.collect_garbage(staging_max_age=args.staging_max_age)
+    purged = resumable_upload_store.purge_expired()
+    print(f"删除未引用的 blob 及临时文件 {removed} 个，过期上传会话 {purged} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+存储配额账本重建脚本
+扫描一次 UPLOAD_DIR，按用户目录统计文件数和字节数（不含缩略图变体和隐藏的临时文件），
+整体替换配额账本。用于首次启用配额，或账本与磁盘不一致时校正。
+
+用法: python scripts/rebuild_storage_ledger.py
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.image_variants import is_variant
+from app.services.storage_quota import storage_quota
+
+def scan_usage(upload_dir: str) -> dict:
+    usage = {}
+    if not os.path.isdir(upload_dir):
+        return usage
+    for user_entry in os.scandir(upload_dir):
+        if not user_entry.is_dir() or user_entry.name.startswith("."):
+            continue
+        total = files = 0
+        for entry in os.scandir(user_entry.path):
+            if not entry.is_file() or entry.name.startswith(".") or is_variant(entry.name):
+                continue
+            total += entry.stat().st_size
+            files += 1
+        if files:
+            usage[user_entry.name] = {"bytes": total, "files": files}
+    return usage
+
+
+def main():
+    usage = scan_usage(settings.UPLOAD_DIR)
+    storage_quota.rebuild(usage)
+    print(f"已重建 {len(usage)} 个用户的存储账本，共 {sum(u['bytes'] for u in usage.values())} 字节")
+
+
+if __name__ == "__main__":
+    main()
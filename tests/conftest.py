@@ -1,6 +1,39 @@
+import os
+import shutil
+import tempfile
 import pytest
+
+# 测试产生的数据（数据库、聊天记录、用户数据变更日志、存储配额账本、上传文件）写入临时目录，
+# 不修改版本库中的文件，也不在仓库根目录留下日志
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_test_data_dir = tempfile.mkdtemp(prefix="vmatch_test_")
+_user_data_file = os.path.join(_test_data_dir, "test_user_data.json")
+shutil.copyfile(os.path.join(_project_root, "test_user_data.json"), _user_data_file)
+_database_file = os.path.join(_test_data_dir, "vmatch_dev.db")
+shutil.copyfile(os.path.join(_project_root, "vmatch_dev.db"), _database_file)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_database_file}")
+os.environ.setdefault("CHAT_DATABASE_URL", f"sqlite:///{os.path.join(_test_data_dir, 'chat.db')}")
+os.environ.setdefault("MOCK_USER_DATA_FILE", _user_data_file)
+os.environ.setdefault("STORAGE_LEDGER_FILE", os.path.join(_test_data_dir, "storage_usage.json"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_test_data_dir, "uploads"))
+os.environ.setdefault("UPLOAD_BLOB_DIR", os.path.join(_test_data_dir, "upload_blobs"))
+os.environ.setdefault("RESUMABLE_UPLOAD_DIR", os.path.join(_test_data_dir, "upload_sessions"))
+
 from fastapi.testclient import TestClient
 from app.main import app
+from app.utils.db_init import init_db
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_data_dir():
+    """测试结束后删除临时数据目录"""
+    yield _test_data_dir
+    shutil.rmtree(_test_data_dir, ignore_errors=True)
+
+@pytest.fixture(scope="session", autouse=True)
+def database(test_data_dir):
+    """建表并补齐旧数据库缺少的列和索引（与应用启动时相同）"""
+    init_db()
 
 @pytest.fixture
 def client():
@@ -11,4 +44,4 @@ def client():
 def auth_headers():
     """创建认证头"""
     # 测试模式下，使用测试用户ID作为token
-    return {"Authorization": "Bearer user_001"}
\ No newline at end of file
+    return {"Authorization": "Bearer user_001"}
@@ -0,0 +1,110 @@
+"""
+异步数据库访问测试
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models.order import Base as OrderBase, MembershipOrder, OrderStatus
+from app.services import async_db_service
+from app.utils import db_writer
+from app.utils.db_config import async_database_url, create_async_db_engine
+
+
+class TestAsyncDatabaseUrl:
+    """异步驱动地址转换测试"""
+
+    def test_driver_mapping(self):
+        assert async_database_url("sqlite:///./vmatch.db") == "sqlite+aiosqlite:///./vmatch.db"
+        assert async_database_url("postgresql://u:p@db/vmatch") == "postgresql+asyncpg://u:p@db/vmatch"
+        assert async_database_url("mysql://u:p@db/vmatch") == "mysql+aiomysql://u:p@db/vmatch"
+
+
+class TestAsyncDbService:
+    """异步订单查询测试"""
+
+    def test_membership_orders(self, tmp_path):
+        async def scenario():
+            engine = create_async_db_engine(f"sqlite:///{tmp_path / 'orders.db'}")
+            async with engine.begin() as conn:
+                await conn.run_sync(OrderBase.metadata.create_all)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            start = datetime(2024, 1, 1)
+            async with Session() as db:
+                db.add_all([
+                    MembershipOrder(
+                        id=f"order_{i}", plan_name="月度会员", amount=29.9, date=start,
+                        status=OrderStatus.PAID if i % 2 else OrderStatus.PENDING,
+                        user_id="user_a" if i < 6 else "user_b",
+                        created_at=start + timedelta(days=i),
+                    )
+                    for i in range(8)
+                ])
+                await db.commit()
+
+                orders, total = await async_db_service.get_membership_orders(db, "user_a", skip=0, limit=4)
+                assert total == 6
+                assert [o.id for o in orders] == ["order_5", "order_4", "order_3", "order_2"]
+
+                paid, paid_total = await async_db_service.get_membership_orders(db, "user_a", status=OrderStatus.PAID)
+                assert paid_total == 3 and all(o.status == OrderStatus.PAID for o in paid)
+
+                assert await async_db_service.get_membership_order(db, "order_7", "user_a") is None
+                assert (await async_db_service.get_membership_order(db, "order_7", "user_b")).id == "order_7"
+            await engine.dispose()
+
+        asyncio.run(scenario())
+
+
+class TestAsyncSerializedWrite:
+    """异步写锁测试"""
+
+    def test_serialized_and_reentrant(self, monkeypatch):
+        monkeypatch.setattr(db_writer, "WRITE_QUEUE_ENABLED", True)
+        active, peak = 0, 0
+
+        @db_writer.async_serialized_write
+        async def inner():
+            return "nested"
+
+        @db_writer.async_serialized_write
+        async def write():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            result = await inner()
+            active -= 1
+            return result
+
+        async def scenario():
+            return await asyncio.gather(*(write() for _ in range(5)))
+
+        assert asyncio.run(scenario()) == ["nested"] * 5
+        assert peak == 1
+
+    def test_shares_queue_with_sync_writes(self, monkeypatch):
+        monkeypatch.setattr(db_writer, "WRITE_QUEUE_ENABLED", True)
+        writer = db_writer.SerialWriter(name="test-writer")
+        monkeypatch.setattr(db_writer, "db_writer", writer)
+        events = []
+
+        @db_writer.async_serialized_write
+        async def async_write():
+            events.append("async_start")
+            # 异步写执行期间提交同步写，同步写要等异步写完成
+            sync_thread = threading.Thread(target=writer.submit, args=(events.append, "sync"))
+            sync_thread.start()
+            await asyncio.sleep(0.05)
+            events.append("async_end")
+            return sync_thread
+
+        async def scenario():
+            return await async_write()
+
+        sync_thread = asyncio.run(scenario())
+        sync_thread.join(5)
+        writer.shutdown()
+        assert events == ["async_start", "async_end", "sync"]
+        assert writer.pending == 0
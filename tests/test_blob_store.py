@@ -0,0 +1,113 @@
+"""
+内容寻址上传存储测试
+"""
+import hashlib
+import os
+import time
+import pytest
+from app.config import settings
+from app.services.blob_store import BlobStore
+
+
+def _stage(store, content):
+    path = store.staging_path()
+    with open(path, "wb") as f:
+        f.write(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+class TestBlobStore:
+    """BlobStore 测试类"""
+
+    def test_duplicate_content_shares_blob(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        content = os.urandom(4096)
+        names = []
+        for user in ("user_001", "user_002"):
+            temp, digest = _stage(store, content)
+            name, created = store.commit(temp, digest, str(tmp_path / user), ".jpg")
+            names.append(name)
+            assert created
+            assert not os.path.exists(temp)
+        assert names[0] == names[1] == f"{digest}.jpg"
+        blob = store.blob_path(digest)
+        assert os.stat(blob).st_nlink == 3
+        for user in ("user_001", "user_002"):
+            assert os.path.samefile(tmp_path / user / names[0], blob)
+
+    def test_same_user_reupload_is_one_reference(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        content = os.urandom(1024)
+        created = []
+        for _ in range(3):
+            temp, digest = _stage(store, content)
+            created.append(store.commit(temp, digest, str(tmp_path / "user_001"), ".png")[1])
+        assert created == [True, False, False]
+        assert os.stat(store.blob_path(digest)).st_nlink == 2
+
+    def test_release_removes_blob_with_last_reference(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        content = os.urandom(1024)
+        paths = []
+        for user in ("user_001", "user_002"):
+            temp, digest = _stage(store, content)
+            paths.append(os.path.join(tmp_path, user, store.commit(temp, digest, str(tmp_path / user), ".mp4")[0]))
+
+        assert store.release(paths[0]) is False
+        assert os.path.exists(store.blob_path(digest))
+        with open(paths[1], "rb") as f:
+            assert f.read() == content
+
+        assert store.release(paths[1]) is True
+        assert not os.path.exists(store.blob_path(digest))
+
+    def test_release_legacy_file(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        legacy = tmp_path / "user_001" / "8c1f3d0e-legacy.jpg"
+        legacy.parent.mkdir()
+        legacy.write_bytes(b"old")
+        assert store.release(str(legacy)) is False
+        assert not legacy.exists()
+
+    def test_collect_garbage(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        temp, digest = _stage(store, b"orphan")
+        os.makedirs(os.path.dirname(store.blob_path(digest)))
+        os.link(temp, store.blob_path(digest))
+        os.remove(temp)
+        stale, _ = _stage(store, b"interrupted")
+        old = time.time() - 7200
+        os.utime(stale, (old, old))
+        fresh, _ = _stage(store, b"in progress")
+
+        assert store.collect_garbage() == 2
+        assert not os.path.exists(store.blob_path(digest))
+        assert not os.path.exists(stale)
+        assert os.path.exists(fresh)
+
+
+class TestDeduplicatedUpload:
+    """上传接口去重测试类"""
+
+    @pytest.fixture
+    def upload_dirs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        return tmp_path
+
+    def _upload(self, client, headers, content):
+        return client.post(
+            "/api/v1/files/upload",
+            files={"file": ("avatar.jpg", content, "image/jpeg")},
+            data={"type": "avatar"},
+            headers=headers,
+        ).json()["data"]["url"]
+
+    def test_users_uploading_same_file_share_storage(self, client, upload_dirs):
+        content = b"\xff\xd8\xff\xe0" + os.urandom(64 * 1024)
+        first = self._upload(client, {"Authorization": "Bearer user_001"}, content)
+        second = self._upload(client, {"Authorization": "Bearer user_002"}, content)
+        assert first != second
+        assert first.rsplit("/", 1)[1] == second.rsplit("/", 1)[1]
+        blob = BlobStore(str(upload_dirs / "blobs")).blob_path(hashlib.sha256(content).hexdigest())
+        assert os.stat(blob).st_nlink == 3
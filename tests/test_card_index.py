@@ -0,0 +1,126 @@
+"""
+匹配卡片索引测试
+"""
+import pytest
+from app.services.card_index import CardIndex, ANY_ROLE, encode_cursor, decode_cursor
+from app.services.mock_data import MockDataService
+
+
+def make_card(card_id, match_type, user_role):
+    return {"id": card_id, "matchType": match_type, "userRole": user_role}
+
+
+class TestCardIndex:
+    """CardIndex 测试类"""
+
+    def setup_method(self):
+        self.index = CardIndex()
+        for i in range(25):
+            role = "seeker" if i % 2 == 0 else "provider"
+            self.index.add(make_card(f"card_{i:03d}", "dating", role))
+        self.index.add(make_card("house_001", "housing", "provider"))
+        self.index.add(make_card("house_002", "housing", "seeker"))
+
+    def test_count_by_type_and_role(self):
+        assert self.index.count("dating", "seeker") == 13
+        assert self.index.count("dating", "provider") == 12
+        assert self.index.count("dating", ANY_ROLE) == 25
+        assert self.index.count("activity", "seeker") == 0
+
+    def test_page_keeps_insertion_order(self):
+        first = self.index.page("dating", "seeker", 0, 5)
+        second = self.index.page("dating", "seeker", 5, 5)
+        assert first == ["card_000", "card_002", "card_004", "card_006", "card_008"]
+        assert second[0] == "card_010"
+        assert self.index.page("dating", "seeker", 100, 5) == []
+
+    def test_any_role_posting(self):
+        assert self.index.page("housing", ANY_ROLE, 0, 10) == ["house_001", "house_002"]
+
+    def test_readd_same_key_keeps_position(self):
+        self.index.add(make_card("card_000", "dating", "seeker"))
+        assert self.index.page("dating", "seeker", 0, 1) == ["card_000"]
+        assert self.index.count("dating", "seeker") == 13
+
+    def test_readd_with_new_role_moves_card(self):
+        self.index.add(make_card("card_000", "dating", "provider"))
+        assert self.index.count("dating", "seeker") == 12
+        assert self.index.page("dating", "provider", 12, 1) == ["card_000"]
+        assert self.index.count("dating", ANY_ROLE) == 25
+
+    def test_remove(self):
+        self.index.remove("house_001")
+        assert self.index.page("housing", ANY_ROLE, 0, 10) == ["house_002"]
+        self.index.remove("not_exists")
+
+
+class TestMockDataServiceCards:
+    """MockDataService.get_cards 与索引集成测试"""
+
+    def test_get_cards_uses_index(self):
+        service = MockDataService()
+        for i in range(15):
+            service.create_card({"id": f"bench_{i:03d}", "matchType": "activity", "userRole": "provider"})
+
+        result = service.get_cards("activity", "provider", page=2, page_size=10)
+        assert result["total"] == 15
+        assert [card["id"] for card in result["list"]] == [f"bench_{i:03d}" for i in range(10, 15)]
+
+    def test_housing_ignores_role(self):
+        service = MockDataService()
+        total = service.get_cards("housing", "seeker", 1, 10)["total"]
+        service.create_card({"id": "house_provider_x", "matchType": "housing", "userRole": "provider"})
+        assert service.get_cards("housing", "seeker", 1, 100)["total"] == total + 1
+
+
+class TestCardCursorPagination:
+    """游标分页测试"""
+
+    def setup_method(self):
+        self.service = MockDataService()
+        for i in range(23):
+            self.service.create_card({"id": f"cursor_{i:03d}", "matchType": "activity", "userRole": "seeker"})
+
+    def test_walk_all_pages(self):
+        seen = []
+        cursor = ""
+        while True:
+            result = self.service.get_cards_by_cursor("activity", "seeker", cursor, 10)
+            seen.extend(card["id"] for card in result["list"])
+            if not result["hasMore"]:
+                assert result["nextCursor"] is None
+                break
+            cursor = result["nextCursor"]
+        assert seen == [f"cursor_{i:03d}" for i in range(23)]
+
+    def test_cursor_stable_after_insert(self):
+        first = self.service.get_cards_by_cursor("activity", "seeker", "", 10)
+        self.service.create_card({"id": "cursor_new", "matchType": "activity", "userRole": "seeker"})
+        second = self.service.get_cards_by_cursor("activity", "seeker", first["nextCursor"], 10)
+        assert second["list"][0]["id"] == "cursor_010"
+
+    def test_page_mode_returns_next_cursor(self):
+        page = self.service.get_cards("activity", "seeker", 1, 10)
+        result = self.service.get_cards_by_cursor("activity", "seeker", page["nextCursor"], 10)
+        assert result["list"][0]["id"] == "cursor_010"
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+        assert decode_cursor(encode_cursor(7)) == 7
+
+
+def test_cards_endpoint_cursor_mode(client):
+    """游标模式端点测试"""
+    response = client.get("/api/v1/matches/cards", params={
+        "matchType": "housing", "userRole": "seeker", "pageSize": 1, "cursor": ""
+    })
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert "total" not in data["pagination"]
+    assert len(data["cards"]) == 1
+
+    response = client.get("/api/v1/matches/cards", params={
+        "matchType": "housing", "userRole": "seeker", "cursor": "bad"
+    })
+    assert response.status_code == 400
@@ -0,0 +1,163 @@
+"""
+会话列表（会话摘要）测试
+"""
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from app.services.chat_read_state import ChatReadTracker, PREVIEW_LENGTH
+from app.services.chat_store import ChatMessageStore, InvalidCursorError
+from app.services.mock_data import MockDataService
+
+
+class FakeClock:
+    """按秒递增的时钟，消息时间互不相同"""
+
+    def __init__(self):
+        self.now = 1_700_000_000
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+    def time_ns(self):
+        return time.time_ns()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+
+
+@pytest.fixture
+def store(engine, monkeypatch):
+    monkeypatch.setattr("app.services.chat_store.time", FakeClock())
+    return ChatMessageStore(engine)
+
+
+@pytest.fixture
+def tracker(engine, store):
+    tracker = ChatReadTracker(engine, flush_interval=60)
+    yield tracker
+    tracker.close()
+
+
+def _send(store, tracker, match_id, sender_id, peer_id, content="hi", msg_type="text"):
+    message = store.send(match_id, sender_id, content, msg_type)
+    tracker.record_message(match_id, message, (sender_id, peer_id))
+    return message
+
+
+class TestConversationSummaries:
+    """会话摘要测试类"""
+
+    def test_recent_first_with_preview_and_unread(self, store, tracker):
+        _send(store, tracker, "match_1", "peer_1", "me", "第一个会话")
+        _send(store, tracker, "match_2", "peer_2", "me", "x" * 200)
+        _send(store, tracker, "match_3", "me", "peer_3", "/uploads/a.jpg", "image")
+        _send(store, tracker, "match_1", "peer_1", "me", "又一条")
+
+        conversations = tracker.conversations("me")["list"]
+        assert [c["matchId"] for c in conversations] == ["match_1", "match_3", "match_2"]
+        assert [c["peerId"] for c in conversations] == ["peer_1", "peer_3", "peer_2"]
+        assert [c["unreadCount"] for c in conversations] == [2, 0, 1]
+        assert conversations[0]["lastMessage"]["preview"] == "又一条"
+        assert conversations[1]["lastMessage"]["preview"] == "[图片]"
+        assert conversations[2]["lastMessage"]["preview"] == "x" * PREVIEW_LENGTH
+
+        tracker.mark_read("match_1", "me")
+        assert tracker.conversations("me")["list"][0]["unreadCount"] == 0
+        # 对方的会话列表
+        assert tracker.conversations("peer_1")["list"][0]["lastMessage"]["senderId"] == "peer_1"
+
+    def test_pages_with_before_cursor(self, store, tracker):
+        for i in range(7):
+            _send(store, tracker, f"match_{i}", f"peer_{i}", "me")
+        seen = []
+        page = tracker.conversations("me", 3)
+        while True:
+            seen.extend(c["matchId"] for c in page["list"])
+            if not page["hasMore"]:
+                break
+            page = tracker.conversations("me", 3, before=page["before"])
+        assert seen == [f"match_{i}" for i in reversed(range(7))]
+        with pytest.raises(InvalidCursorError):
+            tracker.conversations("me", 3, before="match_missing")
+
+    def test_new_match_listed_without_messages(self, store, tracker):
+        _send(store, tracker, "match_old", "peer_1", "me")
+        tracker.start_conversation("match_new", ("me", "peer_2"), int(time.time()) + 10**6)
+        conversations = tracker.conversations("me")["list"]
+        assert conversations[0]["matchId"] == "match_new"
+        assert conversations[0]["lastMessage"] is None
+        assert conversations[0]["unreadCount"] == 0
+        assert tracker.conversations("peer_2")["list"][0]["peerId"] == "me"
+
+    def test_summary_reads_from_index(self, engine, tracker):
+        tracker.start_conversation("match_1", ("me", "peer_1"), 0)
+        tracker.flush()
+        with engine.connect() as conn:
+            plan = " ".join(str(row[-1]) for row in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM chat_read_states WHERE user_id = 'me' "
+                "AND (last_message_at, match_id) < (1, 'x') ORDER BY last_message_at DESC, match_id DESC LIMIT 21"
+            )))
+        assert "ix_chat_read_states_user_recent" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestMockConversations:
+    """模拟模式会话列表测试类"""
+
+    def test_matches_lost_on_restart_are_skipped(self, engine, store, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.services.mock_data.chat_store", store)
+        monkeypatch.setattr("app.services.mock_data.chat_read_tracker", ChatReadTracker(engine, flush_interval=0))
+        monkeypatch.setattr("random.random", lambda: 0.9)
+        service = MockDataService(user_data_file=str(tmp_path / "users.json"))
+        # 新匹配排在 match_001 之前
+        clock = FakeClock()
+        clock.now = int(time.time()) + 1000
+        monkeypatch.setattr("app.services.mock_data.time", clock)
+        created = [service.create_match("user_001", f"card_{i:03d}", "like")["matchId"] for i in range(8)]
+        assert all(created)
+
+        # 重启：模拟模式的匹配只在内存中，会话摘要仍在数据库里
+        monkeypatch.setattr("app.services.mock_data.chat_read_tracker", ChatReadTracker(engine, flush_interval=0))
+        restarted = MockDataService(user_data_file=str(tmp_path / "users.json"))
+        page = restarted.get_conversations("user_001", 5)
+        assert [c["matchId"] for c in page["list"]] == ["match_001"]
+        assert not page["hasMore"]
+
+
+class TestConversationEndpoint:
+    """会话列表接口测试类"""
+
+    @pytest.fixture
+    def chat_api(self, store, tracker, monkeypatch):
+        monkeypatch.setattr("app.services.mock_data.chat_store", store)
+        monkeypatch.setattr("app.services.mock_data.chat_read_tracker", tracker)
+        return tracker
+
+    def test_conversations(self, client, auth_headers, chat_api):
+        card_headers = {"Authorization": "Bearer card_001"}
+        client.post(
+            "/api/v1/chat/send",
+            json={"matchId": "match_001", "content": "周末有空吗", "type": "text"},
+            headers=auth_headers,
+        )
+        response = client.get("/api/v1/chat/conversations", headers=card_headers).json()
+        assert response["code"] == 0
+        conversation = next(c for c in response["data"]["list"] if c["matchId"] == "match_001")
+        assert conversation["peer"]["id"] == "user_001"
+        assert conversation["peer"]["name"] == "小明"
+        assert conversation["lastMessage"]["preview"] == "周末有空吗"
+        assert conversation["unreadCount"] >= 1
+
+        client.post("/api/v1/chat/read", json={"matchId": "match_001"}, headers=card_headers)
+        response = client.get("/api/v1/chat/conversations", headers=card_headers).json()
+        conversation = next(c for c in response["data"]["list"] if c["matchId"] == "match_001")
+        assert conversation["unreadCount"] == 0
+
+    def test_invalid_cursor(self, client, auth_headers, chat_api):
+        response = client.get(
+            "/api/v1/chat/conversations", params={"before": "nope"}, headers=auth_headers
+        ).json()
+        assert response["code"] == 400
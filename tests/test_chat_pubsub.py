@@ -0,0 +1,174 @@
+"""
+聊天实时推送测试
+"""
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from starlette.websockets import WebSocketDisconnect
+from app.services import chat_pubsub
+from app.services.chat_pubsub import ChatHub, LocalBroker, RedisBroker
+from app.services.chat_read_state import ChatReadTracker
+from app.services.chat_store import ChatMessageStore
+
+
+class TestChatHub:
+    """ChatHub 测试类"""
+
+    def test_fan_out_across_nodes(self):
+        async def scenario():
+            broker = LocalBroker()
+            node_a, node_b = ChatHub(broker), ChatHub(broker)
+            await node_a.start()
+            await node_b.start()
+            receiver = node_b.connect("user_002")
+            sender_device = node_a.connect("user_001")
+            bystander = node_b.connect("user_003")
+
+            await node_a.publish(["user_001", "user_002"], {"type": "message", "matchId": "m1"})
+            assert await asyncio.wait_for(receiver.get(), 1) == {"type": "message", "matchId": "m1"}
+            assert await asyncio.wait_for(sender_device.get(), 1) == {"type": "message", "matchId": "m1"}
+            assert bystander.queue.empty()
+
+            node_b.disconnect(receiver)
+            assert node_b.stats()["connections"] == 1
+
+        asyncio.run(scenario())
+
+    def test_slow_consumer_drops_events(self):
+        async def scenario():
+            hub = ChatHub(LocalBroker(), queue_size=2)
+            subscriber = hub.connect("user_001")
+            for i in range(5):
+                await hub.publish(["user_001"], {"type": "message", "n": i})
+            assert subscriber.queue.qsize() == 2
+            assert subscriber.dropped == 3
+
+        asyncio.run(scenario())
+
+
+class FakePubSub:
+    """第一个订阅在收到一条消息后断开，之后的订阅正常"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def subscribe(self, channel):
+        self.redis.subscriptions.append(channel)
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        yield {"type": "message", "data": f'{{"n": {len(self.redis.subscriptions)}}}'}
+        if len(self.redis.subscriptions) == 1:
+            raise ConnectionError("connection reset")
+        await asyncio.Event().wait()
+
+    async def reset(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.subscriptions = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def close(self):
+        pass
+
+
+class TestRedisBroker:
+    """RedisBroker 断线重连测试类"""
+
+    def test_resubscribes_after_disconnect(self, monkeypatch):
+        redis = FakeRedis()
+        monkeypatch.setattr(chat_pubsub, "aioredis", type("FakeModule", (), {"from_url": staticmethod(lambda url: redis)}))
+        monkeypatch.setattr(chat_pubsub, "RECONNECT_MIN_DELAY", 0.01)
+
+        async def scenario():
+            received = asyncio.Queue()
+            broker = RedisBroker("redis://fake", "chat")
+            await broker.start(received.put_nowait)
+            assert await asyncio.wait_for(received.get(), 1) == {"n": 1}
+            assert await asyncio.wait_for(received.get(), 1) == {"n": 2}
+            assert redis.subscriptions == ["chat", "chat"]
+            await broker.close()
+
+        asyncio.run(scenario())
+
+
+class TestChatWebSocket:
+    """聊天 WebSocket 接口测试类"""
+
+    @pytest.fixture
+    def hub(self, tmp_path, monkeypatch):
+        hub = ChatHub(LocalBroker())
+        monkeypatch.setattr("app.routers.chat.chat_hub", hub)
+        engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+        monkeypatch.setattr("app.services.mock_data.chat_store", ChatMessageStore(engine))
+        monkeypatch.setattr("app.services.mock_data.chat_read_tracker", ChatReadTracker(engine, flush_interval=0))
+        return hub
+
+    def test_pushes_new_messages_and_read_receipts(self, client, auth_headers, hub):
+        with client.websocket_connect("/api/v1/chat/ws?token=card_001") as ws:
+            sent = client.post(
+                "/api/v1/chat/send",
+                json={"matchId": "match_001", "content": "在吗", "type": "text"},
+                headers=auth_headers,
+            ).json()["data"]
+            event = ws.receive_json()
+            assert event["type"] == "message"
+            assert event["matchId"] == "match_001"
+            assert event["message"]["id"] == sent["id"]
+            assert event["message"]["content"] == "在吗"
+
+            client.post("/api/v1/chat/read", json={"matchId": "match_001"}, headers=auth_headers)
+            event = ws.receive_json()
+            assert (event["type"], event["userId"], event["lastReadId"]) == ("read", "user_001", sent["id"])
+
+    def test_header_auth_and_ping(self, client, auth_headers, hub):
+        with client.websocket_connect("/api/v1/chat/ws", headers=auth_headers) as ws:
+            ws.send_text("not json")
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+            assert hub.stats()["connections"] == 1
+        assert hub.stats()["connections"] == 0
+
+    def test_binary_frames_ignored(self, client, auth_headers, hub):
+        with client.websocket_connect("/api/v1/chat/ws", headers=auth_headers) as ws:
+            ws.send_bytes(b"\x00\x01")
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+
+    def test_closed_when_forwarding_fails(self, client, auth_headers, hub):
+        with client.websocket_connect("/api/v1/chat/ws", headers=auth_headers) as ws:
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+            subscriber = next(iter(hub._subscribers["user_001"]))
+            # 无法序列化的事件使推送任务失败
+            subscriber.offer({"type": "message", "message": object()})
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                ws.receive_json()
+            assert exc_info.value.code == 1011
+        assert hub.stats()["connections"] == 0
+
+    def test_broker_failure_does_not_fail_requests(self, client, auth_headers, hub, monkeypatch):
+        async def broken_publish(event):
+            raise ConnectionError("broker down")
+
+        monkeypatch.setattr(hub.broker, "publish", broken_publish)
+        sent = client.post(
+            "/api/v1/chat/send",
+            json={"matchId": "match_001", "content": "在吗", "type": "text"},
+            headers=auth_headers,
+        ).json()
+        assert sent["code"] == 0
+        read = client.post("/api/v1/chat/read", json={"matchId": "match_001"}, headers=auth_headers).json()
+        assert read["code"] == 0
+        assert read["data"]["lastReadId"] >= sent["data"]["id"]
+
+    def test_invalid_token_rejected(self, client, hub):
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/api/v1/chat/ws?token=bogus") as ws:
+                ws.receive_json()
+        assert exc_info.value.code == 4401
@@ -0,0 +1,226 @@
+"""
+聊天已读水位、未读计数与批量写入测试
+"""
+import threading
+import pytest
+from sqlalchemy import create_engine, event, text
+from app.services.chat_read_state import ChatReadTracker
+from app.services.chat_store import ChatMessageStore
+from app.services.data_adapter import DataService
+
+PARTICIPANTS = ("user_a", "user_b")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+
+
+@pytest.fixture
+def store(engine):
+    return ChatMessageStore(engine)
+
+
+@pytest.fixture
+def tracker(engine, store):
+    tracker = ChatReadTracker(engine, flush_interval=60)
+    yield tracker
+    tracker.close()
+
+
+def _send(store, tracker, sender_id, content="hi", match_id="match_a"):
+    message = store.send(match_id, sender_id, content, "text")
+    tracker.record_message(match_id, message, PARTICIPANTS)
+    return message
+
+
+class TestChatReadTracker:
+    """ChatReadTracker 测试类"""
+
+    def test_unread_counts_and_watermark(self, store, tracker):
+        sent = [_send(store, tracker, "user_a", f"msg {i}") for i in range(3)]
+        assert tracker.unread_count("match_a", "user_b") == 3
+        assert tracker.unread_count("match_a", "user_a") == 0
+
+        result = tracker.mark_read("match_a", "user_b")
+        assert result == {"matchId": "match_a", "lastReadId": sent[-1]["id"], "unread": 0}
+        assert tracker.unread_count("match_a", "user_b") == 0
+
+        _send(store, tracker, "user_a")
+        _send(store, tracker, "user_b")
+        assert tracker.unread_count("match_a", "user_b") == 1
+        assert tracker.unread_count("match_a", "user_a") == 1
+
+    def test_read_flags_follow_other_participant(self, store, tracker):
+        first = _send(store, tracker, "user_a")
+        tracker.mark_read("match_a", "user_b")
+        second = _send(store, tracker, "user_a")
+        reply = _send(store, tracker, "user_b")
+        messages = tracker.apply_read_flags("match_a", [dict(m) for m in (first, second, reply)])
+        assert [m["isRead"] for m in messages] == [True, False, False]
+
+    def test_existing_messages_count_as_unread(self, store, engine):
+        for i in range(4):
+            store.send("match_a", "user_a", f"msg {i}", "text")
+        store.send("match_a", "user_b", "reply", "text")
+        tracker = ChatReadTracker(engine, flush_interval=60)
+        assert tracker.unread_count("match_a", "user_b") == 4
+        assert tracker.unread_count("match_a", "user_a") == 1
+        assert tracker.last_read_id("match_a", "user_b") is None
+
+    def test_state_created_during_send_not_double_counted(self, store, tracker):
+        message = store.send("match_a", "user_a", "hi", "text")
+        # 消息已保存、record_message 之前另一个请求先读取未读数，按已保存的消息建立状态
+        assert tracker.unread_count("match_a", "user_b") == 1
+        tracker.record_message("match_a", message, PARTICIPANTS)
+        assert tracker.unread_count("match_a", "user_b") == 1
+        _send(store, tracker, "user_a")
+        assert tracker.unread_count("match_a", "user_b") == 2
+
+    def test_concurrent_first_access_counts_once(self, engine, store):
+        for i in range(3):
+            store.send("match_a", "user_a", f"msg {i}", "text")
+        tracker = ChatReadTracker(engine, flush_interval=60)
+        counts = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, *args):
+            if "count(" in statement.lower():
+                counts.append(statement)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(tracker.unread_count("match_a", "user_b")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        event.remove(engine, "before_cursor_execute", record)
+        tracker.close()
+        assert results == [3] * 8
+        assert len(counts) == 1
+
+    def test_writes_are_coalesced(self, engine, store, tracker):
+        _send(store, tracker, "user_a")
+        _send(store, tracker, "user_b")
+        assert tracker.flush() == 2
+
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+
+        for _ in range(50):
+            _send(store, tracker, "user_a")
+            _send(store, tracker, "user_b")
+            tracker.mark_read("match_a", "user_b")
+            tracker.mark_read("match_a", "user_a")
+        assert tracker.stats()["pending"] == 2
+        statements.clear()
+        assert tracker.flush() == 2
+        assert statements.count("INSERT") == 1
+        assert statements.count("UPDATE") == 0
+        event.remove(engine, "before_cursor_execute", capture)
+
+    def test_reads_do_not_write(self, engine, store, tracker):
+        store.send("match_a", "user_a", "hi", "text")
+        assert tracker.unread_count("match_a", "user_b") == 1
+        assert tracker.last_read_id("match_a", "user_b") is None
+        tracker.apply_read_flags("match_a", [])
+        assert tracker.stats()["pending"] == 0
+        assert tracker.flush() == 0
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM chat_read_states")).scalar() == 0
+
+    def test_database_mode_mark_read_records_peer(self, engine, store, tracker, monkeypatch):
+        store.send("match_a", "user_a", "hi", "text")
+        service = DataService()
+        service.use_mock = False
+        monkeypatch.setattr(service, "get_match_by_id", lambda match_id: {"userId1": "user_a", "userId2": "user_b"})
+        monkeypatch.setattr("app.services.data_adapter.chat_read_tracker", tracker)
+        service.mark_messages_read("match_a", "user_b")
+        tracker.flush()
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT peer_id FROM chat_read_states WHERE user_id = 'user_b'")).scalar() == "user_a"
+
+    def test_cache_evicts_clean_matches(self, engine, store):
+        tracker = ChatReadTracker(engine, flush_interval=60, cache_size=2)
+        for match_id in ("match_a", "match_b", "match_c"):
+            _send(store, tracker, "user_a", match_id=match_id)
+        # 有待写入修改的会话不淘汰
+        assert tracker.stats()["cachedMatches"] == 3
+        tracker.flush()
+        assert tracker.unread_count("match_d", "user_b") == 0
+        assert tracker.stats()["cachedMatches"] == 2
+        assert tracker.unread_count("match_a", "user_b") == 1
+        tracker.close()
+
+    def test_stale_flush_does_not_move_watermark_back(self, engine, store):
+        # 两个 worker 进程各自缓存同一会话的状态
+        first = ChatReadTracker(engine, flush_interval=60)
+        second = ChatReadTracker(engine, flush_interval=60)
+        _send(store, first, "user_a", "one")
+        second.mark_read("match_a", "user_b")
+        latest = _send(store, first, "user_a", "two")
+        first.mark_read("match_a", "user_b")
+        first.flush()
+        second.flush()
+        reloaded = ChatReadTracker(engine, flush_interval=60)
+        assert reloaded.last_read_id("match_a", "user_b") == latest["id"]
+        assert reloaded.unread_count("match_a", "user_b") == 0
+        for tracker in (first, second, reloaded):
+            tracker.close()
+
+    def test_state_survives_restart(self, engine, store, tracker):
+        for _ in range(3):
+            _send(store, tracker, "user_a")
+        tracker.mark_read("match_a", "user_a")
+        tracker.close()
+
+        reloaded = ChatReadTracker(engine, flush_interval=60)
+        assert reloaded.unread_count("match_a", "user_b") == 3
+        assert reloaded.unread_count("match_a", "user_a") == 0
+        assert reloaded.last_read_id("match_a", "user_a") == tracker.last_read_id("match_a", "user_a")
+
+    def test_background_flush(self, engine, store):
+        tracker = ChatReadTracker(engine, flush_interval=0.01)
+        _send(store, tracker, "user_a")
+        tracker.mark_read("match_a", "user_b")
+        tracker.close()
+        assert tracker.stats()["pending"] == 0
+        assert ChatReadTracker(engine, flush_interval=60).last_read_id("match_a", "user_b") is not None
+
+
+class TestReadEndpoints:
+    """已读与未读数接口测试类"""
+
+    @pytest.fixture
+    def chat_api(self, store, tracker, monkeypatch):
+        monkeypatch.setattr("app.services.mock_data.chat_store", store)
+        monkeypatch.setattr("app.services.mock_data.chat_read_tracker", tracker)
+        return tracker
+
+    def test_unread_and_read(self, client, auth_headers, chat_api):
+        card_headers = {"Authorization": "Bearer card_001"}
+        unread = client.get("/api/v1/chat/unread", headers=card_headers).json()["data"]["matches"]["match_001"]
+        for i in range(2):
+            client.post(
+                "/api/v1/chat/send",
+                json={"matchId": "match_001", "content": f"第{i}条", "type": "text"},
+                headers=auth_headers,
+            )
+        data = client.get("/api/v1/chat/unread", headers=card_headers).json()["data"]
+        assert data["matches"]["match_001"] == unread + 2
+        assert data["total"] >= unread + 2
+
+        response = client.post("/api/v1/chat/read", json={"matchId": "match_001"}, headers=card_headers).json()
+        assert response["code"] == 0
+        assert response["data"]["unread"] == 0
+        assert client.get("/api/v1/chat/unread", headers=card_headers).json()["data"]["matches"]["match_001"] == 0
+
+        history = client.get("/api/v1/chat/history/match_001", headers=auth_headers).json()["data"]
+        assert history["list"][0]["id"] == response["data"]["lastReadId"]
+        assert all(m["isRead"] for m in history["list"] if m["senderId"] == "user_001")
@@ -0,0 +1,123 @@
+"""
+聊天消息存储与历史记录分页测试
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from app.services.chat_read_state import ChatReadTracker
+from app.services.chat_store import ChatMessageStore, InvalidCursorError
+from app.config import settings
+from app.utils import db_config
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatMessageStore(create_engine(f"sqlite:///{tmp_path / 'chat.db'}"))
+
+
+@pytest.fixture
+def chat_api(store, monkeypatch):
+    monkeypatch.setattr("app.services.mock_data.chat_store", store)
+    monkeypatch.setattr("app.services.mock_data.chat_read_tracker", ChatReadTracker(store.engine, flush_interval=0))
+    return store
+
+
+class TestChatMessageStore:
+    """ChatMessageStore 测试类"""
+
+    def test_pages_newest_first_with_before_cursor(self, store):
+        sent = [store.send("match_a", "user_001", f"msg {i}", "text")["id"] for i in range(45)]
+        store.send("match_b", "user_002", "other conversation", "text")
+
+        seen = []
+        page = store.history("match_a", 20)
+        while True:
+            seen.extend(message["id"] for message in page["list"])
+            if not page["hasMore"]:
+                break
+            page = store.history("match_a", 20, before=page["before"])
+        assert seen == list(reversed(sent))
+
+    def test_after_cursor_returns_newer_messages(self, store):
+        sent = [store.send("match_a", "user_001", f"msg {i}", "text")["id"] for i in range(10)]
+        page = store.history("match_a", 3, after=sent[4])
+        assert [m["id"] for m in page["list"]] == [sent[7], sent[6], sent[5]]
+        assert page["hasMore"]
+        page = store.history("match_a", 3, after=page["after"])
+        assert [m["id"] for m in page["list"]] == [sent[9], sent[8]]
+        assert not page["hasMore"]
+        # 没有新消息时游标保持不变
+        assert store.history("match_a", 3, after=sent[9]) == {
+            "list": [], "pageSize": 3, "hasMore": False, "before": None, "after": sent[9]
+        }
+
+    def test_cursor_from_other_match_rejected(self, store):
+        other = store.send("match_b", "user_002", "hi", "text")["id"]
+        with pytest.raises(InvalidCursorError):
+            store.history("match_a", 20, before=other)
+        with pytest.raises(InvalidCursorError):
+            store.history("match_a", 20, after="missing")
+
+    def test_history_reads_from_index(self, store):
+        with store.engine.connect() as conn:
+            plan = " ".join(str(row[-1]) for row in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM chat_messages WHERE match_id = 'm' "
+                "AND (timestamp, id) < (1, 'x') ORDER BY timestamp DESC, id DESC LIMIT 21"
+            )))
+        assert "ix_chat_messages_match_time" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_message_format(self, store):
+        message = store.send("match_a", "user_001", "你好", "text", sender_name="小明", sender_avatar="/a.jpg")
+        assert set(message) == {"id", "content", "type", "senderId", "senderAvatar", "senderName", "timestamp", "isRead"}
+        assert store.history("match_a")["list"] == [message]
+
+
+class TestChatEngine:
+    """聊天数据库选择测试类"""
+
+    def test_defaults_to_main_engine(self, monkeypatch):
+        monkeypatch.setattr(settings, "CHAT_DATABASE_URL", "")
+        assert db_config.get_chat_engine() is db_config.engine
+        monkeypatch.setattr(settings, "CHAT_DATABASE_URL", db_config.DATABASE_URL)
+        assert db_config.get_chat_engine() is db_config.engine
+
+
+class TestChatEndpoints:
+    """聊天接口测试类"""
+
+    def test_send_and_page_history(self, client, auth_headers, chat_api):
+        ids = []
+        for i in range(5):
+            response = client.post(
+                "/api/v1/chat/send",
+                json={"matchId": "match_001", "content": f"第{i}条", "type": "text"},
+                headers=auth_headers,
+            ).json()
+            assert response["code"] == 0
+            ids.append(response["data"]["id"])
+
+        page = client.get("/api/v1/chat/history/match_001", params={"limit": 3}, headers=auth_headers).json()["data"]
+        assert [m["id"] for m in page["list"]] == ids[:-4:-1]
+        older = client.get(
+            "/api/v1/chat/history",
+            params={"matchId": "match_001", "pageSize": 3, "before": page["before"]},
+            headers=auth_headers,
+        ).json()["data"]
+        # 之后是 match_001 的示例消息
+        assert [m["id"] for m in older["list"][:2]] == [ids[1], ids[0]]
+
+    def test_invalid_cursor(self, client, auth_headers, chat_api):
+        response = client.get(
+            "/api/v1/chat/history/match_001", params={"before": "nope"}, headers=auth_headers
+        ).json()
+        assert response["code"] == 400
+        response = client.get(
+            "/api/v1/chat/history/match_001", params={"before": "a", "after": "b"}, headers=auth_headers
+        ).json()
+        assert response["code"] == 400
+
+    def test_other_users_match_forbidden(self, client, chat_api):
+        response = client.get(
+            "/api/v1/chat/history/match_001", headers={"Authorization": "Bearer test_user_001"}
+        ).json()
+        assert response["code"] == 403
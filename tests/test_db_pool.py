@@ -0,0 +1,76 @@
+"""
+数据库引擎与连接池测试
+"""
+import threading
+import time
+import pytest
+from sqlalchemy import exc, text
+from app.config import settings
+from app.utils.db_config import InstrumentedQueuePool, create_db_engine, engine, pool_status
+from app import database
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'pool.db'}"
+
+
+class TestEngineFactory:
+    """create_db_engine 测试类"""
+
+    def test_single_engine(self):
+        assert database.engine is engine
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+
+    def test_pool_settings(self, db_url):
+        test_engine = create_db_engine(db_url, pool_size=2, max_overflow=1)
+        status = pool_status(test_engine)
+        assert status["poolSize"] == 2
+        assert status["maxOverflow"] == 1
+        assert test_engine.pool._pre_ping == settings.DB_POOL_PRE_PING
+
+    def test_memory_database_skips_pool_options(self):
+        test_engine = create_db_engine("sqlite://")
+        assert pool_status(test_engine)["pool"] != "InstrumentedQueuePool"
+
+    def test_checkout_metrics(self, db_url):
+        test_engine = create_db_engine(db_url, pool_size=1, max_overflow=0, pool_timeout=0.2)
+        held = test_engine.connect()
+        assert pool_status(test_engine)["checkedOut"] == 1
+
+        def release_later():
+            time.sleep(0.1)
+            held.close()
+
+        threading.Thread(target=release_later).start()
+        with test_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        status = pool_status(test_engine)
+        assert status["checkouts"] == 2
+        assert status["waitMaxMs"] >= 50
+
+        held = test_engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            test_engine.connect()
+        held.close()
+        assert pool_status(test_engine)["timeouts"] == 1
+
+    def test_sqlite_statement_timeout(self, db_url, monkeypatch):
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 50)
+        test_engine = create_db_engine(db_url)
+        slow_query = text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n"
+        )
+        with test_engine.connect() as conn:
+            with pytest.raises(exc.OperationalError):
+                conn.execute(slow_query)
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_db_pool_endpoint(client, auth_headers):
+    """连接池状态端点"""
+    response = client.get("/api/v1/system/db-pool", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["pool"] == "InstrumentedQueuePool"
+    assert "waitAvgMs" in data
@@ -0,0 +1,53 @@
+"""
+数据库结构升级测试
+"""
+import sqlite3
+from sqlalchemy import create_engine, inspect
+from app.utils.db_config import Base
+from app.utils.db_init import upgrade_schema
+
+# 加入 openid、经纬度之前的 users 表
+OLD_USERS_TABLE = """
+CREATE TABLE users (
+    id TEXT PRIMARY KEY, username TEXT UNIQUE, email TEXT UNIQUE, hashed_password TEXT,
+    is_active BOOLEAN DEFAULT 1, created_at TIMESTAMP, updated_at TIMESTAMP,
+    nick_name VARCHAR, avatar_url VARCHAR, gender INTEGER, age INTEGER, occupation VARCHAR,
+    location JSON, bio TEXT, match_type VARCHAR, user_role VARCHAR, interests JSON,
+    preferences JSON, phone VARCHAR, education VARCHAR, join_date INTEGER
+)
+"""
+
+
+class TestUpgradeSchema:
+    """upgrade_schema 测试类"""
+
+    def _old_database(self, tmp_path, rows=()):
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(path)
+        conn.execute(OLD_USERS_TABLE)
+        conn.executemany("INSERT INTO users (id, phone) VALUES (?, ?)", rows)
+        conn.commit()
+        conn.close()
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        return engine
+
+    def test_adds_missing_columns_and_indexes(self, tmp_path):
+        engine = self._old_database(tmp_path, [("u1", "13900000001"), ("u2", None), ("u3", None)])
+        changes = upgrade_schema(engine)
+        assert {"users.openid", "users.latitude", "users.longitude", "ix_users_openid", "ix_users_phone"} <= set(changes)
+
+        inspector = inspect(engine)
+        columns = {column["name"] for column in inspector.get_columns("users")}
+        assert {"openid", "latitude", "longitude"} <= columns
+        indexes = {index["name"]: index for index in inspector.get_indexes("users")}
+        assert indexes["ix_users_phone"]["unique"]
+        # 再次执行没有变更
+        assert upgrade_schema(engine) == []
+
+    def test_duplicate_values_skip_unique_index(self, tmp_path):
+        engine = self._old_database(tmp_path, [("u1", "13900000001"), ("u2", "13900000001")])
+        changes = upgrade_schema(engine)
+        assert "users.openid" in changes
+        assert "ix_users_phone" not in changes
+        assert "ix_users_openid" in changes
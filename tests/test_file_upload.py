@@ -0,0 +1,119 @@
+"""
+流式文件上传测试
+"""
+import asyncio
+import os
+import tempfile
+import tracemalloc
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.services.file_storage import save_upload, UploadTooLargeError
+from app.utils.request_limits import RequestBodyLimitMiddleware
+
+JPEG_HEAD = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+
+
+class TestUploadEndpoint:
+    """上传接口测试"""
+
+    def test_upload_written_atomically(self, client, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        content = JPEG_HEAD + os.urandom(3 * 1024 * 1024 + 17)
+        response = client.post(
+            "/api/v1/files/upload",
+            files={"file": ("photo.jpg", content, "image/jpeg")},
+            data={"type": "avatar"},
+            headers=auth_headers,
+        )
+        data = response.json()
+        assert data["code"] == 0
+        user_id, file_name = data["data"]["url"].split("/")[-2:]
+        with open(tmp_path / user_id / file_name, "rb") as f:
+            assert f.read() == content
+        assert os.listdir(tmp_path / user_id) == [file_name]
+
+    def test_oversized_upload_rejected(self, client, auth_headers, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        monkeypatch.setattr(settings, "MAX_IMAGE_SIZE", 1024)
+        response = client.post(
+            "/api/v1/files/upload",
+            files={"file": ("photo.jpg", JPEG_HEAD + b"x" * 4096, "image/jpeg")},
+            data={"type": "avatar"},
+            headers=auth_headers,
+        )
+        assert response.json()["code"] == 400
+        assert all(not files for _, _, files in os.walk(tmp_path))
+
+
+class TestSaveUpload:
+    """save_upload 测试类"""
+
+    def _upload(self, size):
+        spool = tempfile.TemporaryFile()
+        block = os.urandom(1024 * 1024)
+        for _ in range(size // len(block)):
+            spool.write(block)
+        spool.seek(0)
+        return UploadFile(spool, filename="video.mp4")
+
+    def test_constant_memory(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        upload = self._upload(32 * 1024 * 1024)
+        tracemalloc.start()
+        file_name, written, created = asyncio.run(save_upload(upload, "user", ".mp4", 64 * 1024 * 1024, chunk_size=256 * 1024))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert written == os.path.getsize(tmp_path / "user" / file_name) == 32 * 1024 * 1024
+        assert created
+        assert peak < 4 * 1024 * 1024
+
+    def test_limit_aborts_and_cleans_up(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        upload = self._upload(8 * 1024 * 1024)
+        try:
+            asyncio.run(save_upload(upload, "user", ".mp4", 2 * 1024 * 1024, chunk_size=256 * 1024))
+            assert False, "expected UploadTooLargeError"
+        except UploadTooLargeError:
+            pass
+        assert not os.path.exists(tmp_path / "user")
+        assert all(not files for _, _, files in os.walk(tmp_path / "blobs"))
+
+
+class TestRequestBodyLimit:
+    """请求体大小限制中间件测试"""
+
+    def _client(self):
+        app = FastAPI()
+        app.add_middleware(RequestBodyLimitMiddleware, limits={"/upload": 1024})
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            return {"size": len(await file.read())}
+
+        return TestClient(app)
+
+    def test_content_length_over_limit(self):
+        response = self._client().post("/upload", files={"file": ("a.bin", b"x" * 4096)})
+        assert response.status_code == 413
+        assert response.json()["code"] == 413
+
+    def test_chunked_body_over_limit(self):
+        def body():
+            for _ in range(8):
+                yield b"x" * 512
+
+        response = self._client().post(
+            "/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=abc"}
+        )
+        assert response.status_code == 413
+        # 与 Content-Length 超限时的响应内容一致
+        assert response.json() == self._client().post("/upload", files={"file": ("a.bin", b"x" * 4096)}).json()
+
+    def test_within_limit(self):
+        response = self._client().post("/upload", files={"file": ("a.bin", b"x" * 100)})
+        assert response.json() == {"size": 100}
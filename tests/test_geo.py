@@ -0,0 +1,125 @@
+"""
+地理位置工具与距离筛选测试
+"""
+import pytest
+from app.utils.geo import (
+    GridIndex, REGION_CENTROIDS, normalize_location, location_of, haversine_km, format_distance
+)
+from app.services.ranking import RankingEngine
+from app.services.mock_data import MockDataService
+
+BEIJING = REGION_CENTROIDS["北京"]
+SHANGHAI = REGION_CENTROIDS["上海"]
+
+
+class TestNormalizeLocation:
+    """位置归一化测试"""
+
+    def test_region_text(self):
+        assert normalize_location("上海市 上海市 徐汇区") == SHANGHAI
+        assert normalize_location(["北京市", "朝阳区"]) == BEIJING
+        assert normalize_location("火星") is None
+        assert normalize_location(None) is None
+
+    def test_coordinates(self):
+        assert normalize_location([31.2, 121.4]) == (31.2, 121.4)
+        assert normalize_location({"latitude": 31.2, "longitude": 121.4}) == (31.2, 121.4)
+        assert normalize_location([200, 121.4]) is None
+
+    def test_location_of_prefers_coordinates(self):
+        assert location_of({"latitude": 30.0, "longitude": 120.0, "location": "北京"}) == (30.0, 120.0)
+        assert location_of({"houseInfo": {"location": "北京市朝阳区"}}) == BEIJING
+
+    def test_distance(self):
+        assert 1000 < haversine_km(*BEIJING, *SHANGHAI) < 1100
+        assert format_distance(0.35) == "350m"
+        assert format_distance(3.21) == "3.2km"
+        assert format_distance(1067.4) == "1067km"
+
+
+class TestGridIndex:
+    """网格索引测试"""
+
+    def test_within_radius(self):
+        index = GridIndex()
+        index.add("near", (BEIJING[0] + 0.05, BEIJING[1]))
+        index.add("edge", (BEIJING[0], BEIJING[1] + 0.7))
+        index.add("far", SHANGHAI)
+
+        result = index.within(*BEIJING, 10)
+        assert set(result) == {"near"}
+        assert result["near"] == pytest.approx(5.57, abs=0.05)
+        assert set(index.within(*BEIJING, 80)) == {"near", "edge"}
+
+    def test_move_and_remove(self):
+        index = GridIndex()
+        index.add("a", BEIJING)
+        index.add("a", SHANGHAI)
+        assert index.within(*BEIJING, 50) == {}
+        index.add("a", None)
+        assert len(index) == 0
+
+
+class TestDistanceRanking:
+    """排序引擎距离筛选测试"""
+
+    def setup_method(self):
+        candidates = [
+            {"id": "bj1", "matchType": "dating", "userRole": "provider", "latitude": BEIJING[0] + 0.01, "longitude": BEIJING[1]},
+            {"id": "bj2", "matchType": "dating", "userRole": "provider", "location": ["北京市", "海淀区"]},
+            {"id": "sh1", "matchType": "dating", "userRole": "provider", "location": "上海"},
+            {"id": "unknown", "matchType": "dating", "userRole": "provider"},
+        ]
+        self.engine = RankingEngine(loader=lambda: candidates)
+        self.requester = {"id": "me", "location": "北京", "preferences": {"distance": 10}}
+
+    def test_radius_prunes_candidates(self):
+        ranked, total = self.engine.rank(self.requester, "dating", "provider", 0, 10, radius_km=20)
+        assert total == 2
+        assert {cid for cid, _ in ranked} == {"bj1", "bj2"}
+
+    def test_radius_without_location(self):
+        assert self.engine.rank({"id": "me"}, "dating", "provider", 0, 10, radius_km=20) == ([], 0)
+
+    def test_distance_score(self):
+        ranked, total = self.engine.rank(self.requester, "dating", "provider", 0, 10)
+        assert total == 4
+        assert [cid for cid, _ in ranked] == ["bj1", "bj2", "unknown", "sh1"]
+
+
+class TestCardFeedDistance:
+    """卡片流距离筛选测试"""
+
+    def test_get_cards_within_radius(self):
+        service = MockDataService()
+        service.create_card({"id": "geo_sh", "matchType": "activity", "userRole": "seeker", "location": "上海"})
+        for i in range(3):
+            service.create_card({
+                "id": f"geo_bj_{i}", "matchType": "activity", "userRole": "seeker",
+                "latitude": BEIJING[0] + 0.01 * i, "longitude": BEIJING[1]
+            })
+
+        result = service.get_cards("activity", "seeker", 1, 2, origin=BEIJING, radius_km=30)
+        assert result["total"] == 3
+        assert [card["id"] for card in result["list"]] == ["geo_bj_0", "geo_bj_1"]
+        assert result["list"][1]["distance"] == "1.1km"
+
+        rest = service.get_cards_by_cursor("activity", "seeker", result["nextCursor"], 2, origin=BEIJING, radius_km=30)
+        assert [card["id"] for card in rest["list"]] == ["geo_bj_2"]
+        assert not rest["hasMore"]
+
+
+def test_cards_endpoint_distance_filter(client):
+    """距离筛选端点测试"""
+    response = client.get("/api/v1/matches/cards", params={
+        "matchType": "housing", "userRole": "seeker", "maxDistance": 5,
+        "latitude": BEIJING[0], "longitude": BEIJING[1]
+    })
+    assert response.status_code == 200
+    cards = response.json()["data"]["cards"]
+    assert cards and all(card.get("distance") for card in cards)
+
+    response = client.get("/api/v1/matches/cards", params={
+        "matchType": "housing", "userRole": "seeker", "maxDistance": 5
+    })
+    assert response.status_code == 400
@@ -0,0 +1,129 @@
+"""
+图片变体生成测试
+"""
+import io
+import os
+import pytest
+from app.config import settings
+from app.services import image_variants
+from app.services.image_variants import ImageVariantPipeline, image_variant_pipeline, is_variant, variant_path
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+
+class TestImageVariantPipeline:
+    """ImageVariantPipeline 测试类"""
+
+    def test_generates_narrower_variants_only(self, tmp_path):
+        original = tmp_path / "photo.jpg"
+        original.write_bytes(_jpeg(500, 250))
+        pipeline = ImageVariantPipeline(widths=[160, 320, 640], workers=1)
+        assert pipeline.generate(str(original)) == [160, 320]
+        with Image.open(variant_path(str(original), 160)) as variant:
+            assert variant.format == "WEBP"
+            assert variant.size == (160, 80)
+        assert not os.path.exists(variant_path(str(original), 640))
+        assert os.path.getsize(variant_path(str(original), 160)) < original.stat().st_size
+
+    def test_variant_url_picks_smallest_adequate(self, upload_dirs):
+        user_dir = upload_dirs / "uploads" / "user_001"
+        user_dir.mkdir(parents=True)
+        (user_dir / "a.jpg").write_bytes(_jpeg(1000, 1000))
+        pipeline = ImageVariantPipeline(widths=[160, 320, 640], workers=1)
+        url = "/uploads/user_001/a.jpg"
+
+        # 变体尚未生成时使用原图
+        assert pipeline.variant_url(url, 300) == url
+        pipeline.generate(str(user_dir / "a.jpg"))
+        assert pipeline.variant_url(url, 300) == "/uploads/user_001/a_320.webp"
+        assert pipeline.variant_url(url, 100) == "/uploads/user_001/a_160.webp"
+        assert pipeline.variant_url(url, 2000) == url
+        # 其他进程生成的变体通过文件系统发现
+        assert ImageVariantPipeline(widths=[160, 320, 640]).variant_url(url, 600) == "/uploads/user_001/a_640.webp"
+
+    def test_missing_variants_cached_briefly(self, upload_dirs, monkeypatch):
+        user_dir = upload_dirs / "uploads" / "user_001"
+        user_dir.mkdir(parents=True)
+        (user_dir / "a.jpg").write_bytes(_jpeg(1000, 1000))
+        pipeline = ImageVariantPipeline(widths=[160, 320, 640], workers=1)
+        url = "/uploads/user_001/a.jpg"
+        checks = []
+        exists = os.path.exists
+        monkeypatch.setattr(image_variants.os.path, "exists", lambda path: checks.append(path) or exists(path))
+
+        for _ in range(10):
+            assert pipeline.variant_url(url, 300) == url
+        assert len(checks) == 3
+
+        # 其他进程生成的变体在缓存过期后发现
+        ImageVariantPipeline(widths=[160, 320, 640], workers=1).generate(str(user_dir / "a.jpg"))
+        assert pipeline.variant_url(url, 300) == url
+        now = image_variants.time.monotonic()
+        monkeypatch.setattr(image_variants.time, "monotonic", lambda: now + image_variants.PROBE_TTL + 1)
+        assert pipeline.variant_url(url, 300) == "/uploads/user_001/a_320.webp"
+
+    def test_is_variant_matches_configured_widths_only(self):
+        digest = "ab" * 32
+        assert is_variant(f"{digest}_320.webp", widths=(160, 320))
+        assert not is_variant(f"{digest}_2.webp", widths=(160, 320))
+        assert not is_variant(f"{digest}.webp", widths=(160, 320))
+        # 旧的上传文件名不是变体
+        assert not is_variant("photo_2.webp", widths=(160, 320))
+        assert not is_variant("photo_320.webp", widths=(160, 320))
+
+    def test_external_and_non_image_urls_untouched(self):
+        pipeline = ImageVariantPipeline(widths=[160], workers=1)
+        assert pipeline.variant_url("https://picsum.photos/200/200", 100) == "https://picsum.photos/200/200"
+        assert pipeline.variant_url("/uploads/user_001/clip.mp4", 100) == "/uploads/user_001/clip.mp4"
+        assert pipeline.variant_url("/uploads/../secret.jpg", 100) == "/uploads/../secret.jpg"
+        card = {"avatar": "https://example.com/a.jpg", "images": []}
+        assert pipeline.with_variants(card, ("avatar", "images"), 100) is card
+
+    def test_disabled_without_pillow(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(image_variants, "Image", None)
+        pipeline = ImageVariantPipeline(widths=[160], workers=1)
+        assert pipeline.submit(str(tmp_path / "a.jpg")) is None
+        assert pipeline.variant_url("/uploads/user_001/a.jpg", 100) == "/uploads/user_001/a.jpg"
+
+    def test_missing_pillow_fails_startup_check(self, monkeypatch):
+        monkeypatch.setattr(image_variants, "Image", None)
+        with pytest.raises(RuntimeError):
+            ImageVariantPipeline(widths=[160], workers=1).check_dependencies()
+        monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", "")
+        ImageVariantPipeline(workers=1).check_dependencies()
+
+
+class TestUploadVariants:
+    """上传后生成变体的集成测试类"""
+
+    def test_upload_generates_variants_and_cards_reference_them(self, client, auth_headers, upload_dirs):
+        response = client.post(
+            "/api/v1/files/upload",
+            files={"file": ("avatar.jpg", _jpeg(800, 800), "image/jpeg")},
+            data={"type": "avatar"},
+            headers=auth_headers,
+        ).json()
+        url = response["data"]["url"]
+        image_variant_pipeline.wait(5)
+        path = image_variant_pipeline.local_path(url)
+        for width in image_variant_pipeline.widths:
+            assert os.path.exists(variant_path(path, width))
+
+        card = image_variant_pipeline.with_variants({"avatar": url}, ("avatar",), settings.CARD_IMAGE_WIDTH)
+        assert card["avatar"] == variant_path(url, settings.CARD_IMAGE_WIDTH)
+
+        image_variant_pipeline.remove_variants(path)
+        assert not any(os.path.exists(variant_path(path, w)) for w in image_variant_pipeline.widths)
@@ -0,0 +1,48 @@
+"""
+结构化日志测试
+"""
+import io
+import json
+import sys
+import pytest
+from app.utils.logger import configure_logging, get_logger
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt_type="text", stream=stream)
+    yield stream
+    configure_logging(level="INFO", fmt_type="text", stream=sys.stderr)
+
+
+class TestStructuredLogger:
+    """结构化日志测试类"""
+
+    def test_disabled_level_skips_formatting(self, log_stream):
+        calls = []
+        logger = get_logger("app.tests")
+        logger.debug("lookup", users=lambda: calls.append(1))
+        assert calls == []
+        assert log_stream.getvalue() == ""
+
+    def test_text_output_resolves_lazy_fields(self, log_stream):
+        get_logger("app.tests").info("user_created", user_id="u1", user_count=lambda: 3)
+        line = log_stream.getvalue().strip()
+        assert line.endswith("INFO app.tests user_created user_id=u1 user_count=3")
+
+    def test_json_output(self, log_stream):
+        configure_logging(level="INFO", fmt_type="json", stream=log_stream)
+        get_logger("app.tests").warning("save_failed", path="/tmp/x")
+        payload = json.loads(log_stream.getvalue())
+        assert payload["event"] == "save_failed"
+        assert payload["level"] == "WARNING"
+        assert payload["path"] == "/tmp/x"
+
+    def test_sampling(self, log_stream):
+        logger = get_logger("app.tests")
+        for _ in range(100):
+            logger.info("hot", sample_rate=0.0)
+        logger.info("cold", sample_rate=1.0)
+        assert log_stream.getvalue().count("hot") == 0
+        assert log_stream.getvalue().count("cold") == 1
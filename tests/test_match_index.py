@@ -0,0 +1,93 @@
+"""
+匹配参与者索引测试
+"""
+import random
+import pytest
+from app.services.match_index import MatchParticipantIndex
+from app.services.mock_data import MockDataService
+
+
+def _match(match_id, user1, user2, create_time, is_read=False):
+    return {
+        "id": match_id,
+        "userId1": user1,
+        "userId2": user2,
+        "createTime": create_time,
+        "isRead": is_read,
+        "type": "dating",
+        "status": "matched",
+    }
+
+
+class TestMatchParticipantIndex:
+    """MatchParticipantIndex 测试类"""
+
+    def test_newest_first_and_ties_in_insert_order(self):
+        index = MatchParticipantIndex()
+        index.add(_match("m1", "u1", "c1", 100))
+        index.add(_match("m2", "c2", "u1", 300))
+        index.add(_match("m3", "u1", "c3", 200))
+        index.add(_match("m4", "u1", "c4", 200))
+        index.add(_match("m5", "u2", "c5", 500))
+        assert list(index.matches_of("u1")) == ["m2", "m3", "m4", "m1"]
+        assert list(index.matches_of("c2")) == ["m2"]
+        assert list(index.matches_of("nobody")) == []
+        assert index.count("u1") == 4
+
+    def test_participants_and_remove(self):
+        index = MatchParticipantIndex()
+        index.add(_match("m1", "u1", "c1", 100))
+        index.add(_match("m2", "u1", "c2", 200))
+        assert index.is_participant("m1", "c1")
+        assert not index.is_participant("m1", "c2")
+        assert not index.is_participant("missing", "u1")
+
+        index.remove("m1")
+        assert list(index.matches_of("u1")) == ["m2"]
+        assert list(index.matches_of("c1")) == []
+        assert not index.is_participant("m1", "u1")
+        assert len(index) == 1
+
+    def test_readd_replaces_entry(self):
+        index = MatchParticipantIndex()
+        index.add(_match("m1", "u1", "c1", 100))
+        index.add(_match("m1", "u1", "c2", 100))
+        assert list(index.matches_of("c1")) == []
+        assert index.participants("m1") == ("u1", "c2")
+        assert index.count("u1") == 1
+
+
+class TestMatchListing:
+    """匹配列表测试类"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        service = MockDataService(user_data_file=str(tmp_path / "users.json"))
+        rng = random.Random(7)
+        for i in range(300):
+            users = rng.sample(["u1", "u2", "u3", "c1", "c2", "c3"], 2)
+            service._add_match(_match(f"m{i:03d}", users[0], users[1], rng.randint(0, 50), rng.random() < 0.5))
+        return service
+
+    def test_matches_old_same_as_full_scan(self, service):
+        for user_id in ("u1", "c3", "nobody"):
+            for status in ("all", "new", "contacted"):
+                expected = [
+                    match for match in service.matches.values()
+                    if user_id in (match["userId1"], match["userId2"]) and (
+                        status == "all" or (status == "new") != match["isRead"]
+                    )
+                ]
+                expected.sort(key=lambda match: match["createTime"], reverse=True)
+                for page in (1, 2, 3):
+                    result = service.get_matches_old(user_id, status, page, 20)
+                    assert result["total"] == len(expected)
+                    assert [m["id"] for m in result["list"]] == [m["id"] for m in expected[(page - 1) * 20:page * 20]]
+
+    def test_create_match_updates_index(self, service, monkeypatch):
+        monkeypatch.setattr("random.random", lambda: 0.9)
+        match_id = service.create_match("user_001", "card_002", "like")["matchId"]
+        assert service.is_match_participant(match_id, "user_001")
+        assert service.is_match_participant(match_id, "card_002")
+        assert not service.is_match_participant(match_id, "u1")
+        assert service.get_matches_old("card_002", "all", 1, 10)["list"][0]["id"] == match_id
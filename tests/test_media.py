@@ -0,0 +1,128 @@
+"""
+媒体文件访问测试（Range、条件请求、缓存头）
+"""
+import asyncio
+import os
+import pytest
+from app.config import settings
+from app.utils.media import media_response, parse_range, IMMUTABLE_CACHE_CONTROL
+
+DIGEST = "ab" * 32
+
+
+@pytest.fixture
+def media_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MEDIA_CHUNK_SIZE", 1000)
+    content = os.urandom(10_000)
+    user_dir = tmp_path / "user_001"
+    user_dir.mkdir()
+    (user_dir / f"{DIGEST}.mp4").write_bytes(content)
+    (user_dir / "legacy.jpg").write_bytes(b"legacy")
+    (user_dir / ".upload.part").write_bytes(b"partial")
+    return content
+
+
+class TestParseRange:
+    """Range 解析测试类"""
+
+    def test_forms(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+        assert parse_range("bytes=500-5000", 1000) == (500, 999)
+
+    def test_ignored_and_unsatisfiable(self):
+        assert parse_range("bytes=0-1,5-6", 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=1000-", 1000)
+        with pytest.raises(ValueError):
+            parse_range("bytes=10-5", 1000)
+
+
+class TestMediaEndpoint:
+    """/uploads 媒体访问测试类"""
+
+    url = f"/uploads/user_001/{DIGEST}.mp4"
+
+    def test_full_response_headers(self, client, media_files):
+        response = client.get(self.url)
+        assert response.status_code == 200
+        assert response.content == media_files
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == f'"{DIGEST}"'
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["content-type"] == "video/mp4"
+
+    def test_range_request(self, client, media_files):
+        response = client.get(self.url, headers={"Range": "bytes=2500-7499"})
+        assert response.status_code == 206
+        assert response.content == media_files[2500:7500]
+        assert response.headers["content-range"] == "bytes 2500-7499/10000"
+        assert response.headers["content-length"] == "5000"
+
+        tail = client.get(self.url, headers={"Range": "bytes=-10"})
+        assert tail.status_code == 206
+        assert tail.content == media_files[-10:]
+
+    def test_unsatisfiable_range(self, client, media_files):
+        response = client.get(self.url, headers={"Range": "bytes=20000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */10000"
+
+    def test_if_none_match(self, client, media_files):
+        etag = client.get(self.url).headers["etag"]
+        response = client.get(self.url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert client.get(self.url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    def test_if_range_mismatch_returns_full_file(self, client, media_files):
+        response = client.get(self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == media_files
+        matched = client.get(self.url, headers={"Range": "bytes=0-9", "If-Range": f'"{DIGEST}"'})
+        assert matched.status_code == 206
+
+    def test_head(self, client, media_files):
+        response = client.head(self.url)
+        assert response.status_code == 200
+        assert response.headers["content-length"] == "10000"
+        assert response.content == b""
+
+    def test_legacy_file_revalidated(self, client, media_files):
+        response = client.get("/uploads/user_001/legacy.jpg")
+        assert response.status_code == 200
+        assert response.content == b"legacy"
+        assert "immutable" not in response.headers["cache-control"]
+        modified = client.get(
+            "/uploads/user_001/legacy.jpg", headers={"If-Modified-Since": response.headers["last-modified"]}
+        )
+        assert modified.status_code == 304
+
+    def test_hidden_and_outside_paths_not_served(self, client, media_files):
+        assert client.get("/uploads/user_001/.upload.part").status_code == 404
+        assert client.get("/uploads/user_001/missing.mp4").status_code == 404
+        assert client.get("/uploads/user_001").status_code == 404
+        assert client.get("/uploads/..%2F..%2Fetc%2Fpasswd").status_code == 404
+
+
+class TestZeroCopySend:
+    """zerocopysend 扩展测试类"""
+
+    def test_uses_zerocopysend_when_supported(self, tmp_path, monkeypatch):
+        path = tmp_path / "video.mp4"
+        path.write_bytes(b"0123456789")
+        response = media_response(str(path), os.stat(path), {"range": "bytes=2-5"})
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+        asyncio.run(response(scope, None, send))
+        assert messages[0]["status"] == 206
+        assert messages[1]["type"] == "http.response.zerocopysend"
+        assert (messages[1]["offset"], messages[1]["count"]) == (2, 4)
@@ -0,0 +1,178 @@
+"""
+候选人排序引擎测试
+"""
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import User
+from app.models.user_profile import UserProfile
+from app.services.data_adapter import DataService
+from app.services.ranking import RankingEngine
+from app.utils.db_config import Base
+
+
+def make_candidates():
+    return [
+        {"id": "u1", "age": 28, "matchType": "dating", "userRole": "provider", "interests": ["旅行", "摄影"], "tags": []},
+        {"id": "u2", "age": 45, "matchType": "dating", "userRole": "provider", "interests": ["旅行"], "tags": []},
+        {"id": "u3", "age": 30, "matchType": "dating", "userRole": "provider", "interests": ["编程", "旅行", "音乐"], "tags": ["安静"]},
+        {"id": "u4", "age": None, "matchType": "dating", "userRole": "provider", "interests": [], "tags": []},
+        {"id": "u5", "age": 29, "matchType": "dating", "userRole": "seeker", "interests": ["编程"], "tags": []},
+        {"id": "h1", "age": None, "matchType": "housing", "userRole": "provider", "interests": [], "tags": ["近地铁"]},
+        {"id": "h2", "age": None, "matchType": "housing", "userRole": "seeker", "interests": [], "tags": []},
+    ]
+
+
+class TestRankingEngine:
+    """RankingEngine 测试类"""
+
+    def setup_method(self):
+        self.candidates = make_candidates()
+        self.engine = RankingEngine(loader=lambda: self.candidates)
+        self.requester = {
+            "id": "me",
+            "interests": ["编程", "旅行", "音乐"],
+            "preferences": {"ageRange": [25, 35], "tags": ["安静"]},
+        }
+
+    def test_rank_orders_by_score(self):
+        ranked, total = self.engine.rank(self.requester, "dating", "provider", 0, 10)
+        assert total == 4
+        ids = [cid for cid, _ in ranked]
+        assert ids[0] == "u3"
+        assert ids.index("u1") < ids.index("u2")
+        scores = [score for _, score in ranked]
+        assert scores == sorted(scores, reverse=True)
+        assert abs(ranked[0][1] - 1.0) < 1e-6
+
+    def test_rank_pagination_is_consistent(self):
+        full, _ = self.engine.rank(self.requester, "dating", "provider", 0, 4)
+        first, _ = self.engine.rank(self.requester, "dating", "provider", 0, 2)
+        second, _ = self.engine.rank(self.requester, "dating", "provider", 2, 2)
+        assert first + second == full
+        assert self.engine.rank(self.requester, "dating", "provider", 10, 2)[0] == []
+
+    def test_role_filter_and_housing_any_role(self):
+        ranked, total = self.engine.rank(self.requester, "dating", "seeker", 0, 10)
+        assert [cid for cid, _ in ranked] == ["u5"]
+        ranked, total = self.engine.rank(self.requester, "housing", "seeker", 0, 10)
+        assert total == 2
+
+    def test_requester_excluded(self):
+        requester = {**self.requester, "id": "u3"}
+        ranked, total = self.engine.rank(requester, "dating", "provider", 0, 10)
+        assert "u3" not in [cid for cid, _ in ranked]
+        assert total == 3
+
+    def test_no_preferences_keeps_snapshot_order(self):
+        ranked, _ = self.engine.rank({"id": "me"}, "dating", "provider", 0, 10)
+        assert [cid for cid, _ in ranked] == ["u1", "u2", "u3", "u4"]
+
+    def test_score_pair(self):
+        assert self.engine.score_pair(self.requester, "u3") > self.engine.score_pair(self.requester, "u2")
+        assert self.engine.score_pair(self.requester, "missing") is None
+
+    def test_snapshot_rebuilds_on_version_change(self):
+        version = {"v": 1}
+        engine = RankingEngine(loader=lambda: list(self.candidates), version=lambda: version["v"], max_age=0)
+        assert len(engine.snapshot()) == 7
+        self.candidates.append({"id": "u6", "matchType": "dating", "userRole": "provider"})
+        assert len(engine.snapshot()) == 7
+        version["v"] = 2
+        assert len(engine.snapshot()) == 8
+
+    def test_background_refresh_serves_old_snapshot(self):
+        loading = threading.Event()
+        release = threading.Event()
+
+        loads = []
+
+        def loader():
+            if loads:
+                loading.set()
+                release.wait(5)
+            loads.append(1)
+            return list(self.candidates)
+
+        engine = RankingEngine(loader=loader, max_age=0, background=True)
+        first = engine.snapshot()
+        assert len(first) == 7
+        self.candidates.append({"id": "u6", "matchType": "dating", "userRole": "provider"})
+
+        # 重建在后台进行，请求立即拿到旧快照
+        assert engine.snapshot() is first
+        assert loading.wait(5)
+        assert engine.snapshot() is first
+        release.set()
+        for _ in range(100):
+            current = engine.snapshot()
+            if current is not first:
+                break
+            time.sleep(0.01)
+        assert len(current) == 8
+        assert "u6" in current.records
+
+    def test_many_interest_words(self):
+        candidates = [
+            {"id": f"c{i}", "matchType": "dating", "userRole": "provider", "interests": [f"兴趣{i}", f"兴趣{i + 100}"]}
+            for i in range(100)
+        ]
+        engine = RankingEngine(loader=lambda: candidates)
+        ranked, _ = engine.rank({"id": "me", "interests": ["兴趣150"]}, "dating", "provider", 0, 1)
+        assert ranked[0][0] == "c50"
+
+
+def test_cards_endpoint_sorted_by_score(client, auth_headers):
+    """按偏好排序的卡片端点"""
+    response = client.get(
+        "/api/v1/matches/cards",
+        params={"matchType": "dating", "userRole": "provider", "sortBy": "score"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    cards = response.json()["data"]["cards"]
+    assert all("score" in card for card in cards)
+    assert "user_001" not in [card["id"] for card in cards]
+
+
+class TestDatabaseRanking:
+    """数据库模式排序测试：同一用户有多个角色资料"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'ranking.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.add_all([
+                User(id="u1", username="u1", email="u1@example.com", hashed_password="x", age=28, nick_name="u1"),
+                User(id="u2", username="u2", email="u2@example.com", hashed_password="x", age=30, nick_name="u2"),
+                UserProfile(id="p1_dating", user_id="u1", role_type="dating_provider", scene_type="dating", display_name="dating-u1"),
+                UserProfile(id="p1_housing", user_id="u1", role_type="housing_provider", scene_type="housing", display_name="housing-u1"),
+                UserProfile(id="p2_dating", user_id="u2", role_type="dating_provider", scene_type="dating", display_name="dating-u2"),
+            ])
+            db.commit()
+
+        def get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        service = DataService()
+        service.use_mock = False
+        service._get_db = get_db
+        return service
+
+    def test_profiles_do_not_collide(self, service):
+        result = service.get_ranked_cards({"id": "u1"}, "dating", "provider", 1, 10)
+        assert [card["id"] for card in result["list"]] == ["u2"]
+        assert result["total"] == 1
+
+        result = service.get_ranked_cards({"id": "u2"}, "dating", "provider", 1, 10)
+        assert [(card["id"], card["name"]) for card in result["list"]] == [("u1", "dating-u1")]
+        result = service.get_ranked_cards({"id": "u2"}, "housing", "provider", 1, 10)
+        assert [(card["id"], card["name"]) for card in result["list"]] == [("u1", "housing-u1")]
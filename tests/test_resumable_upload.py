@@ -0,0 +1,156 @@
+"""
+断点续传上传测试
+"""
+import hashlib
+import os
+import time
+import pytest
+from app.config import settings
+from app.services.resumable_upload import resumable_upload_store, ResumableUploadError, MIN_CHUNK_SIZE
+
+CHUNK = MIN_CHUNK_SIZE
+MP4_HEAD = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00"
+
+
+def _mp4(size):
+    return MP4_HEAD + os.urandom(size - len(MP4_HEAD))
+
+
+@pytest.fixture
+def upload_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+
+def _initiate(client, headers, content, **extra):
+    payload = {"filename": "clip.mp4", "content_type": "video/mp4", "size": len(content), "chunk_size": CHUNK}
+    payload.update(extra)
+    return client.post("/api/v1/files/uploads", json=payload, headers=headers).json()
+
+
+def _put(client, headers, upload_id, index, data, sha256=None):
+    chunk_headers = dict(headers)
+    if sha256:
+        chunk_headers["X-Chunk-Sha256"] = sha256
+    return client.put(
+        f"/api/v1/files/uploads/{upload_id}/chunks/{index}", content=data, headers=chunk_headers
+    ).json()
+
+
+class TestResumableUpload:
+    """断点续传接口测试类"""
+
+    def test_out_of_order_chunks_and_resume(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK * 3 + 123)
+        session = _initiate(client, auth_headers, content, sha256=hashlib.sha256(content).hexdigest())
+        assert session["code"] == 0
+        upload_id = session["data"]["upload_id"]
+        assert session["data"]["total_chunks"] == 4
+        chunks = [content[i:i + CHUNK] for i in range(0, len(content), CHUNK)]
+
+        for index in (3, 1):
+            assert _put(client, auth_headers, upload_id, index, chunks[index])["code"] == 0
+
+        # 断线后查询状态，只补传缺失的分片
+        status = client.get(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["data"]
+        assert status["received"] == [1, 3]
+        assert status["missing"] == [0, 2]
+
+        incomplete = client.post(f"/api/v1/files/uploads/{upload_id}/complete", headers=auth_headers).json()
+        assert incomplete["code"] == 409
+        assert incomplete["data"]["missing"] == [0, 2]
+
+        for index in status["missing"]:
+            assert _put(client, auth_headers, upload_id, index, chunks[index])["code"] == 0
+
+        result = client.post(f"/api/v1/files/uploads/{upload_id}/complete", headers=auth_headers).json()
+        assert result["code"] == 0
+        url = result["data"]["url"]
+        prefix, user_id, file_name = url.rsplit("/", 2)
+        assert prefix == "/uploads"
+        assert file_name.endswith(".mp4")
+        with open(upload_dirs / "uploads" / user_id / file_name, "rb") as f:
+            assert f.read() == content
+        assert os.listdir(upload_dirs / "uploads" / user_id) == [file_name]
+        assert os.listdir(upload_dirs / "sessions") == []
+
+    def test_chunk_checksum_mismatch(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK + 1)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        bad = _put(client, auth_headers, upload_id, 0, content[:CHUNK], sha256="0" * 64)
+        assert bad["code"] == 400
+        good = _put(client, auth_headers, upload_id, 0, content[:CHUNK], sha256=hashlib.sha256(content[:CHUNK]).hexdigest())
+        assert good["code"] == 0
+        status = client.get(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["data"]
+        assert status["received"] == [0]
+
+    def test_file_checksum_mismatch(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK)
+        upload_id = _initiate(client, auth_headers, content, sha256="a" * 64)["data"]["upload_id"]
+        _put(client, auth_headers, upload_id, 0, content)
+        result = client.post(f"/api/v1/files/uploads/{upload_id}/complete", headers=auth_headers).json()
+        assert result["code"] == 400
+        assert all(not files for _, _, files in os.walk(upload_dirs / "uploads"))
+
+    def test_wrong_chunk_length_rejected(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK * 2)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        assert _put(client, auth_headers, upload_id, 0, content[:CHUNK - 1])["code"] == 400
+        assert _put(client, auth_headers, upload_id, 0, content[:CHUNK] + b"x")["code"] == 400
+        assert _put(client, auth_headers, upload_id, 2, content[:CHUNK])["code"] == 400
+        status = client.get(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["data"]
+        assert status["received"] == []
+
+    def test_initiate_validates_type_and_size(self, client, auth_headers, upload_dirs):
+        assert _initiate(client, auth_headers, b"x", filename="clip.exe")["code"] == 400
+        assert _initiate(client, auth_headers, b"x", content_type="text/plain")["code"] == 400
+        too_big = _initiate(client, auth_headers, b"x", size=settings.MAX_VIDEO_SIZE + 1)
+        assert too_big["code"] == 400
+        assert "超过限制" in too_big["message"]
+
+    def test_other_user_cannot_access_session(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        other = {"Authorization": "Bearer user_002"}
+        assert client.get(f"/api/v1/files/uploads/{upload_id}", headers=other).json()["code"] == 403
+        assert _put(client, other, upload_id, 0, content)["code"] == 403
+        with pytest.raises(ResumableUploadError) as excinfo:
+            resumable_upload_store.status("../../etc", "user_001")
+        assert excinfo.value.code == 404
+
+    def test_abort_removes_session(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        _put(client, auth_headers, upload_id, 0, content)
+        assert client.delete(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["code"] == 0
+        assert client.get(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["code"] == 404
+
+
+class TestSessionExpiry:
+    """过期会话测试类"""
+
+    def test_expired_session_rejected_and_purged(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        session_dir = upload_dirs / "sessions" / upload_id
+        stale = time.time() - settings.RESUMABLE_UPLOAD_TTL - 60
+        os.utime(session_dir, (stale, stale))
+
+        assert client.get(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers).json()["code"] == 410
+        assert _put(client, auth_headers, upload_id, 0, content)["code"] == 410
+
+        assert resumable_upload_store.purge_expired() == 1
+        assert not session_dir.exists()
+
+    def test_activity_extends_session(self, client, auth_headers, upload_dirs):
+        content = _mp4(CHUNK * 2)
+        upload_id = _initiate(client, auth_headers, content)["data"]["upload_id"]
+        session_dir = upload_dirs / "sessions" / upload_id
+        stale = time.time() - settings.RESUMABLE_UPLOAD_TTL + 30
+        os.utime(session_dir, (stale, stale))
+
+        assert _put(client, auth_headers, upload_id, 0, content[:CHUNK])["code"] == 0
+        assert resumable_upload_store.purge_expired(now=time.time() + 60) == 0
+        assert session_dir.exists()
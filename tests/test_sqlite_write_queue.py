@@ -0,0 +1,120 @@
+"""
+SQLite 生产模式与写入队列测试
+"""
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.utils.db_config import create_db_engine
+from app.utils.db_writer import SerialWriter
+
+
+@pytest.fixture
+def wal_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_WAL", True)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'prod.db'}", pool_size=20, max_overflow=20)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE events (id INTEGER PRIMARY KEY, writer INTEGER, payload TEXT)"))
+    yield engine
+    engine.dispose()
+
+
+class TestSqliteProductionMode:
+    """SQLite 连接参数测试"""
+
+    def test_pragmas_applied(self, wal_engine):
+        with wal_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+
+    def test_default_mode_unchanged(self, tmp_path):
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'dev.db'}")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+
+
+class TestSerialWriter:
+    """SerialWriter 测试类"""
+
+    def test_runs_on_single_thread(self):
+        writer = SerialWriter()
+        threads = set()
+        workers = [
+            threading.Thread(target=writer.submit, args=(lambda: threads.add(threading.get_ident()),))
+            for _ in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert len(threads) == 1
+        writer.shutdown()
+
+    def test_reentrant_and_propagates_errors(self):
+        writer = SerialWriter()
+        assert writer.submit(lambda: writer.submit(lambda: 42)) == 42
+        with pytest.raises(ValueError):
+            writer.submit(int, "not a number")
+        assert writer.pending == 0
+        writer.shutdown()
+
+
+@pytest.mark.slow
+def test_concurrent_writes_without_lock_errors(wal_engine):
+    """200 次写入/秒、并发读取的情况下不出现锁错误"""
+    Session = sessionmaker(bind=wal_engine)
+    writer = SerialWriter()
+    rate, duration, threads = 200, 3.0, 20
+    per_thread = int(rate * duration / threads)
+    errors = []
+
+    def insert(session, writer_id, seq):
+        session.execute(text("INSERT INTO events (writer, payload) VALUES (:w, :p)"), {"w": writer_id, "p": "x" * 200})
+        session.commit()
+
+    def client(writer_id):
+        start = time.monotonic()
+        for seq in range(per_thread):
+            # 按固定速率发起请求：每个请求先读后写，写操作交给写入队列
+            time.sleep(max(0.0, start + seq * threads / rate - time.monotonic()))
+            session = Session()
+            try:
+                session.execute(text("SELECT count(*) FROM events WHERE writer = :w"), {"w": writer_id}).scalar()
+                writer.submit(insert, session, writer_id, seq)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+
+    def reader(stop):
+        while not stop.is_set():
+            session = Session()
+            try:
+                session.execute(text("SELECT count(*), max(id) FROM events")).all()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+
+    stop = threading.Event()
+    readers = [threading.Thread(target=reader, args=(stop,)) for _ in range(4)]
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    started = time.monotonic()
+    for thread in readers + clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+    stop.set()
+    for thread in readers:
+        thread.join()
+    writer.shutdown()
+
+    assert errors == []
+    with wal_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM events")).scalar() == per_thread * threads
+    # 写入队列跟得上请求速率：全部写入在计划时长附近完成
+    assert elapsed < duration * 1.5
@@ -0,0 +1,74 @@
+"""
+延迟初始化与就绪检查测试
+"""
+import threading
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.lazy import LazyService
+from app.utils.startup import StartupState, startup_state
+
+
+class TestLazyService:
+    """LazyService 测试类"""
+
+    def test_created_once_on_first_access(self):
+        created = []
+
+        class Service:
+            def __init__(self):
+                created.append(1)
+                self.value = 1
+
+        lazy = LazyService(Service)
+        assert not lazy.initialized
+        threads = [threading.Thread(target=lambda: lazy.value) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert created == [1]
+
+        lazy.value = 2
+        assert lazy.get_instance().value == 2
+
+
+class TestStartupState:
+    """后台预热测试"""
+
+    def test_ready_after_steps(self):
+        release = threading.Event()
+        state = StartupState(steps=[("slow", release.wait)])
+        state.start()
+        assert not state.ready
+        release.set()
+        assert state.wait(5)
+        assert state.ready
+        assert state.status()["steps"]["slow"] is not None
+
+    def test_failed_step_not_ready(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        state = StartupState(steps=[("broken", broken)])
+        state.start()
+        state.wait(5)
+        assert not state.ready
+        assert "boom" in state.status()["error"]
+
+
+def test_readiness_endpoint():
+    """lifespan 启动后台预热，完成后就绪检查返回 200"""
+    with TestClient(app) as client:
+        assert client.get("/api/v1/system/health").status_code == 200
+        assert startup_state.wait(30)
+        response = client.get("/api/v1/system/ready")
+        assert response.status_code == 200
+        assert response.json()["data"]["ready"] is True
+
+
+def test_database_ready_before_requests(monkeypatch):
+    """建表在 lifespan 中同步完成，不等待后台预热"""
+    calls = []
+    monkeypatch.setattr("app.main.init_db", lambda: calls.append("init_db"))
+    with TestClient(app):
+        assert calls == ["init_db"]
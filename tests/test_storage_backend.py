@@ -0,0 +1,180 @@
+"""
+存储后端测试（S3 后端使用本地目录模拟的对象存储）
+"""
+import hashlib
+import os
+import pytest
+from app.config import settings
+from app.services.local_object_store import LocalObjectStore
+from app.services.storage_backend import (
+    S3StorageBackend, LocalStorageBackend, StorageBackend, create_s3_client, create_storage_backend
+)
+
+JPEG_HEAD = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+MP4_HEAD = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00"
+
+
+def _stage(backend, content):
+    path = backend.staging_path()
+    with open(path, "wb") as f:
+        f.write(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+class FailingObjectStore(LocalObjectStore):
+    """第二个分片上传失败的对象存储"""
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return super().upload_part(**kwargs)
+
+
+class TestS3StorageBackend:
+    """S3 存储后端测试类"""
+
+    def _backend(self, tmp_path, client=None):
+        return S3StorageBackend(
+            bucket="uploads",
+            client=client or LocalObjectStore(str(tmp_path / "s3")),
+            key_prefix="media",
+            multipart_threshold=100_000,
+            part_size=40_000,
+        )
+
+    def test_small_file_single_put(self, tmp_path):
+        backend = self._backend(tmp_path)
+        content = os.urandom(5000)
+        temp, digest = _stage(backend, content)
+        assert backend.commit(temp, digest, "user_001", ".jpg") == (f"{digest}.jpg", True)
+        assert not os.path.exists(temp)
+        assert (tmp_path / "s3" / "uploads" / "media" / "user_001" / f"{digest}.jpg").read_bytes() == content
+
+        temp, _ = _stage(backend, content)
+        assert backend.commit(temp, digest, "user_001", ".jpg") == (f"{digest}.jpg", False)
+        assert not os.path.exists(temp)
+
+    def test_large_file_multipart(self, tmp_path):
+        client = LocalObjectStore(str(tmp_path / "s3"))
+        backend = self._backend(tmp_path, client)
+        content = os.urandom(250_000)
+        temp, digest = _stage(backend, content)
+        file_name, created = backend.commit(temp, digest, "user_001", ".mp4")
+        assert created
+        assert backend.stat(f"user_001/{file_name}").st_size == len(content)
+        assert (tmp_path / "s3" / "uploads" / "media" / "user_001" / file_name).read_bytes() == content
+        assert client.pending_uploads() == 0
+
+    def test_failed_multipart_is_aborted(self, tmp_path):
+        client = FailingObjectStore(str(tmp_path / "s3"))
+        backend = self._backend(tmp_path, client)
+        temp, digest = _stage(backend, os.urandom(250_000))
+        with pytest.raises(ConnectionError):
+            backend.commit(temp, digest, "user_001", ".mp4")
+        assert not os.path.exists(temp)
+        assert client.pending_uploads() == 0
+        assert backend.stat(f"user_001/{digest}.mp4") is None
+
+    def test_delete(self, tmp_path):
+        backend = self._backend(tmp_path)
+        temp, digest = _stage(backend, b"content")
+        backend.commit(temp, digest, "user_001", ".png")
+        backend.delete(f"user_001/{digest}.png")
+        assert backend.stat(f"user_001/{digest}.png") is None
+        with pytest.raises(FileNotFoundError):
+            backend.delete(f"user_001/{digest}.png")
+
+    def test_rejects_hidden_and_outside_keys(self, tmp_path):
+        backend = self._backend(tmp_path)
+        for key in ("../secret", "user_001/.upload.part", "user_001//a.jpg", ""):
+            with pytest.raises(FileNotFoundError):
+                backend.media_response(key, {})
+
+
+class TestBackendSelection:
+    """后端选择测试类"""
+
+    def test_settings(self, tmp_path, monkeypatch):
+        assert isinstance(create_storage_backend(), LocalStorageBackend)
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+        assert isinstance(create_storage_backend(), S3StorageBackend)
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "ftp")
+        with pytest.raises(ValueError):
+            create_storage_backend()
+
+    def test_incomplete_backend_rejected(self):
+        class IncompleteBackend(StorageBackend):
+            def stat(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            IncompleteBackend()
+
+    def test_file_endpoint_uses_local_object_store(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "S3_ENDPOINT_URL", f"file://{tmp_path}")
+        client = create_s3_client()
+        assert isinstance(client, LocalObjectStore)
+        assert client.root == str(tmp_path)
+
+
+class TestS3Endpoints:
+    """使用 S3 后端的上传、访问与删除接口测试类"""
+
+    @pytest.fixture
+    def s3(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_DIR", str(tmp_path / "sessions"))
+        monkeypatch.setattr(settings, "MEDIA_CHUNK_SIZE", 4096)
+        backend = S3StorageBackend(
+            bucket="uploads",
+            client=LocalObjectStore(str(tmp_path / "s3")),
+            key_prefix="",
+            multipart_threshold=100_000,
+            part_size=64 * 1024,
+        )
+        for module in ("app.services.file_storage", "app.services.resumable_upload", "app.routers.file", "app.routers.media"):
+            monkeypatch.setattr(f"{module}.storage_backend", backend)
+        return tmp_path
+
+    def test_upload_serve_delete(self, client, auth_headers, s3, monkeypatch):
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        content = JPEG_HEAD + os.urandom(30_000)
+        url = client.post(
+            "/api/v1/files/upload",
+            files={"file": ("photo.jpg", content, "image/jpeg")},
+            data={"type": "avatar"},
+            headers=auth_headers,
+        ).json()["data"]["url"]
+        assert not (s3 / "uploads").exists()
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == content
+        assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+
+        partial = client.get(url, headers={"Range": "bytes=1000-9999"})
+        assert partial.status_code == 206
+        assert partial.content == content[1000:10000]
+
+        response = client.request("DELETE", "/api/v1/files/delete", data={"file_url": url}, headers=auth_headers).json()
+        assert response["code"] == 0
+        assert client.get(url).status_code == 404
+
+    def test_resumable_upload_multipart(self, client, auth_headers, s3):
+        chunk = 64 * 1024
+        content = MP4_HEAD + os.urandom(chunk * 3 - len(MP4_HEAD))
+        upload_id = client.post(
+            "/api/v1/files/uploads",
+            json={"filename": "clip.mp4", "content_type": "video/mp4", "size": len(content), "chunk_size": chunk},
+            headers=auth_headers,
+        ).json()["data"]["upload_id"]
+        for index in range(3):
+            client.put(
+                f"/api/v1/files/uploads/{upload_id}/chunks/{index}",
+                content=content[index * chunk:(index + 1) * chunk],
+                headers=auth_headers,
+            )
+        url = client.post(f"/api/v1/files/uploads/{upload_id}/complete", headers=auth_headers).json()["data"]["url"]
+        assert client.get(url).content == content
+        assert not (s3 / "uploads").exists()
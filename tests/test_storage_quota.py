@@ -0,0 +1,225 @@
+"""
+用户存储配额测试
+"""
+import os
+import time
+import pytest
+from app.config import settings
+from app.services.resumable_upload import resumable_upload_store
+from app.services.storage_quota import StorageQuotaLedger, QuotaExceededError
+
+JPEG_HEAD = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+MP4_HEAD = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00"
+
+
+class TestStorageQuotaLedger:
+    """配额账本测试类"""
+
+    def test_charge_release_and_check(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=1000)
+        ledger.charge("user_001", 600)
+        ledger.check("user_001", 400)
+        with pytest.raises(QuotaExceededError):
+            ledger.check("user_001", 401)
+        ledger.check("user_002", 1000)
+
+        ledger.release("user_001", 600)
+        assert ledger.usage("user_001") == {"userId": "user_001", "bytes": 0, "files": 0, "quota": 1000}
+
+    def test_reservations_count_until_settled(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=1000)
+        first = ledger.reserve("user_001", 600)
+        # 进行中的上传已占用 600 字节，另一个并发上传不能再通过
+        with pytest.raises(QuotaExceededError):
+            ledger.reserve("user_001", 500)
+        with pytest.raises(QuotaExceededError):
+            ledger.check("user_001", 500)
+
+        ledger.commit_reservation("user_001", first, 550)
+        assert ledger.usage("user_001")["bytes"] == 550
+        second = ledger.reserve("user_001", 450)
+        ledger.cancel_reservation("user_001", second)
+        ledger.check("user_001", 450)
+        with pytest.raises(QuotaExceededError):
+            ledger.check("user_001", 451)
+
+    def test_zero_quota_is_unlimited(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=0)
+        ledger.check("user_001", 10 ** 12)
+
+    def test_survives_restart(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=1000)
+        ledger.charge("user_001", 100)
+        ledger.charge("user_001", 50)
+        ledger.charge("user_002", 10)
+        ledger.release("user_002", 10)
+        ledger.journal.close()
+
+        reloaded = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=1000)
+        assert reloaded.usage("user_001")["bytes"] == 150
+        assert reloaded.usage("user_001")["files"] == 2
+        assert reloaded.top() == [reloaded.usage("user_001")]
+
+    def test_top_consumers(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=0)
+        for i, size in enumerate([30, 10, 50, 20]):
+            ledger.charge(f"user_{i}", size)
+        assert [entry["userId"] for entry in ledger.top(2)] == ["user_2", "user_0"]
+
+    def test_rebuild(self, tmp_path):
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=0)
+        ledger.charge("user_001", 999)
+        ledger.rebuild({"user_002": {"bytes": 5, "files": 1}})
+        assert ledger.usage("user_001")["bytes"] == 0
+        assert ledger.usage("user_002")["bytes"] == 5
+
+
+class TestUploadQuota:
+    """上传接口配额测试类"""
+
+    @pytest.fixture
+    def ledger(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_DIR", str(tmp_path / "sessions"))
+        ledger = StorageQuotaLedger(str(tmp_path / "usage.json"), quota=100_000)
+        monkeypatch.setattr("app.routers.file.storage_quota", ledger)
+        monkeypatch.setattr("app.services.resumable_upload.storage_quota", ledger)
+        monkeypatch.setattr("app.routers.system.storage_quota", ledger)
+        return ledger
+
+    def _upload(self, client, headers, content):
+        return client.post(
+            "/api/v1/files/upload",
+            files={"file": ("photo.jpg", content, "image/jpeg")},
+            data={"type": "avatar"},
+            headers=headers,
+        ).json()
+
+    def test_upload_and_delete_update_ledger(self, client, auth_headers, ledger, monkeypatch):
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        content = JPEG_HEAD + os.urandom(40_000)
+        url = self._upload(client, auth_headers, content)["data"]["url"]
+        assert ledger.usage("user_001")["bytes"] == len(content)
+
+        # 重复上传同一内容不重复计入
+        self._upload(client, auth_headers, content)
+        assert ledger.usage("user_001")["files"] == 1
+
+        client.request("DELETE", "/api/v1/files/delete", data={"file_url": url}, headers=auth_headers)
+        assert ledger.usage("user_001")["bytes"] == 0
+
+    def test_variant_delete_rejected(self, client, auth_headers, ledger, monkeypatch):
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        content = JPEG_HEAD + os.urandom(40_000)
+        url = self._upload(client, auth_headers, content)["data"]["url"]
+        variant_url = url.rsplit(".", 1)[0] + "_320.webp"
+        response = client.request("DELETE", "/api/v1/files/delete", data={"file_url": variant_url}, headers=auth_headers).json()
+        assert response["code"] == 400
+        assert ledger.usage("user_001") == {"userId": "user_001", "bytes": len(content), "files": 1, "quota": 100_000}
+
+    def test_legacy_file_with_numeric_suffix_deletable(self, client, auth_headers, ledger, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        user_dir = tmp_path / "uploads" / "user_001"
+        user_dir.mkdir(parents=True)
+        (user_dir / "photo_2.webp").write_bytes(b"RIFF" + os.urandom(100))
+        ledger.charge("user_001", 104)
+        response = client.request(
+            "DELETE", "/api/v1/files/delete", data={"file_url": "/uploads/user_001/photo_2.webp"}, headers=auth_headers
+        ).json()
+        assert response["code"] == 0
+        assert not (user_dir / "photo_2.webp").exists()
+        assert ledger.usage("user_001")["bytes"] == 0
+
+    def test_upload_over_quota_rejected(self, client, auth_headers, ledger, tmp_path):
+        ledger.charge("user_001", 90_000)
+        response = self._upload(client, auth_headers, JPEG_HEAD + os.urandom(20_000))
+        assert response["code"] == 400
+        assert not (tmp_path / "uploads").exists()
+
+    def test_upload_without_declared_size_checked_after_write(self, client, auth_headers, ledger, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        ledger.charge("user_001", 90_000)
+        reserve = ledger.reserve
+        calls = []
+
+        def reserve_unknown_size(user_id, incoming):
+            # 第一次预留时请求没有声明大小
+            calls.append(incoming)
+            return reserve(user_id, 0 if len(calls) == 1 else incoming)
+
+        monkeypatch.setattr(ledger, "reserve", reserve_unknown_size)
+        response = self._upload(client, auth_headers, JPEG_HEAD + os.urandom(20_000))
+        assert response["code"] == 400
+        assert len(calls) == 2
+        assert ledger.usage("user_001")["bytes"] == 90_000
+        assert all(not files for _, _, files in os.walk(tmp_path / "uploads"))
+        ledger.check("user_001", 10_000)
+
+    def test_resumable_initiate_over_quota_rejected(self, client, auth_headers, ledger):
+        response = client.post(
+            "/api/v1/files/uploads",
+            json={"filename": "clip.mp4", "content_type": "video/mp4", "size": 200_000},
+            headers=auth_headers,
+        ).json()
+        assert response["code"] == 400
+
+    def _initiate(self, client, headers, size):
+        return client.post(
+            "/api/v1/files/uploads",
+            json={"filename": "clip.mp4", "content_type": "video/mp4", "size": size},
+            headers=headers,
+        ).json()
+
+    def test_resumable_session_reserves_until_aborted(self, client, auth_headers, ledger):
+        upload_id = self._initiate(client, auth_headers, 60_000)["data"]["upload_id"]
+        # 未完成的会话已占用 60000 字节
+        assert self._initiate(client, auth_headers, 60_000)["code"] == 400
+        with pytest.raises(QuotaExceededError):
+            ledger.check("user_001", 50_000)
+
+        client.delete(f"/api/v1/files/uploads/{upload_id}", headers=auth_headers)
+        assert self._initiate(client, auth_headers, 60_000)["code"] == 0
+
+    def test_resumable_reservation_released_on_expiry(self, client, auth_headers, ledger, tmp_path):
+        upload_id = self._initiate(client, auth_headers, 60_000)["data"]["upload_id"]
+        stale = time.time() - settings.RESUMABLE_UPLOAD_TTL - 60
+        os.utime(tmp_path / "sessions" / upload_id, (stale, stale))
+        assert resumable_upload_store.purge_expired() == 1
+        ledger.check("user_001", 100_000)
+
+    def test_resumable_complete_commits_reservation(self, client, auth_headers, ledger):
+        content = MP4_HEAD + os.urandom(60_000 - len(MP4_HEAD))
+        upload_id = self._initiate(client, auth_headers, len(content))["data"]["upload_id"]
+        client.put(f"/api/v1/files/uploads/{upload_id}/chunks/0", content=content, headers=auth_headers)
+        assert client.post(f"/api/v1/files/uploads/{upload_id}/complete", headers=auth_headers).json()["code"] == 0
+        assert ledger.usage("user_001")["bytes"] == len(content)
+        ledger.check("user_001", 100_000 - len(content))
+
+    def test_resumable_session_limit(self, client, auth_headers, ledger, monkeypatch):
+        monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_MAX_SESSIONS", 2)
+        first = self._initiate(client, auth_headers, 1_000)["data"]["upload_id"]
+        self._initiate(client, auth_headers, 1_000)
+        assert self._initiate(client, auth_headers, 1_000)["code"] == 429
+        # 其他用户不受影响
+        assert self._initiate(client, {"Authorization": "Bearer user_002"}, 1_000)["code"] == 0
+
+        client.delete(f"/api/v1/files/uploads/{first}", headers=auth_headers)
+        assert self._initiate(client, auth_headers, 1_000)["code"] == 0
+
+    def test_storage_usage_endpoint(self, client, auth_headers, ledger, monkeypatch):
+        monkeypatch.setattr(settings, "OPS_USER_IDS", "admin_001, user_001")
+        ledger.charge("user_002", 500)
+        ledger.charge("user_003", 900)
+        data = client.get("/api/v1/system/storage-usage", params={"limit": 1}, headers=auth_headers).json()["data"]
+        assert data["quota"] == 100_000
+        assert [entry["userId"] for entry in data["users"]] == ["user_003"]
+
+    def test_storage_usage_requires_ops_user(self, client, auth_headers, ledger, monkeypatch):
+        ledger.charge("user_002", 500)
+        monkeypatch.setattr(settings, "OPS_USER_IDS", "")
+        response = client.get("/api/v1/system/storage-usage", headers=auth_headers).json()
+        assert response["code"] == 403
+        assert response["data"] is None
+        monkeypatch.setattr(settings, "OPS_USER_IDS", "admin_001")
+        assert client.get("/api/v1/system/storage-usage", headers=auth_headers).json()["code"] == 403
@@ -0,0 +1,85 @@
+"""
+token验证缓存测试
+"""
+import pytest
+from app.services import token_cache as token_cache_module
+from app.services.auth import AuthService
+from app.services.mock_data import mock_data_service
+from app.services.token_cache import TokenCache, token_cache
+from app.services.user_journal import UserJournal
+
+
+class TestTokenCache:
+    """TokenCache 测试类"""
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.put("t1", {"id": "u1"})
+        cache.put("t2", {"id": "u2"})
+        assert cache.get("t1")["id"] == "u1"
+        cache.put("t3", {"id": "u3"})
+        assert cache.get("t2") is None
+        assert cache.get("t1") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(token_cache_module.time, "monotonic", lambda: now[0])
+        cache = TokenCache(max_size=10, ttl=5)
+        cache.put("t1", {"id": "u1"})
+        now[0] += 4
+        assert cache.get("t1") is not None
+        now[0] += 2
+        assert cache.get("t1") is None
+        assert cache.stats()["size"] == 0
+
+    def test_invalidate_user(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        cache.put("a", {"id": "u1"})
+        cache.put("b", {"id": "u1"})
+        cache.put("c", {"id": "u2"})
+        cache.invalidate_user("u1")
+        assert cache.get("a") is None and cache.get("b") is None
+        assert cache.get("c")["id"] == "u2"
+
+    def test_counters(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        cache.get("missing")
+        cache.put("t", {"id": "u"})
+        cache.get("t")
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+class TestAuthTokenCache:
+    """认证流程中的token缓存"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(mock_data_service, "journal", UserJournal(str(tmp_path / "users.json")))
+        token_cache.clear()
+        yield
+        token_cache.clear()
+
+    def test_hot_token_served_from_cache(self):
+        first = AuthService.get_user_from_token("user_001")
+        hits = token_cache.hits
+        assert AuthService.get_user_from_token("user_001") is first
+        assert token_cache.hits == hits + 1
+
+    def test_invalid_token_not_cached(self):
+        assert AuthService.get_user_from_token("invalid_token") is None
+        assert token_cache.stats()["size"] == 0
+
+    def test_profile_update_invalidates(self):
+        user = AuthService.get_user_from_token("user_001")
+        original_bio = user.get("bio")
+        mock_data_service.update_profile("user_001", {"bio": "更新后的简介"})
+        assert token_cache.stats()["size"] == 0
+        mock_data_service.update_profile("user_001", {"bio": original_bio})
+
+    def test_logout_invalidates(self, client, auth_headers):
+        AuthService.get_user_from_token("user_001")
+        response = client.delete("/api/v1/auth/sessions/current", headers=auth_headers)
+        assert response.status_code == 200
+        assert token_cache.get("user_001") is None
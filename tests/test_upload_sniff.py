@@ -0,0 +1,168 @@
+"""
+上传文件头识别测试
+"""
+import asyncio
+import io
+import json
+import os
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.services.file_storage import sniff_content, verify_content, save_upload, UploadRejectedError
+from app.utils.upload_sniff import UploadSniffMiddleware, find_file_head
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 100
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+QUICKTIME = b"\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00"
+
+
+class TestSniffContent:
+    """文件头识别测试类"""
+
+    def test_known_formats(self):
+        assert sniff_content(JPEG) == "jpeg"
+        assert sniff_content(PNG) == "png"
+        assert sniff_content(b"GIF89a....") == "gif"
+        assert sniff_content(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+        assert sniff_content(b"RIFF\x00\x00\x00\x00AVI LIST") == "avi"
+        assert sniff_content(b"\x00\x00\x00\x18ftypmp42") == "mp4"
+        assert sniff_content(QUICKTIME) == "mov"
+        assert sniff_content(b"\x00\x00\x00\x18ftyp3gp5") == "3gp"
+        assert sniff_content(b"FLV\x01") == "flv"
+        assert sniff_content(b"\x1a\x45\xdf\xa3\x9fB\x82\x84webm") == "webm"
+        assert sniff_content(b"#!/bin/sh\nrm -rf /") is None
+
+    def test_container_aliases_accepted(self):
+        verify_content("video/mp4", QUICKTIME)
+        verify_content("image/jpg", JPEG)
+
+    def test_mismatch_rejected(self):
+        with pytest.raises(UploadRejectedError):
+            verify_content("image/jpeg", PNG)
+        with pytest.raises(UploadRejectedError):
+            verify_content("video/mp4", JPEG)
+        with pytest.raises(UploadRejectedError):
+            verify_content("image/png", b"<html><script>")
+
+
+class TestFindFileHead:
+    """multipart 文件字段定位测试类"""
+
+    def _body(self, data):
+        return (
+            b"--xyz\r\nContent-Disposition: form-data; name=\"type\"\r\n\r\navatar\r\n"
+            b"--xyz\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n" + data + b"\r\n--xyz--\r\n"
+        )
+
+    def test_needs_more_data(self):
+        body = self._body(JPEG * 100)
+        assert find_file_head(body[:60], b"xyz", complete=False) is None
+
+    def test_finds_file_after_fields(self):
+        head = find_file_head(self._body(JPEG), b"xyz", complete=True)
+        assert head == ("a.jpg", "image/jpeg", JPEG)
+
+    def test_no_file_field(self):
+        body = b"--xyz\r\nContent-Disposition: form-data; name=\"type\"\r\n\r\navatar\r\n--xyz--\r\n"
+        assert find_file_head(body, b"xyz", complete=True) == ("", "", b"")
+
+
+class TestUploadSniffMiddleware:
+    """上传预检中间件测试类"""
+
+    def _app(self, calls):
+        app = FastAPI()
+        app.add_middleware(UploadSniffMiddleware, paths=["/upload"])
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            calls.append(file.filename)
+            return {"size": len(await file.read())}
+
+        return TestClient(app)
+
+    def test_rejects_before_reading_rest_of_body(self):
+        head = (
+            b"--xyz\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n"
+        )
+        chunks = [head + b"MZ\x90\x00" + b"\x00" * 8192] + [b"\x00" * 8192] * 100
+        consumed = []
+        sent = []
+
+        async def receive():
+            consumed.append(0)
+            body = chunks[len(consumed) - 1]
+            return {"type": "http.request", "body": body, "more_body": len(consumed) < len(chunks)}
+
+        async def send(message):
+            sent.append(message)
+
+        async def app(scope, receive, send):
+            raise AssertionError("rejected uploads must not reach the route")
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/upload",
+            "headers": [(b"content-type", b"multipart/form-data; boundary=xyz")],
+        }
+        asyncio.run(UploadSniffMiddleware(app, paths=["/upload"])(scope, receive, send))
+        assert json.loads(sent[1]["body"])["code"] == 400
+        assert len(consumed) == 1
+
+    def test_valid_upload_passes_through_intact(self):
+        calls = []
+        content = JPEG + os.urandom(200_000)
+        response = self._app(calls).post("/upload", files={"file": ("a.jpg", content, "image/jpeg")})
+        assert response.json() == {"size": len(content)}
+        assert calls == ["a.jpg"]
+
+    def test_disallowed_type_rejected(self):
+        calls = []
+        response = self._app(calls).post("/upload", files={"file": ("a.exe", b"MZ" * 100, "application/octet-stream")})
+        assert response.json()["code"] == 400
+        assert calls == []
+
+
+class TestUploadEndpointSniffing:
+    """上传接口文件头检查测试类"""
+
+    @pytest.fixture
+    def upload_dirs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+        monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_DIR", str(tmp_path / "sessions"))
+        return tmp_path
+
+    def test_lying_content_type_rejected(self, client, auth_headers, upload_dirs):
+        response = client.post(
+            "/api/v1/files/upload",
+            files={"file": ("photo.jpg", b"<?php system($_GET['c']); ?>", "image/jpeg")},
+            data={"type": "avatar"},
+            headers=auth_headers,
+        ).json()
+        assert response["code"] == 400
+        assert not (upload_dirs / "uploads").exists()
+
+    def test_resumable_first_chunk_checked(self, client, auth_headers, upload_dirs):
+        content = PNG + os.urandom(70_000)
+        session = client.post(
+            "/api/v1/files/uploads",
+            json={"filename": "clip.mp4", "content_type": "video/mp4", "size": len(content)},
+            headers=auth_headers,
+        ).json()["data"]
+        response = client.put(
+            f"/api/v1/files/uploads/{session['upload_id']}/chunks/0", content=content, headers=auth_headers
+        ).json()
+        assert response["code"] == 400
+        assert response["message"] == "文件内容与声明的类型不符"
+
+    def test_save_upload_checks_head_before_writing(self, upload_dirs):
+        upload = UploadFile(io.BytesIO(PNG + b"\x00" * 10_000), filename="a.jpg")
+        with pytest.raises(UploadRejectedError):
+            asyncio.run(save_upload(upload, "user", ".jpg", 1024 * 1024, content_type="image/jpeg"))
+        assert not (upload_dirs / "uploads").exists()
+        assert not (upload_dirs / "blobs").exists()
@@ -0,0 +1,58 @@
+"""
+用户二级索引测试
+"""
+from app.services.mock_data import MockDataService
+from app.services.user_index import UserLookupIndex
+
+
+class TestUserLookupIndex:
+    """UserLookupIndex 测试类"""
+
+    def test_reindex_tracks_in_place_changes(self):
+        index = UserLookupIndex()
+        user = {"id": "u1", "phone": "13900000001", "openid": "wx_1"}
+        index.reindex(user)
+        assert index.get("phone", "13900000001") == "u1"
+
+        user["phone"] = "13900000002"
+        user.pop("openid")
+        index.reindex(user)
+        assert index.get("phone", "13900000001") is None
+        assert index.get("phone", "13900000002") == "u1"
+        assert index.get("openid", "wx_1") is None
+
+    def test_duplicate_values_keep_first_user(self):
+        index = UserLookupIndex()
+        index.reindex({"id": "u1", "email": "same@example.com"})
+        index.reindex({"id": "u2", "email": "same@example.com"})
+        assert index.get("email", "same@example.com") == "u1"
+        index.remove("u1")
+        assert index.get("email", "same@example.com") == "u2"
+        index.remove("u2")
+        assert index.get("email", "same@example.com") is None
+        assert len(index) == 0
+
+    def test_empty_values_not_indexed(self):
+        index = UserLookupIndex()
+        index.reindex({"id": "u1", "phone": None, "email": ""})
+        assert index.get("phone", None) is None
+        assert index.get("email", "") is None
+
+
+class TestMockUserLookup:
+    """模拟数据服务按 openid/手机号/邮箱查找用户"""
+
+    def test_lookup_follows_create_update_delete(self, tmp_path):
+        service = MockDataService(user_data_file=str(tmp_path / "users.json"))
+        user = service.create_user({"id": "idx_user", "phone": "13911112222", "openid": "wx_idx"})
+        assert service.get_user_by_phone("13911112222") is user
+        assert service.get_user_by_openid("wx_idx") is user
+
+        service.update_profile("idx_user", {"phone": "13933334444", "email": "idx@example.com"})
+        assert service.get_user_by_phone("13911112222") is None
+        assert service.get_user_by_phone("13933334444") is user
+        assert service.get_user_by_email("idx@example.com") is user
+
+        assert service.delete_user("idx_user")
+        assert service.get_user_by_phone("13933334444") is None
+        assert service.get_user_by_openid("wx_idx") is None
@@ -0,0 +1,86 @@
+"""
+用户数据追加日志测试
+"""
+import json
+import os
+from app.services.mock_data import MockDataService
+from app.services import user_journal
+from app.services.user_journal import UserJournal
+
+
+def _journal(tmp_path, **kwargs):
+    return UserJournal(str(tmp_path / "users.json"), fsync_interval=0, **kwargs)
+
+
+class TestUserJournal:
+    """UserJournal 测试类"""
+
+    def test_replay_restores_state(self, tmp_path):
+        (tmp_path / "users.json").write_text(json.dumps({"u1": {"id": "u1", "age": 20}}), encoding="utf-8")
+        journal = _journal(tmp_path)
+        journal.load()
+        journal.put({"id": "u1", "age": 21})
+        journal.put({"id": "u2", "age": 30})
+        journal.delete("u2")
+        journal.close()
+
+        assert _journal(tmp_path).load() == {"u1": {"id": "u1", "age": 21}}
+
+    def test_truncated_tail_ignored_and_repaired(self, tmp_path):
+        journal = _journal(tmp_path)
+        journal.load()
+        journal.put({"id": "u1", "age": 20})
+        journal.close()
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op":"put","id":"u1","user":{"id":"u1","ag')
+
+        journal = _journal(tmp_path)
+        assert journal.load() == {"u1": {"id": "u1", "age": 20}}
+        journal.put({"id": "u2", "age": 30})
+        journal.close()
+        assert set(_journal(tmp_path).load()) == {"u1", "u2"}
+
+    def test_compaction_merges_into_snapshot(self, tmp_path):
+        journal = _journal(tmp_path, compact_records=3)
+        journal.load()
+        for age in range(5):
+            journal.put({"id": "u1", "age": age})
+        journal.compact()
+        journal.close()
+
+        with open(tmp_path / "users.json", encoding="utf-8") as f:
+            assert json.load(f) == {"u1": {"id": "u1", "age": 4}}
+        assert not [name for name in os.listdir(tmp_path) if name.endswith(".old")]
+        assert _journal(tmp_path).load() == {"u1": {"id": "u1", "age": 4}}
+
+    def test_open_journals_tracked_for_exit(self, tmp_path):
+        journal = _journal(tmp_path)
+        journal.load()
+        journal.put({"id": "u1", "age": 20})
+        # 未关闭的日志登记在模块级集合中，由唯一的 atexit 处理函数关闭
+        assert journal in user_journal._open_journals
+        journal.close()
+        assert journal not in user_journal._open_journals
+
+
+class TestMockDataJournal:
+    """模拟数据服务的增量持久化"""
+
+    def test_update_appends_without_rewriting_snapshot(self, tmp_path):
+        path = tmp_path / "users.json"
+        path.write_text(json.dumps({"u1": {"id": "u1", "nickName": "旧昵称"}}), encoding="utf-8")
+        service = MockDataService(user_data_file=str(path))
+        snapshot_before = path.read_text(encoding="utf-8")
+
+        service.update_profile("u1", {"nickName": "新昵称"})
+        service.create_user({"id": "u2", "nickName": "新用户"})
+        service.create_user({"id": "u3", "nickName": "已注销"})
+        service.delete_user("u3")
+        service.journal.close()
+
+        assert path.read_text(encoding="utf-8") == snapshot_before
+        reloaded = MockDataService(user_data_file=str(path))
+        assert reloaded.users["u1"]["nickName"] == "新昵称"
+        assert reloaded.users["u2"]["nickName"] == "新用户"
+        assert "u3" not in reloaded.users
+        reloaded.journal.close()